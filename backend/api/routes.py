@@ -2,13 +2,21 @@
 FastAPI routes for HireSong API.
 """
 
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, Request, UploadFile, File, Form, HTTPException, Query
 from fastapi.responses import FileResponse, JSONResponse
 import os
+import asyncio
 import tempfile
 import shutil
 
-from .services.orchestrator import generate_hiresong_video
+from .services.orchestrator import generate_hiresong_video, run_sync_in_thread
+from .services.database import list_runs, get_run_by_id
+from .services.preflight import run_preflight, check_company_url, PreflightError
+from .services.model_routing import ROUTES, model_stats
+from .services.hedging import hedge_stats
+from .services.concurrency import concurrency_stats
+from .services.admission import admission_stats
+from .services.resilience import check_providers, CircuitOpenError, TransientProviderError, BREAKER_COOLDOWN
 
 router = APIRouter()
 
@@ -21,10 +29,12 @@ async def health_check():
 
 @router.post("/generate")
 async def generate_video(
+    request: Request,
     selfie: UploadFile = File(..., description="Candidate's selfie (JPG/PNG)"),
     cv: UploadFile = File(..., description="Candidate's CV (PDF)"),
     company_url: str = Form(..., description="Target company website URL"),
-    genre: str = Form(None, description="Preferred music genre (optional)")
+    genre: str = Form(None, description="Preferred music genre (optional)"),
+    tier: str = Form(None, description="Model routing tier, e.g. standard or fast (optional)")
 ):
     """
     Generate a complete HireSong video.
@@ -34,6 +44,9 @@ async def generate_video(
     - cv: PDF file
     - company_url: Company website URL (string)
     - genre: Preferred music genre (optional)
+    - tier: Model routing tier (optional)
+    - X-Priority / X-Tenant headers: Scheduling lane and tenant (optional, read by AdmissionMiddleware;
+      X-Tenant only from TRUSTED_PROXIES)
     
     Returns:
     - MP4 video file directly
@@ -46,22 +59,47 @@ async def generate_video(
     if cv.content_type != 'application/pdf':
         raise HTTPException(status_code=400, detail="CV must be a PDF file")
     
-    # Create temporary files for uploads
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as selfie_temp:
-        shutil.copyfileobj(selfie.file, selfie_temp)
-        selfie_path = selfie_temp.name
+    if tier and tier not in ROUTES:
+        raise HTTPException(status_code=400, detail=f"Unknown tier '{tier}' (expected one of: {', '.join(ROUTES)})")
+    
+    # Don't start a run that a provider outage would doom anyway
+    try:
+        check_providers()
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after) + 1)})
+    
+    # Check the company URL while the uploads are written to disk
+    url_check = asyncio.ensure_future(check_company_url(company_url))
+    
+    def save_upload(upload: UploadFile, suffix: str) -> str:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp:
+            shutil.copyfileobj(upload.file, temp)
+            return temp.name
     
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as cv_temp:
-        shutil.copyfileobj(cv.file, cv_temp)
-        cv_path = cv_temp.name
+    # Create temporary files for uploads
+    selfie_path, cv_path = await asyncio.gather(
+        run_sync_in_thread(save_upload, selfie, '.jpg'),
+        run_sync_in_thread(save_upload, cv, '.pdf')
+    )
     
     try:
+        # Reject bad inputs before any paid API is called
+        await run_preflight(selfie_path, cv_path, company_url, url_check)
+        
+        # Wait for a run slot (AdmissionMiddleware already reserved a place in the queue)
+        ticket = getattr(request.state, "admission", None)
+        if ticket is not None:
+            waited = await ticket.wait_for_turn()
+            if waited >= 1:
+                print(f"🕒 Run started after waiting {waited:.1f}s for a slot")
+        
         # Run the pipeline (just like test_full_pipeline.py!)
         results = await generate_hiresong_video(
             selfie_path=selfie_path,
             cv_path=cv_path,
             company_url=company_url,
-            preferred_genre=genre
+            preferred_genre=genre,
+            tier=tier
         )
         
         # Get the final video path
@@ -77,6 +115,18 @@ async def generate_video(
             filename="hiresong_pitch.mp4"
         )
         
+    except PreflightError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid input: {str(e)}")
+    
+    except TransientProviderError as e:
+        # Outage or overload at OpenAI, fal or ElevenLabs - worth retrying later
+        retry_after = getattr(e, "retry_after", BREAKER_COOLDOWN)
+        raise HTTPException(
+            status_code=503,
+            detail=f"Pipeline failed: {str(e)}",
+            headers={"Retry-After": str(int(retry_after) + 1)}
+        )
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Pipeline failed: {str(e)}")
         
@@ -89,6 +139,74 @@ async def generate_video(
             pass
 
 
+@router.get("/runs")
+async def get_runs(
+    status: str = Query(None, description="Filter by status (e.g. Completed, Failed, In Progress)"),
+    company: str = Query(None, description="Filter by company URL (substring match)"),
+    date_from: str = Query(None, description="Earliest run timestamp, e.g. 2025-01-01"),
+    date_to: str = Query(None, description="Latest run timestamp, e.g. 2025-01-31"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100)
+):
+    """
+    List pipeline runs, newest first, with optional filters.
+    
+    Returns a page of runs plus the total number of matching runs.
+    """
+    return await run_sync_in_thread(
+        list_runs, status, company, date_from, date_to, page, page_size
+    )
+
+
+@router.get("/model-stats")
+async def get_model_stats(days: int = Query(7, ge=1, le=365)):
+    """
+    Observed LLM performance per stage, tier and model.
+    
+    Returns call counts, failures, p50/p95 latency, average tokens and
+    estimated cost over the last `days` days.
+    """
+    return {"stats": await run_sync_in_thread(model_stats, days)}
+
+
+@router.get("/hedge-stats")
+async def get_hedge_stats():
+    """
+    Hedging counters per fal endpoint: requests, hedges sent, which copy won,
+    hedges skipped for budget, and the current hedge delay.
+    """
+    return hedge_stats()
+
+
+@router.get("/concurrency-stats")
+async def get_concurrency_stats():
+    """
+    Provider concurrency limits: current limit, calls in flight, calls
+    waiting (and from how many runs), queue wait times and 429s per endpoint.
+    """
+    return concurrency_stats()
+
+
+@router.get("/queue-stats")
+async def get_queue_stats():
+    """
+    Run admission: runs executing and queued per lane and tenant, rejected
+    requests (429s), yields and how long admitted runs waited for a slot.
+    """
+    return admission_stats()
+
+
+@router.get("/runs/{run_id}")
+async def get_run(run_id: str):
+    """
+    Get a single pipeline run by its ID.
+    """
+    run = await run_sync_in_thread(get_run_by_id, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
+
+
 @router.get("/results/{timestamp}")
 async def get_results(timestamp: str):
     """
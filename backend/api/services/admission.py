@@ -0,0 +1,430 @@
+"""
+Admission control and scheduling for pipeline runs.
+At most MAX_CONCURRENT_RUNS runs execute at once and at most MAX_QUEUED_RUNS
+wait for a turn. Requests beyond that are rejected with 429 and Retry-After
+by AdmissionMiddleware, before the upload body is read, instead of slowing
+every run down and failing late.
+
+Runs carry a priority ("interactive" or "batch") and a tenant. Waiting runs
+start interactive first, then by weighted fair queueing across tenants, and
+a running batch run gives its slot to waiting interactive runs at the next
+stage boundary, so neither bulk submissions nor one heavy tenant can hold up
+everyone else.
+
+Trust model: the tenant is the connecting client's address, which a client
+can't choose. X-Tenant (and X-Forwarded-For) are only honoured from the
+proxies listed in TRUSTED_PROXIES, which must set or strip them; otherwise a
+client could rotate tenants to dodge fair queueing and the per-tenant cap.
+X-Priority is honoured from anyone, since it can only lower a run's priority.
+"""
+
+import os
+import time
+import asyncio
+import contextvars
+from typing import Any, Dict, Optional
+
+from starlette.responses import JSONResponse
+
+MAX_CONCURRENT_RUNS = int(os.getenv("MAX_CONCURRENT_RUNS", "4"))
+MAX_QUEUED_RUNS = int(os.getenv("MAX_QUEUED_RUNS", "8"))
+
+# Runs (running + queued) one tenant may hold; 0 means no cap. Without
+# TRUSTED_PROXIES every client behind a proxy is one tenant, so leave it off there
+MAX_RUNS_PER_TENANT = int(os.getenv("MAX_RUNS_PER_TENANT", "0"))
+
+# Places kept free for interactive runs: batch runs are rejected this much earlier
+INTERACTIVE_HEADROOM = int(os.getenv("INTERACTIVE_HEADROOM", "2"))
+
+# Batch runs waiting longer than this are scheduled like interactive ones
+BATCH_AGING_SECONDS = float(os.getenv("BATCH_AGING_SECONDS", "300"))
+
+
+def _parse_tenant_weights(spec: str) -> Dict[str, float]:
+    """
+    Tenant weights from a "name=weight,..." string.
+
+    Malformed entries (no name, no "=", a weight that isn't a positive
+    number) are skipped with a warning, so a typo can't stop the API from
+    starting; those tenants get the default weight of 1.
+    """
+    weights = {}
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        name, _, weight = entry.partition("=")
+        try:
+            value = float(weight)
+        except ValueError:
+            value = 0.0
+        if not name.strip() or not 0 < value < float("inf"):
+            print(f"⚠️  Ignoring malformed TENANT_WEIGHTS entry '{entry.strip()}' (expected name=weight)")
+            continue
+        weights[name.strip()] = value
+    return weights
+
+
+# Tenant weights for fair queueing, e.g. "acme=2,bulk-importer=0.5" (default 1)
+TENANT_WEIGHTS = _parse_tenant_weights(os.getenv("TENANT_WEIGHTS", ""))
+
+# Starting estimate of a run's duration, refined from finished runs (for Retry-After)
+RUN_SECONDS_ESTIMATE = float(os.getenv("ADMISSION_RUN_SECONDS", "180"))
+
+# Addresses of reverse proxies allowed to name the tenant, e.g. "10.0.0.5,127.0.0.1"
+TRUSTED_PROXIES = {address.strip() for address in os.getenv("TRUSTED_PROXIES", "").split(",") if address.strip()}
+
+PRIORITIES = ("interactive", "batch")
+PRIORITY_HEADER = "x-priority"
+TENANT_HEADER = "x-tenant"
+FORWARDED_HEADER = "x-forwarded-for"
+
+_ticket = contextvars.ContextVar("admission_ticket", default=None)
+
+
+class AdmissionRejected(Exception):
+    """No capacity for a new run; try again after retry_after seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """A request's place in admission: holds capacity from arrival until release."""
+
+    def __init__(self, controller: "AdmissionController", priority: str, tenant: str):
+        self.controller = controller
+        self.priority = priority
+        self.tenant = tenant
+        self.arrived = time.monotonic()
+        self.queued_at = self.arrived
+        self.started: Optional[float] = None   # Start of the current running stretch
+        self.ran_seconds = 0.0
+        self.state = "admitted"                # admitted -> waiting <-> running -> released
+        self.start_tag = 0.0
+        self.finish_tag = 0.0
+        self._turn: Optional[asyncio.Future] = None
+
+    async def wait_for_turn(self) -> float:
+        """
+        Wait until this request may start its run.
+
+        Also makes this ticket the current run's, for stage_boundary().
+
+        Returns:
+            Seconds spent waiting
+        """
+        _ticket.set(self)
+        await self.controller._wait(self)
+        return self.started - self.arrived
+
+    def release(self) -> None:
+        """Give back the capacity (safe to call more than once)."""
+        if self.state != "released":
+            self.controller._release(self)
+
+
+class AdmissionController:
+    """
+    Caps running and waiting runs and picks which waiting run starts next.
+
+    Waiting runs are ordered by lane (interactive before batch, aged batch
+    counting as interactive), then by weighted fair queueing tags per
+    tenant: each tenant's runs are spaced 1/weight apart in virtual time, so
+    a tenant with many queued runs takes turns with the others instead of
+    going first.
+    """
+
+    def __init__(self, max_running: int = MAX_CONCURRENT_RUNS, max_queued: int = MAX_QUEUED_RUNS):
+        self.max_running = max(1, max_running)
+        self.max_queued = max(0, max_queued)
+        self.tenant_limit = MAX_RUNS_PER_TENANT
+        self.running = 0
+        self.tickets = set()                   # Tickets holding capacity (uploading, waiting or running)
+        self.waiting = []
+        self.run_seconds = RUN_SECONDS_ESTIMATE
+        self._virtual = {priority: 0.0 for priority in PRIORITIES}
+        self._last_finish: Dict[tuple, float] = {}  # (priority, tenant) -> finish tag of its last queued run
+        self.stats = {
+            "admitted": 0, "rejected": 0, "rejected_tenant_limit": 0, "started": 0,
+            "yields": 0, "total_wait": 0.0, "max_wait": 0.0,
+        }
+        self._lane_waits = {priority: {"started": 0, "total_wait": 0.0} for priority in PRIORITIES}
+
+    @property
+    def capacity(self) -> int:
+        return self.max_running + self.max_queued
+
+    def reserve(self, priority: str = "interactive", tenant: str = "") -> Ticket:
+        """
+        Claim capacity for a new request.
+
+        Raises:
+            AdmissionRejected: If the server, or this tenant's share of it, is full
+        """
+        limit = self.capacity if priority == "interactive" else max(1, self.capacity - INTERACTIVE_HEADROOM)
+        if len(self.tickets) >= limit:
+            self.stats["rejected"] += 1
+            retry_after = self.retry_after()
+            raise AdmissionRejected(
+                f"HireSong is busy right now - please try again in about {retry_after} seconds", retry_after
+            )
+        held = sum(1 for ticket in self.tickets if ticket.tenant == tenant)
+        if self.tenant_limit and held >= self.tenant_limit:
+            self.stats["rejected"] += 1
+            self.stats["rejected_tenant_limit"] += 1
+            retry_after = self.retry_after()
+            raise AdmissionRejected(
+                f"Too many runs in progress for this tenant ({held}) - please try again in about {retry_after} seconds",
+                retry_after
+            )
+        ticket = Ticket(self, priority, tenant)
+        self.tickets.add(ticket)
+        self.stats["admitted"] += 1
+        return ticket
+
+    def retry_after(self) -> int:
+        """Rough seconds until capacity frees up, for the Retry-After header."""
+        # Running runs are on average half done; each full round of waiters adds a run's duration
+        rounds = 1 + len(self.waiting) / self.max_running
+        return max(1, int(self.run_seconds * rounds / 2))
+
+    def _weight(self, tenant: str) -> float:
+        return max(0.01, TENANT_WEIGHTS.get(tenant, 1.0))
+
+    def _tag(self, ticket: Ticket) -> None:
+        """Give a newly queued run its fair-queueing tags."""
+        key = (ticket.priority, ticket.tenant)
+        ticket.start_tag = max(self._virtual[ticket.priority], self._last_finish.get(key, 0.0))
+        ticket.finish_tag = ticket.start_tag + 1.0 / self._weight(ticket.tenant)
+        self._last_finish[key] = ticket.finish_tag
+
+    def _rank(self, ticket: Ticket, now: float) -> tuple:
+        urgent = ticket.priority == "interactive" or now - ticket.queued_at >= BATCH_AGING_SECONDS
+        return (0 if urgent else 1, ticket.finish_tag, ticket.arrived)
+
+    def _next_waiter(self) -> Optional[Ticket]:
+        """The waiting ticket to start next: interactive lane first, then fair order across tenants."""
+        if not self.waiting:
+            return None
+        now = time.monotonic()
+        return min(self.waiting, key=lambda ticket: self._rank(ticket, now))
+
+    def _start(self, ticket: Ticket) -> None:
+        self.running += 1
+        ticket.state = "running"
+        ticket.started = time.monotonic()
+        self._virtual[ticket.priority] = max(self._virtual[ticket.priority], ticket.start_tag)
+        if ticket.ran_seconds:
+            return  # Resuming after a yield; its first wait is already counted
+        waited = ticket.started - ticket.arrived
+        self.stats["started"] += 1
+        self.stats["total_wait"] += waited
+        self.stats["max_wait"] = max(self.stats["max_wait"], waited)
+        lane = self._lane_waits[ticket.priority]
+        lane["started"] += 1
+        lane["total_wait"] += waited
+
+    def _dispatch(self) -> None:
+        """Start waiting runs while there is room."""
+        while self.running < self.max_running:
+            ticket = self._next_waiter()
+            if ticket is None:
+                return
+            self.waiting.remove(ticket)
+            self._start(ticket)
+            if not ticket._turn.done():
+                ticket._turn.set_result(None)
+
+    async def _queue(self, ticket: Ticket) -> None:
+        ticket.state = "waiting"
+        ticket.queued_at = time.monotonic()
+        ticket._turn = asyncio.get_running_loop().create_future()
+        self.waiting.append(ticket)
+        self._dispatch()
+        try:
+            await ticket._turn
+        except asyncio.CancelledError:
+            if ticket in self.waiting:
+                self.waiting.remove(ticket)
+            raise
+
+    async def _wait(self, ticket: Ticket) -> None:
+        if ticket.state != "admitted":
+            return
+        self._tag(ticket)
+        if self.running < self.max_running and not self.waiting:
+            self._start(ticket)
+            return
+        print(f"🕒 {ticket.priority.capitalize()} run queued ({len(self.waiting) + 1} waiting, {self.running} running)")
+        await self._queue(ticket)
+
+    def _end_stretch(self, ticket: Ticket) -> None:
+        self.running -= 1
+        ticket.ran_seconds += time.monotonic() - ticket.started
+
+    def should_yield(self, ticket: Ticket) -> bool:
+        """Whether a running batch run should hand its slot to a waiting interactive run."""
+        return (
+            ticket.priority == "batch"
+            and ticket.state == "running"
+            and self.running >= self.max_running
+            and any(waiter.priority == "interactive" for waiter in self.waiting)
+        )
+
+    async def yield_slot(self, ticket: Ticket) -> float:
+        """
+        Give a running run's slot to the next waiter and queue it again.
+
+        The run keeps its fair-queueing tags, so it resumes ahead of batch
+        work that arrived after it.
+
+        Returns:
+            Seconds spent waiting to resume
+        """
+        self.stats["yields"] += 1
+        self._end_stretch(ticket)
+        paused = time.monotonic()
+        await self._queue(ticket)
+        return time.monotonic() - paused
+
+    def _release(self, ticket: Ticket) -> None:
+        if ticket in self.waiting:
+            self.waiting.remove(ticket)
+        if ticket.state == "running":
+            self._end_stretch(ticket)
+            self.run_seconds = 0.8 * self.run_seconds + 0.2 * ticket.ran_seconds
+        ticket.state = "released"
+        self.tickets.discard(ticket)
+        if not any(other.tenant == ticket.tenant for other in self.tickets):
+            # An idle tenant's tags are at or below virtual time, so there is nothing to remember
+            for priority in PRIORITIES:
+                self._last_finish.pop((priority, ticket.tenant), None)
+        self._dispatch()
+
+    def snapshot(self) -> Dict[str, Any]:
+        started = self.stats["started"]
+        now = time.monotonic()
+        tenants: Dict[str, Dict[str, int]] = {}
+        for ticket in self.tickets:
+            counts = tenants.setdefault(ticket.tenant or "anonymous", {"running": 0, "queued": 0, "uploading": 0})
+            counts[{"running": "running", "waiting": "queued"}.get(ticket.state, "uploading")] += 1
+        lanes = {}
+        for priority in PRIORITIES:
+            waiters = [ticket for ticket in self.waiting if ticket.priority == priority]
+            lane = self._lane_waits[priority]
+            lanes[priority] = {
+                "running": sum(1 for ticket in self.tickets if ticket.priority == priority and ticket.state == "running"),
+                "queued": len(waiters),
+                "oldest_wait_seconds": round(now - min(ticket.queued_at for ticket in waiters), 1) if waiters else 0.0,
+                "avg_wait_seconds": round(lane["total_wait"] / lane["started"], 2) if lane["started"] else 0.0,
+            }
+        return {
+            "max_concurrent_runs": self.max_running,
+            "max_queued_runs": self.max_queued,
+            "max_runs_per_tenant": self.tenant_limit,
+            "running": self.running,
+            "queued": len(self.waiting),
+            "uploading": len(self.tickets) - self.running - len(self.waiting),
+            "admitted": self.stats["admitted"],
+            "rejected": self.stats["rejected"],
+            "rejected_tenant_limit": self.stats["rejected_tenant_limit"],
+            "yields": self.stats["yields"],
+            "avg_wait_seconds": round(self.stats["total_wait"] / started, 2) if started else 0.0,
+            "max_wait_seconds": round(self.stats["max_wait"], 2),
+            "est_run_seconds": round(self.run_seconds, 1),
+            "lanes": lanes,
+            "tenants": tenants,
+        }
+
+
+controller = AdmissionController()
+
+
+def request_tenant(client: str, headers: Dict[str, str]) -> str:
+    """
+    The tenant a request is scheduled as.
+
+    A direct client is its own address. A request from a trusted proxy is
+    the X-Tenant it names, else the client address the proxy appended to
+    X-Forwarded-For (the last entry; earlier ones come from the client).
+
+    Args:
+        client: Address of the connecting peer
+        headers: Request headers, lower-case names
+
+    Returns:
+        The tenant name ("" if unknown)
+    """
+    if client not in TRUSTED_PROXIES:
+        return client
+    forwarded = headers.get(FORWARDED_HEADER, "").split(",")[-1].strip()
+    return headers.get(TENANT_HEADER, "").strip() or forwarded or client
+
+
+async def stage_boundary(stage: str) -> None:
+    """
+    Let waiting interactive runs overtake the current run if it is batch work.
+
+    Called by the orchestrator between stages; a no-op outside admitted
+    requests and for interactive runs.
+
+    Args:
+        stage: The stage about to start, for logs
+    """
+    ticket = _ticket.get()
+    if ticket is None or not controller.should_yield(ticket):
+        return
+    print(f"⏸️  Batch run pausing before {stage} for interactive work")
+    waited = await controller.yield_slot(ticket)
+    print(f"▶️  Batch run resuming {stage} after {waited:.1f}s")
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware that admits or rejects pipeline requests before their body is read.
+
+    Priority comes from the X-Priority header (default: interactive) and the
+    tenant from request_tenant(). Admitted requests get
+    their Ticket in request.state.admission; the route waits on it before
+    starting the run. Capacity is released when the response is done.
+    """
+
+    def __init__(self, app, path: str = "/api/generate"):
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+        priority = headers.get(PRIORITY_HEADER, "").strip().lower() or "interactive"
+        tenant = request_tenant((scope.get("client") or ("",))[0], headers)
+        if priority not in PRIORITIES:
+            response = JSONResponse(
+                {"detail": f"Unknown priority '{priority}' (expected one of: {', '.join(PRIORITIES)})"},
+                status_code=400
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            ticket = controller.reserve(priority, tenant)
+        except AdmissionRejected as e:
+            print(f"🚫 Rejected {priority} run for {tenant or 'anonymous'}: {len(controller.tickets)} runs already admitted ({controller.running} running)")
+            response = JSONResponse({"detail": str(e)}, status_code=429, headers={"Retry-After": str(e.retry_after)})
+            await response(scope, receive, send)
+            return
+
+        scope.setdefault("state", {})["admission"] = ticket
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            ticket.release()
+
+
+def admission_stats() -> Dict[str, Any]:
+    """Running and queued runs per lane and tenant, rejections and queue wait times."""
+    return controller.snapshot()
@@ -0,0 +1,185 @@
+"""
+Company knowledge cache.
+Stores scraped website text and its summary per normalized company domain,
+so popular target companies skip the scrape + GPT-4o summary. Stale entries
+are served immediately and refreshed in the background.
+"""
+
+import os
+import json
+import time
+import asyncio
+import contextvars
+import hashlib
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .website_scraper import scrape_website, crawl_website, crawl_enabled
+from .summarization import summarize_company_website, summary_format, website_max_chars
+from .single_flight import single_flight
+from .model_routing import current_tier
+
+# Entries younger than this are served as-is
+CACHE_TTL = float(os.getenv("COMPANY_CACHE_TTL", str(24 * 3600)))
+
+# Entries older than TTL but younger than this are served while being refreshed
+CACHE_MAX_STALE = float(os.getenv("COMPANY_CACHE_MAX_STALE", str(30 * 24 * 3600)))
+
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.getenv("HIRESONG_DATA_DIR", os.path.join(_current_dir, '..', '..', 'data'))
+CACHE_DIR = os.path.join(DATA_DIR, 'company_cache')
+
+# Keep references to background refreshes so they aren't garbage collected
+_refreshing: Dict[str, asyncio.Task] = {}
+
+
+def cache_enabled() -> bool:
+    """Whether the company cache is turned on (COMPANY_CACHE=0 disables it)."""
+    return os.getenv("COMPANY_CACHE", "1").lower() not in ("0", "false", "no")
+
+
+def normalize_domain(url: str) -> str:
+    """
+    Cache key for a company URL.
+
+    Strips the scheme, a leading "www.", the fragment and trailing slashes, and
+    lowercases the host, so "https://www.Anthropic.com/" and "anthropic.com"
+    share an entry.
+    """
+    url = url.strip()
+    if "://" not in url:
+        url = "http://" + url
+    parts = urlsplit(url)
+
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+
+    key = host + parts.path.rstrip("/")
+    if parts.query:
+        key += "?" + parts.query
+    return key
+
+
+def _cache_key(domain: str) -> str:
+    """Cache and single-flight key: summaries from different model tiers are kept apart."""
+    return f"{domain}:{current_tier()}"
+
+
+def _cache_path(domain: str) -> str:
+    """File holding the cache entry for a domain in the current tier."""
+    digest = hashlib.sha1(_cache_key(domain).encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, f"{digest}.json")
+
+
+def load_entry(domain: str) -> Optional[Dict[str, Any]]:
+    """Read a cache entry, or None if there isn't a usable one (or its summary is in another format)."""
+    path = _cache_path(domain)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if (
+        entry.get("domain") != domain
+        or entry.get("tier") != current_tier()
+        or entry.get("summary_format", "prose") != summary_format()
+    ):
+        return None
+    return entry
+
+
+def save_entry(domain: str, url: str, website_text: str, summary: str) -> None:
+    """Write a cache entry atomically."""
+    entry = {
+        "domain": domain,
+        "url": url,
+        "website_text": website_text,
+        "summary": summary,
+        "summary_format": summary_format(),
+        "tier": current_tier(),
+        "fetched_at": time.time(),
+    }
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = _cache_path(domain)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️  Warning: Could not write company cache: {str(e)}")
+
+
+async def _fetch(url: str) -> Tuple[str, str]:
+    """Scrape and summarize a company website."""
+    loop = asyncio.get_running_loop()
+    if crawl_enabled():
+        website_text = await crawl_website(url, max_chars=website_max_chars())
+    else:
+        website_text = await loop.run_in_executor(None, scrape_website, url, website_max_chars())
+    # Summarize in a copy of this context so the run's model tier applies
+    summary = await loop.run_in_executor(None, contextvars.copy_context().run, summarize_company_website, website_text)
+    return website_text, summary
+
+
+async def _fetch_and_store(domain: str, url: str) -> Tuple[str, str]:
+    """Scrape and summarize a company website, then cache the result (once per domain at a time)."""
+    async def work():
+        website_text, summary = await _fetch(url)
+        save_entry(domain, url, website_text, summary)
+        return website_text, summary
+
+    return await single_flight(f"company:{_cache_key(domain)}", work)
+
+
+def _refresh_in_background(domain: str, url: str) -> None:
+    """Start a background refresh for a domain unless one is already running."""
+    key = _cache_key(domain)
+    if key in _refreshing:
+        return
+
+    async def refresh():
+        try:
+            await _fetch_and_store(domain, url)
+            print(f"🔄 Refreshed company cache for {domain}")
+        except Exception as e:
+            print(f"⚠️  Background refresh failed for {domain}: {str(e)}")
+        finally:
+            _refreshing.pop(key, None)
+
+    _refreshing[key] = asyncio.get_running_loop().create_task(refresh())
+
+
+async def get_company_knowledge(url: str) -> Tuple[str, str]:
+    """
+    Get scraped website text and company summary, using the cache when possible.
+
+    Fresh entries are returned directly. Stale entries (older than the TTL but
+    within the max-stale window) are returned directly too, and refreshed in
+    the background for the next run. Anything else is fetched now.
+
+    Args:
+        url: Company website URL
+
+    Returns:
+        Tuple of (website_text, company_summary)
+    """
+    if not cache_enabled():
+        return await single_flight(f"company:{_cache_key(normalize_domain(url))}", lambda: _fetch(url))
+
+    domain = normalize_domain(url)
+    entry = load_entry(domain)
+
+    if entry:
+        age = time.time() - entry["fetched_at"]
+        if age < CACHE_TTL:
+            print(f"⚡ Company cache hit for {domain} ({age / 3600:.1f}h old)")
+            return entry["website_text"], entry["summary"]
+        if age < CACHE_MAX_STALE:
+            print(f"⚡ Company cache stale for {domain} ({age / 3600:.1f}h old) - serving and refreshing")
+            _refresh_in_background(domain, url)
+            return entry["website_text"], entry["summary"]
+
+    print(f"Company cache miss for {domain}")
+    return await _fetch_and_store(domain, url)
@@ -0,0 +1,359 @@
+"""
+Process-wide concurrency limits per provider endpoint.
+Every run fires its image, video and music jobs at once, so concurrent runs
+overrun fal and ElevenLabs limits and get throttled. Calls to a limited
+endpoint wait for a slot here; waiting calls are served round-robin across
+runs, so one run can't starve the others. Limits adapt with AIMD: they grow
+slowly while calls are queueing and halve when the provider answers 429.
+
+With CONCURRENCY_SHARED=1 the slots are also leased in a SQLite file, so
+several worker processes on one host share the same limits.
+
+Waiting for a slot blocks a thread, so limited calls run on their own pool
+(run_provider_call) rather than the event loop's default executor, which
+uploads, preflight checks and database calls need.
+"""
+
+import os
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+import contextvars
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# endpoint -> (starting limit, ceiling); the floor is always 1
+LIMITS = {
+    "fal:nano-banana": (int(os.getenv("FAL_IMAGE_CONCURRENCY", "8")), int(os.getenv("FAL_IMAGE_MAX_CONCURRENCY", "16"))),
+    "fal:kling": (int(os.getenv("FAL_VIDEO_CONCURRENCY", "6")), int(os.getenv("FAL_VIDEO_MAX_CONCURRENCY", "12"))),
+    "elevenlabs:music": (int(os.getenv("ELEVENLABS_CONCURRENCY", "2")), int(os.getenv("ELEVENLABS_MAX_CONCURRENCY", "4"))),
+}
+
+# After a 429 the limit is multiplied by this, at most once per cooldown
+DECREASE_FACTOR = float(os.getenv("CONCURRENCY_DECREASE_FACTOR", "0.5"))
+DECREASE_COOLDOWN = float(os.getenv("CONCURRENCY_DECREASE_COOLDOWN", "10"))
+
+# Calls that waited at least this long count as demand for a higher limit
+QUEUE_WAIT_THRESHOLD = float(os.getenv("CONCURRENCY_QUEUE_WAIT", "0.5"))
+
+# Threads for limited provider calls (running or waiting for a slot); enough for
+# every run's images and music at once. Calls beyond it queue without holding a slot
+PROVIDER_THREADS = int(os.getenv("PROVIDER_THREADS", "32"))
+
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.getenv("HIRESONG_DATA_DIR", os.path.join(_current_dir, '..', '..', 'data'))
+SHARED_DB_FILE = os.path.join(DATA_DIR, 'concurrency.db')
+SHARED_POLL_INTERVAL = 0.25
+
+_run = contextvars.ContextVar("concurrency_run", default="")
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def shared_limits_enabled() -> bool:
+    """Whether slots are also leased across processes (CONCURRENCY_SHARED=1)."""
+    return os.getenv("CONCURRENCY_SHARED", "0").lower() in ("1", "true", "yes")
+
+
+def set_run(run_id: str) -> None:
+    """Tag calls made in the current context with a run, for fair queueing."""
+    _run.set(run_id)
+
+
+class SlotTimeout(Exception):
+    """No slot became free before the call's deadline."""
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit with round-robin queueing across runs."""
+
+    def __init__(self, name: str, initial: int, maximum: int):
+        self.name = name
+        self.limit = float(max(1, initial))
+        self.maximum = max(maximum, initial, 1)
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self._waiting: "OrderedDict[str, deque]" = OrderedDict()  # run -> tickets, in arrival order
+        self._granted = set()
+        self._last_decrease = 0.0
+        self.stats = {"calls": 0, "throttled": 0, "timeouts": 0, "queued": 0, "total_wait": 0.0, "max_wait": 0.0}
+
+    def _dispatch(self) -> None:
+        """Grant free slots to waiting runs in turn (call with the lock held)."""
+        while self._waiting and self.in_flight < int(self.limit):
+            run, tickets = next(iter(self._waiting.items()))
+            self._granted.add(tickets.popleft())
+            self.in_flight += 1
+            del self._waiting[run]
+            if tickets:
+                self._waiting[run] = tickets  # Back of the line
+        self._cond.notify_all()
+
+    def acquire(self, timeout: float) -> float:
+        """
+        Wait for a slot.
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            SlotTimeout: If no slot was free within timeout seconds
+        """
+        started = time.monotonic()
+        ticket = object()
+        with self._cond:
+            self._waiting.setdefault(_run.get(), deque()).append(ticket)
+            self._dispatch()
+            while ticket not in self._granted:
+                remaining = timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._drop(ticket)
+                    self.stats["timeouts"] += 1
+                    raise SlotTimeout(f"No {self.name} slot free within {timeout:.0f}s")
+                self._cond.wait(remaining)
+            self._granted.discard(ticket)
+
+            waited = time.monotonic() - started
+            self.stats["calls"] += 1
+            self.stats["total_wait"] += waited
+            self.stats["max_wait"] = max(self.stats["max_wait"], waited)
+            if waited >= QUEUE_WAIT_THRESHOLD:
+                self.stats["queued"] += 1
+            return waited
+
+    def try_acquire(self) -> bool:
+        """Take a free slot without waiting; never ahead of calls already queued."""
+        with self._cond:
+            if self._waiting or self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            self.stats["calls"] += 1
+            return True
+
+    def _drop(self, ticket) -> None:
+        for run, tickets in list(self._waiting.items()):
+            if ticket in tickets:
+                tickets.remove(ticket)
+                if not tickets:
+                    del self._waiting[run]
+                return
+
+    def release(self, waited: float, throttled: bool) -> None:
+        """Free a slot and adapt the limit: halve on 429, grow slowly while calls queue."""
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                self.stats["throttled"] += 1
+                if now - self._last_decrease >= DECREASE_COOLDOWN:
+                    self._last_decrease = now
+                    self.limit = max(1.0, self.limit * DECREASE_FACTOR)
+                    print(f"🚦 {self.name} throttled: concurrency limit lowered to {int(self.limit)}")
+            elif waited >= QUEUE_WAIT_THRESHOLD and self.limit < self.maximum:
+                previous = int(self.limit)
+                self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+                if int(self.limit) > previous:
+                    print(f"🚦 {self.name} concurrency limit raised to {int(self.limit)}")
+            self._dispatch()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            calls = self.stats["calls"]
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "waiting": sum(len(tickets) for tickets in self._waiting.values()),
+                "runs_waiting": len(self._waiting),
+                "calls": calls,
+                "queued_calls": self.stats["queued"],
+                "throttled": self.stats["throttled"],
+                "timeouts": self.stats["timeouts"],
+                "avg_wait_seconds": round(self.stats["total_wait"] / calls, 2) if calls else 0.0,
+                "max_wait_seconds": round(self.stats["max_wait"], 2),
+            }
+
+
+_limiters = {name: AdaptiveLimiter(name, initial, maximum) for name, (initial, maximum) in LIMITS.items()}
+
+_local = threading.local()
+
+
+def _shared_db() -> sqlite3.Connection:
+    """This thread's connection to the shared lease table."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        conn = sqlite3.connect(SHARED_DB_FILE, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS leases (id TEXT PRIMARY KEY, endpoint TEXT NOT NULL, expires_at REAL NOT NULL)")
+        _local.conn = conn
+    return conn
+
+
+def _try_lease_shared(endpoint: str, limit: int, timeout: float) -> Optional[str]:
+    """Take one of `limit` host-wide slots if one is free now; returns the lease id, or None."""
+    conn = _shared_db()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+        held = conn.execute("SELECT COUNT(*) FROM leases WHERE endpoint = ?", (endpoint,)).fetchone()[0]
+        if held >= limit:
+            conn.execute("COMMIT")
+            return None
+        lease_id = uuid.uuid4().hex
+        conn.execute(
+            "INSERT INTO leases (id, endpoint, expires_at) VALUES (?, ?, ?)",
+            (lease_id, endpoint, now + timeout + 60)
+        )
+        conn.execute("COMMIT")
+        return lease_id
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _lease_shared(endpoint: str, limit: int, timeout: float) -> str:
+    """
+    Take one of `limit` host-wide slots for an endpoint.
+
+    Leases expire after the call's timeout, so a crashed process can't hold
+    slots forever.
+
+    Raises:
+        SlotTimeout: If no slot was free in time
+    """
+    expires = time.monotonic() + timeout
+    while True:
+        lease_id = _try_lease_shared(endpoint, limit, timeout)
+        if lease_id:
+            return lease_id
+        if time.monotonic() + SHARED_POLL_INTERVAL > expires:
+            raise SlotTimeout(f"No shared {endpoint} slot free within {timeout:.0f}s")
+        time.sleep(SHARED_POLL_INTERVAL)
+
+
+def _release_shared(lease_id: str) -> None:
+    try:
+        _shared_db().execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+    except Exception as e:
+        print(f"⚠️  Warning: Could not release shared slot: {str(e)}")
+
+
+def run_limited(endpoint: str, timeout: float, func: Callable[[float], Any], is_throttle: Callable[[Exception], bool]) -> Any:
+    """
+    Run func once a slot for the endpoint is free.
+
+    Args:
+        endpoint: Key in LIMITS (e.g. "fal:kling")
+        timeout: Seconds allowed for waiting plus the call
+        func: Makes the call; receives the seconds left after waiting
+        is_throttle: Tells whether an error was the provider throttling (429)
+
+    Returns:
+        Whatever func returns
+
+    Raises:
+        SlotTimeout: If no slot became free in time
+    """
+    limiter = _limiters[endpoint]
+    waited = limiter.acquire(timeout)
+    lease_id = None
+    throttled = False
+    try:
+        if shared_limits_enabled():
+            started = time.monotonic()
+            lease_id = _lease_shared(endpoint, int(limiter.limit), timeout - waited)
+            waited += time.monotonic() - started
+        if waited >= QUEUE_WAIT_THRESHOLD:
+            print(f"⏳ Waited {waited:.1f}s for a {endpoint} slot")
+        return func(timeout - waited)
+    except Exception as e:
+        throttled = is_throttle(e)
+        raise
+    finally:
+        if lease_id:
+            _release_shared(lease_id)
+        limiter.release(waited, throttled)
+
+
+def try_acquire_slot(endpoint: str, timeout: float) -> Optional[Callable[[bool], None]]:
+    """
+    Take an extra slot for an endpoint without waiting (e.g. for a hedged request).
+
+    Args:
+        endpoint: Key in LIMITS
+        timeout: Longest the slot may be held (lease expiry when shared)
+
+    Returns:
+        A release(throttled) function to call when the call is done, or None
+        if no slot is free right now
+    """
+    limiter = _limiters[endpoint]
+    if not limiter.try_acquire():
+        return None
+    lease_id = None
+    if shared_limits_enabled():
+        try:
+            lease_id = _try_lease_shared(endpoint, int(limiter.limit), timeout)
+        except Exception as e:
+            print(f"⚠️  Warning: Could not lease shared slot: {str(e)}")
+        if not lease_id:
+            limiter.release(0.0, False)
+            return None
+
+    released = []
+
+    def release(throttled: bool = False) -> None:
+        if released:
+            return
+        released.append(True)
+        if lease_id:
+            _release_shared(lease_id)
+        limiter.release(0.0, throttled)
+
+    return release
+
+
+def _provider_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, PROVIDER_THREADS), thread_name_prefix="provider")
+        return _executor
+
+
+async def run_provider_call(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking provider call (one that may wait for a slot) on the provider thread pool.
+
+    The call runs in a copy of the caller's context, like run_sync_in_thread,
+    so run tags and model tiers carry over.
+
+    Returns:
+        Whatever func returns
+    """
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        _provider_executor(), lambda: context.run(func, *args, **kwargs)
+    )
+
+
+def shutdown_provider_pool() -> None:
+    """Stop the provider thread pool; calls still queued for a thread are cancelled."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def concurrency_stats() -> Dict[str, Any]:
+    """Current limit, load, queue and throttle counters per endpoint."""
+    return {
+        "shared": shared_limits_enabled(),
+        "endpoints": {name: limiter.snapshot() for name, limiter in _limiters.items()},
+    }
@@ -1,16 +1,35 @@
 """
-Google Sheets database service for HireSong.
-Stores all pipeline runs and their results in a Google Sheet.
+Database service for HireSong.
+Stores all pipeline runs in a local SQLite store (the system of record) and
+mirrors them asynchronously to a Google Sheet for easy browsing.
 """
 
 import os
 import json
+import threading
+import time
 import gspread
+from gspread.utils import rowcol_to_a1
 from google.oauth2.service_account import Credentials
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 
+from .db_queue import enqueue_run_fields
+from .sheets_quota import sheets_call
+from .sheets_emulator import emulator_enabled, get_emulated_sheet
+from .run_store import (
+    COLUMNS,
+    upsert_run,
+    fetch_all_runs,
+    fetch_run,
+    query_runs,
+    import_sheet_rows,
+    unfinished_sheet_rows,
+    get_sync_state,
+    set_sync_state
+)
+
 # Load environment variables
 load_dotenv()
 
@@ -25,36 +44,50 @@ SCOPES = [
     "https://www.googleapis.com/auth/drive",
 ]
 
-# Sheet columns (header row)
-COLUMNS = [
-    "Timestamp",
-    "Run ID",
-    "Company URL",
-    "Genre",
-    "Status",
-    "CV Summary",
-    "Company Summary",
-    "Song Title",
-    "Song Genre",
-    "BPM",
-    "Mood",
-    "Scene 1 Lyrics",
-    "Scene 2 Lyrics",
-    "Scene 3 Lyrics",
-    "Scene 4 Lyrics",
-    "Scene 5 Lyrics",
-    "Scene 6 Lyrics",
-    "Output Directory",
-    "Final Video Path",
-    "Music URL",
-    "Image URLs",
-    "Video URLs",
-    "Notes"
-]
+# Maximum characters per cell in the Sheets mirror (SQLite keeps full values)
+SHEET_CELL_LIMITS = {
+    "CV Summary": 500,
+    "Company Summary": 500,
+    "Song Title": 200,
+    "Mood": 100,
+    **{f"Scene {i} Lyrics": 200 for i in range(1, 7)},
+}
+
+
+# Minimum seconds between history syncs from the Sheets mirror
+HISTORY_SYNC_INTERVAL = float(os.getenv("HISTORY_SYNC_INTERVAL", "30"))
+
+
+def _sheets_mirror_enabled() -> bool:
+    """Mirror runs to Google Sheets unless disabled or no credentials exist."""
+    if os.getenv("SHEETS_MIRROR", "1").lower() in ("0", "false", "no"):
+        return False
+    if emulator_enabled():
+        return True
+    return bool(os.getenv('GOOGLE_APPLICATION_CREDENTIALS_JSON')) or os.path.exists(SERVICE_ACCOUNT_FILE)
+
+
+_sheet = None
+_sheet_lock = threading.Lock()
 
 
 def _get_sheet():
+    """Get the authenticated worksheet, connecting once per process."""
+    global _sheet
+    with _sheet_lock:
+        if _sheet is None:
+            _sheet = _connect_sheet()
+        return _sheet
+
+
+def _connect_sheet():
     """Get authenticated Google Sheets client and worksheet."""
+    if emulator_enabled():
+        sheet = get_emulated_sheet()
+        if not sheet.all_rows():
+            sheet.seed_rows([COLUMNS])
+        return sheet
+    
     try:
         # First, try to get credentials from environment variable (for Railway deployment)
         creds_json_str = os.getenv('GOOGLE_APPLICATION_CREDENTIALS_JSON')
@@ -80,7 +113,7 @@ def _get_sheet():
             print("✅ Using Google credentials from file")
         
         client = gspread.authorize(creds)
-        sheet = client.open_by_key(SHEET_ID).sheet1
+        sheet = sheets_call(client.open_by_key, SHEET_ID).sheet1
         return sheet
         
     except FileNotFoundError as e:
@@ -104,10 +137,10 @@ def initialize_sheet():
     
     try:
         # Check if header row exists
-        first_row = sheet.row_values(1)
+        first_row = sheets_call(sheet.row_values, 1)
         if not first_row or first_row[0] != "Timestamp":
             # Write header row
-            sheet.insert_row(COLUMNS, 1)
+            sheets_call(sheet.insert_row, COLUMNS, 1)
             print("✅ Initialized Google Sheets database with headers")
         else:
             print("✅ Google Sheets database already initialized")
@@ -117,6 +150,149 @@ def initialize_sheet():
         return False
 
 
+def _now() -> str:
+    """Current time formatted for the sheet."""
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _start_fields(run_id: str, company_url: str, genre: Optional[str]) -> Dict[str, str]:
+    """Column values written when a run starts."""
+    return {
+        "Timestamp": _now(),
+        "Run ID": run_id,
+        "Company URL": company_url,
+        "Genre": genre or "AI Selected",
+        "Status": "In Progress",
+        "Notes": "Pipeline started",
+    }
+
+
+def _progress_fields(
+    cv_summary: Optional[str] = None,
+    company_summary: Optional[str] = None,
+    song_data: Optional[Dict[str, Any]] = None,
+    output_dir: Optional[str] = None
+) -> Dict[str, str]:
+    """Column values for intermediate results."""
+    fields = {}
+    if cv_summary:
+        fields["CV Summary"] = cv_summary
+    if company_summary:
+        fields["Company Summary"] = company_summary
+    if song_data:
+        fields["Song Title"] = song_data.get('song_title', '')
+        fields["Song Genre"] = song_data.get('genre', '')
+        fields["BPM"] = str(song_data.get('bpm', ''))
+        fields["Mood"] = song_data.get('mood', '')
+        for i, scene in enumerate(song_data.get('scenes', [])[:6]):
+            fields[f"Scene {i + 1} Lyrics"] = scene.get('lyrics', '')
+    if output_dir:
+        fields["Output Directory"] = output_dir
+    return fields
+
+
+def _completion_fields(
+    final_video_path: str,
+    music_url: str,
+    image_urls: list,
+    video_urls: list,
+    status: str
+) -> Dict[str, str]:
+    """Column values written when a run finishes (URLs joined with newlines)."""
+    return {
+        "Status": status,
+        "Final Video Path": final_video_path,
+        "Music URL": music_url or "Not uploaded",
+        "Image URLs": "\n".join(image_urls) if image_urls else "",
+        "Video URLs": "\n".join(video_urls) if video_urls else "",
+        "Notes": f"Completed at {_now()}",
+    }
+
+
+def _error_fields(error_message: str) -> Dict[str, str]:
+    """Column values written when a run fails."""
+    return {
+        "Status": "Failed",
+        "Notes": f"Failed at {_now()}: {error_message[:300]}",
+    }
+
+
+def _write_runs_batch(sheet, batch: Dict[str, Dict[str, Any]]) -> List[str]:
+    """
+    Write queued updates for many runs using shared batch requests.
+    
+    Costs at most three API calls however many runs are in the batch: one
+    read of the Run ID column, one batch update for existing rows and one
+    append for new rows.
+    
+    Args:
+        sheet: gspread worksheet
+        batch: run_id -> {"fields": {column: value}, "create": bool}
+        
+    Returns:
+        Run IDs that were skipped because their row doesn't exist
+        
+    Raises:
+        Exception: Any gspread/API error, so callers can retry the batch
+    """
+    run_id_col = COLUMNS.index("Run ID") + 1
+    existing = sheets_call(sheet.col_values, run_id_col)
+    row_for = {run_id: i + 1 for i, run_id in enumerate(existing) if run_id}
+    
+    updates = []
+    new_rows = []
+    missing = []
+    for run_id, entry in batch.items():
+        row_num = row_for.get(run_id)
+        if row_num is None:
+            if not entry["create"]:
+                missing.append(run_id)
+                continue
+            row = [entry["fields"].get(column, "") for column in COLUMNS]
+            row[run_id_col - 1] = run_id
+            new_rows.append(row)
+            continue
+        
+        for column, value in entry["fields"].items():
+            updates.append({
+                "range": rowcol_to_a1(row_num, COLUMNS.index(column) + 1),
+                "values": [[value]],
+            })
+    
+    if updates:
+        sheets_call(sheet.batch_update, updates)
+    if new_rows:
+        sheets_call(sheet.append_rows, new_rows)
+    
+    return missing
+
+
+def _sheet_fields(fields: Dict[str, str]) -> Dict[str, str]:
+    """Truncate long values so they fit in the Sheets mirror."""
+    return {
+        column: value[:SHEET_CELL_LIMITS[column]] if column in SHEET_CELL_LIMITS else value
+        for column, value in fields.items()
+    }
+
+
+def _save_run_fields(run_id: str, fields: Dict[str, str], create: bool = False) -> bool:
+    """Write fields to the local run store, then queue them for the Sheets mirror."""
+    try:
+        if not upsert_run(run_id, fields, create=create):
+            print(f"⚠️  Warning: Run ID {run_id} not found in database")
+            return False
+    except Exception as e:
+        print(f"   ⚠️  Failed to save: {str(e)}")
+        return False
+    
+    print(f"   ✅ Saved to local database")
+    
+    if _sheets_mirror_enabled():
+        enqueue_run_fields(run_id, _sheet_fields(fields), create=create)
+    
+    return True
+
+
 def save_pipeline_start(
     run_id: str,
     company_url: str,
@@ -134,42 +310,8 @@ def save_pipeline_start(
         True if successful, False otherwise
     """
     print(f"📊 Saving to database: Pipeline start (Run ID: {run_id})")
-    sheet = _get_sheet()
-    if not sheet:
-        print("   ⚠️  Skipping - database connection failed")
-        return False
-    
-    try:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        row = [
-            timestamp,                          # Timestamp
-            run_id,                             # Run ID
-            company_url,                        # Company URL
-            genre or "AI Selected",             # Genre
-            "In Progress",                      # Status
-            "",                                 # CV Summary (filled later)
-            "",                                 # Company Summary (filled later)
-            "",                                 # Song Title (filled later)
-            "",                                 # Song Genre (filled later)
-            "",                                 # BPM (filled later)
-            "",                                 # Mood (filled later)
-            "", "", "", "", "", "",             # 6 scene lyrics (filled later)
-            "",                                 # Output Directory (filled later)
-            "",                                 # Final Video Path (filled later)
-            "",                                 # Music URL (filled later)
-            "",                                 # Image URLs (filled later)
-            "",                                 # Video URLs (filled later)
-            "Pipeline started"                  # Notes
-        ]
-        
-        sheet.append_row(row)
-        print(f"   ✅ Saved to Google Sheets")
-        return True
-        
-    except Exception as e:
-        print(f"   ⚠️  Failed to save: {str(e)}")
-        return False
+    fields = _start_fields(run_id, company_url, genre)
+    return _save_run_fields(run_id, fields, create=True)
 
 
 def update_pipeline_progress(
@@ -201,53 +343,8 @@ def update_pipeline_progress(
     if updates:
         print(f"📊 Updating database: {', '.join(updates)}")
     
-    sheet = _get_sheet()
-    if not sheet:
-        print("   ⚠️  Skipping - database connection failed")
-        return False
-    
-    try:
-        # Find the row with this run_id
-        cell = sheet.find(run_id)
-        if not cell:
-            print(f"⚠️  Warning: Run ID {run_id} not found in sheet")
-            return False
-        
-        row_num = cell.row
-        
-        # Update CV summary (column 6)
-        if cv_summary:
-            # Truncate to 500 chars to fit in cell
-            sheet.update_cell(row_num, 6, cv_summary[:500])
-        
-        # Update company summary (column 7)
-        if company_summary:
-            sheet.update_cell(row_num, 7, company_summary[:500])
-        
-        # Update song data (columns 8-17)
-        if song_data:
-            sheet.update_cell(row_num, 8, song_data.get('song_title', '')[:200])
-            sheet.update_cell(row_num, 9, song_data.get('genre', ''))
-            sheet.update_cell(row_num, 10, str(song_data.get('bpm', '')))
-            sheet.update_cell(row_num, 11, song_data.get('mood', '')[:100])
-            
-            # Update scene lyrics (columns 12-17)
-            scenes = song_data.get('scenes', [])
-            for i, scene in enumerate(scenes[:6]):
-                col_num = 12 + i
-                lyrics = scene.get('lyrics', '')[:200]  # Truncate to fit
-                sheet.update_cell(row_num, col_num, lyrics)
-        
-        # Update output directory (column 18)
-        if output_dir:
-            sheet.update_cell(row_num, 18, output_dir)
-        
-        print(f"   ✅ Updated in Google Sheets")
-        return True
-        
-    except Exception as e:
-        print(f"   ⚠️  Failed to update: {str(e)}")
-        return False
+    fields = _progress_fields(cv_summary, company_summary, song_data, output_dir)
+    return _save_run_fields(run_id, fields, create=False)
 
 
 def save_pipeline_completion(
@@ -273,47 +370,8 @@ def save_pipeline_completion(
         True if successful, False otherwise
     """
     print(f"📊 Saving to database: Pipeline completion")
-    sheet = _get_sheet()
-    if not sheet:
-        print("   ⚠️  Skipping - database connection failed")
-        return False
-    
-    try:
-        # Find the row with this run_id
-        cell = sheet.find(run_id)
-        if not cell:
-            print(f"⚠️  Warning: Run ID {run_id} not found in sheet")
-            return False
-        
-        row_num = cell.row
-        
-        # Update status (column 5)
-        sheet.update_cell(row_num, 5, status)
-        
-        # Update final video path (column 19)
-        sheet.update_cell(row_num, 19, final_video_path)
-        
-        # Update music URL (column 20)
-        sheet.update_cell(row_num, 20, music_url or "Not uploaded")
-        
-        # Update image URLs (column 21) - join with newlines for readability
-        image_urls_str = "\n".join(image_urls) if image_urls else ""
-        sheet.update_cell(row_num, 21, image_urls_str)
-        
-        # Update video URLs (column 22) - join with newlines for readability
-        video_urls_str = "\n".join(video_urls) if video_urls else ""
-        sheet.update_cell(row_num, 22, video_urls_str)
-        
-        # Update notes (column 23)
-        completion_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        sheet.update_cell(row_num, 23, f"Completed at {completion_time}")
-        
-        print(f"   ✅ Saved to Google Sheets")
-        return True
-        
-    except Exception as e:
-        print(f"   ⚠️  Failed to save: {str(e)}")
-        return False
+    fields = _completion_fields(final_video_path, music_url, image_urls, video_urls, status)
+    return _save_run_fields(run_id, fields, create=False)
 
 
 def save_pipeline_error(
@@ -331,52 +389,112 @@ def save_pipeline_error(
         True if successful, False otherwise
     """
     print(f"📊 Saving to database: Pipeline error")
-    sheet = _get_sheet()
-    if not sheet:
-        print("   ⚠️  Skipping - database connection failed")
-        return False
+    fields = _error_fields(error_message)
+    return _save_run_fields(run_id, fields, create=False)
+
+
+_last_sync = 0.0
+_sync_lock = threading.Lock()
+
+
+def sync_runs_from_sheet(force: bool = False) -> int:
+    """
+    Incrementally import runs written to the Sheets mirror by other instances.
     
-    try:
-        # Find the row with this run_id
-        cell = sheet.find(run_id)
-        if not cell:
-            print(f"⚠️  Warning: Run ID {run_id} not found in sheet")
-            return False
-        
-        row_num = cell.row
-        
-        # Update status (column 5)
-        sheet.update_cell(row_num, 5, "Failed")
+    Only fetches rows appended since the last sync, plus imported rows that
+    were still in progress (the only ones that can still change). Both are
+    read in a single batch request. Runs written locally are never
+    overwritten. Syncs are throttled to one per HISTORY_SYNC_INTERVAL.
+    
+    Args:
+        force: Sync even if the last sync was recent
         
-        # Update notes (column 23)
-        error_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        error_note = f"Failed at {error_time}: {error_message[:300]}"
-        sheet.update_cell(row_num, 23, error_note)
+    Returns:
+        Number of runs inserted or refreshed
+    """
+    global _last_sync
+    if not _sheets_mirror_enabled():
+        return 0
+    
+    with _sync_lock:
+        if not force and time.monotonic() - _last_sync < HISTORY_SYNC_INTERVAL:
+            return 0
+        _last_sync = time.monotonic()
+        
+        sheet = _get_sheet()
+        if not sheet:
+            return 0
+        
+        try:
+            synced_rows = int(get_sync_state("sheet_rows_synced", "1"))  # Row 1 is the header
+            last_col = rowcol_to_a1(1, len(COLUMNS))[:-1]
+            refresh_rows = unfinished_sheet_rows()
+            
+            ranges = [f"A{synced_rows + 1}:{last_col}"]
+            ranges += [f"A{row}:{last_col}{row}" for row in refresh_rows]
+            value_ranges = sheets_call(sheet.batch_get, ranges)
+            
+            rows = []
+            appended = value_ranges[0] if value_ranges else []
+            for i, values in enumerate(appended):
+                rows.append((synced_rows + 1 + i, dict(zip(COLUMNS, values))))
+            for row_num, value_range in zip(refresh_rows, value_ranges[1:]):
+                if value_range:
+                    rows.append((row_num, dict(zip(COLUMNS, value_range[0]))))
+            
+            changed = import_sheet_rows(rows)
+            set_sync_state("sheet_rows_synced", str(synced_rows + len(appended)))
+            
+            if changed:
+                print(f"📥 Synced {changed} run(s) from Google Sheets")
+            return changed
         
-        print(f"   ✅ Saved to Google Sheets")
-        return True
+        except Exception as e:
+            print(f"⚠️  Warning: Failed to sync runs from Google Sheets: {str(e)}")
+            return 0
+
+
+def list_runs(
+    status: Optional[str] = None,
+    company: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 20
+) -> Dict[str, Any]:
+    """
+    Get a filtered page of run history, newest first.
+    
+    Args:
+        status: Status prefix to match (e.g. "Completed", "Failed")
+        company: Substring of the company URL
+        date_from: Earliest timestamp, inclusive (e.g. "2025-01-01")
+        date_to: Latest timestamp, inclusive
+        page: 1-based page number
+        page_size: Runs per page
         
+    Returns:
+        Dict with runs, total, page and page_size
+    """
+    sync_runs_from_sheet()
+    try:
+        return query_runs(status, company, date_from, date_to, page, page_size)
     except Exception as e:
-        print(f"   ⚠️  Failed to save: {str(e)}")
-        return False
+        print(f"⚠️  Warning: Failed to query runs from database: {str(e)}")
+        return {"runs": [], "total": 0, "page": page, "page_size": page_size}
 
 
 def get_all_runs() -> list:
     """
-    Get all pipeline runs from the sheet.
+    Get all pipeline runs from the local database.
     
     Returns:
-        List of all runs as dictionaries
+        List of all runs as dictionaries (keyed by sheet column headers)
     """
-    sheet = _get_sheet()
-    if not sheet:
-        return []
-    
     try:
-        records = sheet.get_all_records()
-        return records
+        return fetch_all_runs()
     except Exception as e:
-        print(f"⚠️  Warning: Failed to fetch runs from Google Sheets: {str(e)}")
+        print(f"⚠️  Warning: Failed to fetch runs from database: {str(e)}")
         return []
 
 
@@ -384,29 +502,19 @@ def get_run_by_id(run_id: str) -> Optional[Dict[str, Any]]:
     """
     Get a specific pipeline run by its ID.
     
+    Checks the Sheets mirror for new runs if it isn't in the local database.
+    
     Args:
         run_id: Unique identifier for the run
         
     Returns:
         Dictionary with run data, or None if not found
     """
-    sheet = _get_sheet()
-    if not sheet:
-        return None
-    
     try:
-        cell = sheet.find(run_id)
-        if not cell:
-            return None
-        
-        row_values = sheet.row_values(cell.row)
-        headers = sheet.row_values(1)
-        
-        # Create dictionary from headers and values
-        run_data = {headers[i]: row_values[i] for i in range(len(headers))}
-        return run_data
-        
+        run = fetch_run(run_id)
+        if run is None and sync_runs_from_sheet():
+            run = fetch_run(run_id)
+        return run
     except Exception as e:
-        print(f"⚠️  Warning: Failed to fetch run from Google Sheets: {str(e)}")
+        print(f"⚠️  Warning: Failed to fetch run from database: {str(e)}")
         return None
-
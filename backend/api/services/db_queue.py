@@ -0,0 +1,222 @@
+"""
+Write-behind queue for pipeline database logging.
+Buffers run updates in memory, coalesces them per run and flushes them to
+Google Sheets from a background thread, so Sheets latency never blocks the
+pipeline. Pending updates are journaled to disk and replayed on restart.
+"""
+
+import os
+import json
+import threading
+import time
+from typing import Dict, Any, List
+
+from .sheets_quota import SheetsQuotaError
+
+# How long the flusher waits so several updates to one run become one write
+FLUSH_INTERVAL = float(os.getenv("DB_FLUSH_INTERVAL", "2.0"))
+
+# Give up on an update after this many failed flushes
+MAX_ATTEMPTS = int(os.getenv("DB_FLUSH_MAX_ATTEMPTS", "5"))
+
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.getenv("HIRESONG_DATA_DIR", os.path.join(_current_dir, '..', '..', 'data'))
+JOURNAL_FILE = os.path.join(DATA_DIR, 'db_journal.jsonl')
+
+# run_id -> {"fields": {column: value}, "create": bool, "attempts": int}
+_pending: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+_wakeup = threading.Condition(_lock)
+_flush_lock = threading.Lock()  # Keeps flushes (and so writes per run) in order
+_flusher = None
+_journal_loaded = False
+
+
+def _merge(run_id: str, fields: Dict[str, str], create: bool) -> None:
+    """Merge an update into the pending entry for a run. Caller holds the lock."""
+    entry = _pending.setdefault(run_id, {"fields": {}, "create": False, "attempts": 0})
+    entry["fields"].update(fields)
+    entry["create"] = entry["create"] or create
+
+
+def _load_journal() -> None:
+    """Replay updates that were queued but not flushed before the last shutdown."""
+    global _journal_loaded
+    if _journal_loaded:
+        return
+    _journal_loaded = True
+
+    if not os.path.exists(JOURNAL_FILE):
+        return
+
+    replayed = 0
+    with open(JOURNAL_FILE, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Torn write from a crash
+            _merge(record["run_id"], record["fields"], record.get("create", False))
+            replayed += 1
+
+    if replayed:
+        print(f"📒 Replayed {replayed} journaled database update(s) for {len(_pending)} run(s)")
+
+
+def _append_journal(run_id: str, fields: Dict[str, str], create: bool) -> None:
+    """Append one update to the on-disk journal. Caller holds the lock."""
+    try:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        with open(JOURNAL_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"run_id": run_id, "fields": fields, "create": create}) + "\n")
+    except OSError as e:
+        print(f"⚠️  Warning: Could not write database journal: {str(e)}")
+
+
+def _rewrite_journal() -> None:
+    """Compact the journal down to what is still pending. Caller holds the lock."""
+    try:
+        if not _pending:
+            if os.path.exists(JOURNAL_FILE):
+                os.remove(JOURNAL_FILE)
+            return
+
+        os.makedirs(DATA_DIR, exist_ok=True)
+        tmp_path = JOURNAL_FILE + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for run_id, entry in _pending.items():
+                record = {"run_id": run_id, "fields": entry["fields"], "create": entry["create"]}
+                f.write(json.dumps(record) + "\n")
+        os.replace(tmp_path, JOURNAL_FILE)
+    except OSError as e:
+        print(f"⚠️  Warning: Could not compact database journal: {str(e)}")
+
+
+def enqueue_run_fields(run_id: str, fields: Dict[str, str], create: bool = False) -> None:
+    """
+    Queue column updates for a run without touching Google Sheets.
+
+    Args:
+        run_id: Unique identifier for the run
+        fields: Mapping of column header -> value
+        create: Whether the run's row may be created if it does not exist yet
+    """
+    with _lock:
+        _load_journal()
+        _merge(run_id, fields, create)
+        _append_journal(run_id, fields, create)
+        _wakeup.notify()
+
+    start_flusher()
+
+
+def _take_batch() -> Dict[str, Dict[str, Any]]:
+    """Swap out everything pending. Caller holds the lock."""
+    global _pending
+    batch = _pending
+    _pending = {}
+    return batch
+
+
+def _write_batch(batch: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Write a batch of coalesced updates to Google Sheets in shared requests.
+
+    Failed batches are put back on the queue. Quota errors don't count as an
+    attempt, since the governor will let them through once quota frees up.
+    """
+    # Imported here because database.py imports this module
+    from .database import _get_sheet, _write_runs_batch
+
+    sheet = _get_sheet()
+    if not sheet:
+        print("   ⚠️  Database flush skipped - connection failed")
+        _requeue(batch, count_attempt=True)
+        return
+
+    try:
+        missing = _write_runs_batch(sheet, batch)
+    except SheetsQuotaError as e:
+        print(f"   ⏳ Database flush deferred: {str(e)}")
+        _requeue(batch, count_attempt=False)
+        return
+    except Exception as e:
+        print(f"   ⚠️  Database flush failed: {str(e)}")
+        _requeue(batch, count_attempt=True)
+        return
+
+    for run_id in missing:
+        print(f"⚠️  Warning: Run ID {run_id} not found in sheet, update dropped")
+    flushed = len(batch) - len(missing)
+    if flushed:
+        print(f"📊 Flushed {flushed} run update(s) to Google Sheets")
+
+
+def _requeue(failed: Dict[str, Dict[str, Any]], count_attempt: bool = True) -> None:
+    """Put failed entries back, underneath anything queued since."""
+    with _lock:
+        for run_id, entry in failed.items():
+            if count_attempt:
+                entry["attempts"] += 1
+            if entry["attempts"] >= MAX_ATTEMPTS:
+                print(f"❌ Dropping database update for run {run_id} after {MAX_ATTEMPTS} attempts")
+                continue
+            newer = _pending.get(run_id)
+            if newer:
+                entry["fields"].update(newer["fields"])
+                entry["create"] = entry["create"] or newer["create"]
+            _pending[run_id] = entry
+
+
+def flush_pending() -> int:
+    """
+    Flush everything queued right now, blocking until done.
+
+    Returns:
+        Number of runs still pending afterwards (failed writes are kept)
+    """
+    with _flush_lock:
+        with _lock:
+            _load_journal()
+            batch = _take_batch()
+
+        if batch:
+            _write_batch(batch)
+            with _lock:
+                _rewrite_journal()
+
+        with _lock:
+            return len(_pending)
+
+
+def _flush_loop() -> None:
+    """Background flusher: wait for work, let updates coalesce, then write."""
+    while True:
+        with _lock:
+            while not _pending:
+                _wakeup.wait()
+
+        # Let the rest of this pipeline step's updates arrive before writing
+        time.sleep(FLUSH_INTERVAL)
+
+        try:
+            flush_pending()
+        except Exception as e:
+            print(f"⚠️  Database flusher error: {str(e)}")
+
+
+def start_flusher() -> None:
+    """Start the background flusher thread (idempotent)."""
+    global _flusher
+    with _lock:
+        _load_journal()
+        if _flusher and _flusher.is_alive():
+            return
+        _flusher = threading.Thread(target=_flush_loop, name="db-flusher", daemon=True)
+        _flusher.start()
+
+
+def pending_runs() -> List[str]:
+    """Run IDs with updates that have not been written yet."""
+    with _lock:
+        return list(_pending.keys())
@@ -0,0 +1,126 @@
+"""
+Fused lyrics + scene planning using OpenAI Structured Outputs.
+Writes the song and plans its six visual scenes in one call, instead of a
+lyrics call followed by a scene planning call that re-sends everything.
+
+Enable with FUSED_PLANNING=1; the two-call path stays the default.
+"""
+
+import os
+from openai import OpenAI
+from dotenv import load_dotenv
+from pydantic import BaseModel
+from typing import Tuple
+
+from .lyrics_generation import SongStructure, lyrics_system_prompt
+from .scene_planning import ScenePlan, SCENE_PLANNING_PROMPT
+from .model_routing import create_completion, route_for
+from .resilience import ProviderError
+from .token_budget import compact_text, SUMMARY_TOKEN_BUDGET
+
+
+class SongAndScenes(BaseModel):
+    song: SongStructure
+    scene_plan: ScenePlan
+
+
+def fused_planning_enabled() -> bool:
+    """Whether lyrics and scenes come from one call (FUSED_PLANNING=1)."""
+    return os.getenv("FUSED_PLANNING", "0").lower() in ("1", "true", "yes")
+
+
+def _ensure_openai_key():
+    """Load .env and ensure OPENAI_API_KEY is available."""
+    here = os.path.dirname(__file__)
+    dotenv_path = os.path.abspath(os.path.join(here, '..', '..', '.env'))
+    load_dotenv(dotenv_path)
+
+    key = os.getenv("OPENAI_API_KEY")
+    if not key:
+        raise ValueError("OPENAI_API_KEY not found. Please set it in backend/.env")
+    return key
+
+
+def validate_alignment(song: SongStructure, scene_plan: ScenePlan) -> None:
+    """
+    Check that the scene plan covers exactly the song's scenes, in order.
+
+    The song's time ranges are copied onto the visual scenes.
+
+    Raises:
+        Exception: If the scene numbers don't line up
+    """
+    song_nums = [scene.scene_num for scene in song.scenes]
+    plan_nums = [scene.scene_num for scene in scene_plan.scenes]
+    if song_nums != plan_nums or song_nums != list(range(1, len(song_nums) + 1)):
+        raise Exception(f"Scene numbers don't line up: lyrics {song_nums}, visuals {plan_nums}")
+    for lyric_scene, visual_scene in zip(song.scenes, scene_plan.scenes):
+        visual_scene.time_range = lyric_scene.time_range
+
+
+def generate_song_and_scenes(
+    cv_summary: str,
+    company_summary: str,
+    preferred_genre: str = None
+) -> Tuple[SongStructure, ScenePlan]:
+    """
+    Generate the song and its visual scene plan in a single structured call.
+
+    Args:
+        cv_summary: Summary of the candidate's CV
+        company_summary: Summary of the company website
+        preferred_genre: Optional genre preference from user
+
+    Returns:
+        Tuple of (SongStructure, ScenePlan) with matching scene numbers
+
+    Raises:
+        Exception: If the call fails or the scenes don't line up
+    """
+    _ensure_openai_key()
+
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+    system_prompt = f"""You do two jobs in one answer: write the song, then plan its video.
+
+=== PART 1: THE SONG (field "song") ===
+{lyrics_system_prompt(preferred_genre)}
+
+=== PART 2: THE VIDEO (field "scene_plan") ===
+{SCENE_PLANNING_PROMPT}
+
+=== HOW THE PARTS FIT ===
+- Write the song first, then plan one visual scene per song scene
+- scene_plan.scenes must have the same scene_num (1-6) and time_range as song.scenes, in the same order
+- Each visual scene must follow the lyrics of the song scene with the same number"""
+
+    user_prompt = f"""Create a catchy 30-second "hire me" song and its 6 visual scenes for this candidate applying to this company.
+
+CANDIDATE SUMMARY:
+{compact_text(cv_summary, SUMMARY_TOKEN_BUDGET, "CV summary", strip_boilerplate=False)}
+
+COMPANY SUMMARY:
+{compact_text(company_summary, SUMMARY_TOKEN_BUDGET, "company summary", strip_boilerplate=False)}
+
+Remember: {"Create a " + preferred_genre + " song and adjust" if preferred_genre and preferred_genre != "Surprise Me" else "Choose a genre first, then adjust"} the word count per scene to match that genre's natural pacing!"""
+
+    print(f"🎵🎬 Generating lyrics and scene plan in one call ({route_for('fused')['model']})...")
+
+    try:
+        completion = create_completion(client, "fused", [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ], response_format=SongAndScenes)
+    except ProviderError as e:
+        print(f"❌ Fused planning failed: {str(e)}")
+        raise
+    except Exception as e:
+        print(f"❌ Fused planning failed: {str(e)}")
+        raise Exception(f"Failed to generate lyrics and scenes: {str(e)}")
+
+    result = completion.choices[0].message.parsed
+    validate_alignment(result.song, result.scene_plan)
+
+    print(f"✅ Generated song '{result.song.song_title}' ({result.song.genre}) with {len(result.scene_plan.scenes)} scenes")
+
+    return result.song, result.scene_plan
@@ -0,0 +1,226 @@
+"""
+Hedged fal requests.
+A run waits for the slowest of its six images and six videos, so fal's tail
+latency sets the run time. With FAL_HEDGING=1, a job still running after the
+observed HEDGE_PERCENTILE latency of its endpoint gets a duplicate; the first
+result wins and the other job is cancelled. Duplicates are limited by a
+budget that grows with the number of requests.
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+import fal_client
+from fal_client.client import Completed
+
+from .concurrency import try_acquire_slot
+from .resilience import is_throttle
+
+# Hedge once a job has run longer than this fraction of recent jobs...
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.9"))
+# ...but only once there are enough recent jobs to know what "long" is
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "10"))
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", "200"))
+
+# Each request earns this many hedges (at most HEDGE_BURST saved up), so extra
+# spend stays under ~HEDGE_BUDGET of the requests made
+HEDGE_BUDGET = float(os.getenv("HEDGE_BUDGET", "0.1"))
+HEDGE_BURST = float(os.getenv("HEDGE_BURST", "3"))
+
+POLL_INTERVAL = float(os.getenv("HEDGE_POLL_INTERVAL", "1.0"))
+
+_lock = threading.Lock()
+# (application, "queue" | "run") -> recent latencies; queue-API samples come from
+# polling (POLL_INTERVAL granularity, like the hedge trigger), run samples from
+# synchronous fal_client.run calls, so the two are kept apart
+_latencies: Dict[tuple, deque] = {}
+_credit = 1.0
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def hedging_enabled() -> bool:
+    """Whether fal image and video jobs are hedged (FAL_HEDGING=1)."""
+    return os.getenv("FAL_HEDGING", "0").lower() in ("1", "true", "yes")
+
+
+def _count(application: str, key: str) -> None:
+    with _lock:
+        stats = _stats.setdefault(application, {
+            "requests": 0, "hedged": 0, "hedge_wins": 0, "primary_wins": 0, "over_budget": 0, "no_slot": 0,
+            "cancelled": 0
+        })
+        stats[key] += 1
+
+
+def _observe(application: str, seconds: float, mode: str) -> None:
+    with _lock:
+        _latencies.setdefault((application, mode), deque(maxlen=HEDGE_WINDOW)).append(seconds)
+
+
+def hedge_delay(application: str) -> Optional[float]:
+    """
+    Seconds after which a job of this endpoint is hedged, or None without enough samples.
+
+    Uses queue-API samples; until there are enough of those (right after
+    hedging is turned on) it falls back to the fal_client.run samples, which
+    lack the polling delay and so hedge slightly early.
+    """
+    with _lock:
+        for mode in ("queue", "run"):
+            samples = sorted(_latencies.get((application, mode), ()))
+            if len(samples) >= HEDGE_MIN_SAMPLES:
+                return samples[min(len(samples) - 1, int(HEDGE_PERCENTILE * len(samples)))]
+    return None
+
+
+def _earn_budget() -> None:
+    global _credit
+    with _lock:
+        _credit = min(HEDGE_BURST, _credit + HEDGE_BUDGET)
+
+
+def _spend_budget() -> bool:
+    global _credit
+    with _lock:
+        if _credit < 1:
+            return False
+        _credit -= 1
+        return True
+
+
+def _cancel(application: str, handle) -> None:
+    """Ask fal to cancel a queued or running job (best effort)."""
+    try:
+        handle.client.put(handle.cancel_url)
+        _count(application, "cancelled")
+    except Exception as e:
+        print(f"⚠️  Warning: Could not cancel fal request {handle.request_id}: {str(e)}")
+
+
+def _submit_hedge(application: str, arguments: Dict[str, Any], slot: Optional[str], timeout: float):
+    """
+    Submit the duplicate of a slow job under its own concurrency slot.
+
+    Returns:
+        (handle, release) - release(throttled) frees the slot - or None if no
+        slot was free, the hedge budget is used up or the submit failed
+    """
+    release = lambda throttled=False: None
+    if slot:
+        release = try_acquire_slot(slot, timeout)
+        if release is None:
+            _count(application, "no_slot")
+            return None
+    if not _spend_budget():
+        release()
+        _count(application, "over_budget")
+        return None
+    try:
+        return fal_client.submit(application, arguments), release
+    except Exception as e:
+        release(is_throttle(e))
+        print(f"⚠️  Warning: Could not submit hedge for fal {application}: {str(e)}")
+        return None
+
+
+def _run_hedged(application: str, arguments: Dict[str, Any], timeout: float, slot: Optional[str]) -> Any:
+    """Submit a job to the fal queue, hedge it if it runs long, and return the first result."""
+    _count(application, "requests")
+    _earn_budget()
+    expires = time.monotonic() + timeout
+    delay = hedge_delay(application)
+
+    # (handle, submitted at, is the hedge)
+    jobs = [(fal_client.submit(application, arguments), time.monotonic(), False)]
+    primary_submitted = jobs[0][1]
+    release_hedge = lambda throttled=False: None
+    try:
+        while True:
+            for job in list(jobs):
+                handle, submitted, is_hedge = job
+                if not isinstance(handle.status(), Completed):
+                    continue
+                jobs.remove(job)
+                if is_hedge:
+                    release_hedge()
+                try:
+                    result = handle.get()
+                except Exception:
+                    if not jobs:
+                        raise
+                    continue  # The other job may still succeed
+                # One sample per request, timed from the original submission: when the
+                # hedge wins it is a lower bound of the original's latency, but dropping
+                # it would leave only fast jobs in the window and hedge ever earlier
+                _observe(application, time.monotonic() - primary_submitted, "queue")
+                if len(jobs) or is_hedge:
+                    _count(application, "hedge_wins" if is_hedge else "primary_wins")
+                    print(f"🏁 fal {application}: {'hedge' if is_hedge else 'original'} request won")
+                return result
+
+            now = time.monotonic()
+            if now >= expires:
+                _observe(application, now - primary_submitted, "queue")  # Lower bound, as above
+                raise TimeoutError(f"fal {application} timed out after {timeout:.0f}s")
+
+            if delay is not None and len(jobs) == 1 and not jobs[0][2] and now - primary_submitted >= delay:
+                delay = None  # At most one hedge per request
+                hedge = _submit_hedge(application, arguments, slot, expires - now)
+                if hedge:
+                    handle, release_hedge = hedge
+                    print(f"🪃 fal {application}: request slower than p{HEDGE_PERCENTILE * 100:.0f} ({now - primary_submitted:.0f}s), sending a hedge")
+                    _count(application, "hedged")
+                    jobs.append((handle, time.monotonic(), True))
+
+            time.sleep(POLL_INTERVAL)
+    finally:
+        for handle, _, _ in jobs:
+            _cancel(application, handle)
+        release_hedge()
+
+
+def run_fal_job(application: str, arguments: Dict[str, Any], timeout: float, slot: Optional[str] = None) -> Any:
+    """
+    Run a fal application, hedged when FAL_HEDGING=1.
+
+    Without hedging this is a plain fal_client.run. Latencies of unhedged
+    calls are recorded too, so hedging has data as soon as it is turned on.
+
+    Args:
+        application: fal application id (e.g. "fal-ai/nano-banana/edit")
+        arguments: Request arguments
+        timeout: Seconds allowed for the job
+        slot: Concurrency-limited endpoint the caller holds a slot of; a hedge
+              needs a second free slot and is skipped without one
+
+    Returns:
+        The job's result
+    """
+    if hedging_enabled():
+        return _run_hedged(application, arguments, timeout, slot)
+
+    started = time.monotonic()
+    result = fal_client.run(application, arguments=arguments, timeout=timeout)
+    _observe(application, time.monotonic() - started, "run")
+    return result
+
+
+def hedge_stats() -> Dict[str, Any]:
+    """Per-endpoint hedging counters plus the current hedge delay."""
+    with _lock:
+        stats = {application: dict(counters) for application, counters in _stats.items()}
+        applications = {application for application, _ in _latencies} | set(stats)
+        sample_counts = {key: len(samples) for key, samples in _latencies.items()}
+        credit = _credit
+    for application in applications:
+        entry = stats.setdefault(application, {})
+        entry["queue_samples"] = sample_counts.get((application, "queue"), 0)
+        entry["run_samples"] = sample_counts.get((application, "run"), 0)
+        delay = hedge_delay(application)
+        entry["hedge_delay_seconds"] = round(delay, 2) if delay is not None else None
+        hedged = entry.get("hedged", 0)
+        entry["hedge_win_rate"] = round(entry.get("hedge_wins", 0) / hedged, 3) if hedged else None
+    return {"enabled": hedging_enabled(), "budget_credit": round(credit, 2), "endpoints": stats}
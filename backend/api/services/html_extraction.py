@@ -0,0 +1,388 @@
+"""
+HTML text extraction backends for the website scraper.
+Every backend turns a page body into visible text blocks, one per block-level
+element (inline text such as <b> and <a> stays in its paragraph), and
+optionally its links, within a character budget:
+
+- stream: incremental standard-library parser that stops at the budget
+- lxml:   C-accelerated libxml2 parser (needs lxml)
+- bs4:    BeautifulSoup with html.parser (the original scraper)
+- main:   main-content extractor that drops menus, link lists and other boilerplate
+
+Pick one with SCRAPER_EXTRACTOR; the default is lxml when installed, else stream.
+"""
+
+import os
+import re
+import codecs
+import html as html_entities
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:
+    lxml = None
+
+# Elements whose text is never wanted
+SKIP_TAGS = {"script", "style", "nav", "footer", "header", "noscript", "template"}
+
+# Extra elements the main-content extractor treats as boilerplate
+BOILERPLATE_TAGS = SKIP_TAGS | {"aside", "form", "button", "select", "svg", "iframe", "dialog"}
+
+# Elements that start a new paragraph
+BLOCK_TAGS = {
+    "p", "div", "li", "ul", "ol", "section", "article", "main", "td", "th", "tr",
+    "table", "blockquote", "pre", "dd", "dt", "figcaption", "br", "hr",
+    "h1", "h2", "h3", "h4", "h5", "h6",
+}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+# Paragraphs shorter than this, or mostly link text, count as boilerplate
+MIN_PARAGRAPH_CHARS = int(os.getenv("SCRAPER_MIN_PARAGRAPH_CHARS", "40"))
+MAX_LINK_DENSITY = 0.35
+
+# First slice of a page handed to lxml (grown 4x while the budget isn't filled)
+LXML_PREFIX_BYTES = 256 * 1024
+
+# <a href> in raw bytes, for the part of a page lxml didn't parse
+_HREF = re.compile(rb"""<a\s[^>]*?\bhref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE)
+
+Extractor = Callable[[bytes, int, str, bool], Dict[str, List[str]]]
+
+
+def _join(parts: List[str]) -> str:
+    """One whitespace-normalized paragraph from raw text nodes."""
+    return " ".join("".join(parts).split())
+
+
+class _TextCollector(HTMLParser):
+    """
+    Incremental visible-text extractor.
+
+    Joins the text nodes of each block element into one block. Fed the page
+    a chunk at a time; `done` turns True once the character budget is
+    filled so the caller can stop parsing early.
+    """
+
+    def __init__(self, max_chars: int, collect_links: bool = False):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.collect_links = collect_links
+        self.blocks: List[str] = []
+        self.links: List[str] = []
+        self.length = 0
+        self._skip_depth = 0
+        self._parts: List[str] = []
+
+    def _flush(self) -> None:
+        """End the current paragraph."""
+        text = _join(self._parts)
+        self._parts = []
+        if text:
+            self.blocks.append(text)
+
+    @property
+    def done(self) -> bool:
+        # Links (mostly in nav and footer) are wanted from the whole page
+        return self.length >= self.max_chars and not self.collect_links
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._flush()
+            self._skip_depth += 1
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+        elif tag == "a" and self.collect_links:
+            href = dict(attrs).get("href")
+            if href:
+                self.links.append(href)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag not in SKIP_TAGS:
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._skip_depth or self.length >= self.max_chars:
+            return
+        self._parts.append(data)
+        text = " ".join(data.split())
+        if text:
+            self.length += len(text) + 1
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+class _MainContentCollector(_TextCollector):
+    """
+    Incremental main-content extractor.
+
+    Groups text into paragraphs at block elements and keeps only paragraphs
+    that are long enough and not mostly links; a heading is kept when the
+    paragraph after it is.
+    """
+
+    def __init__(self, max_chars: int, collect_links: bool = False):
+        super().__init__(max_chars, collect_links)
+        self._link_chars = 0
+        self._link_depth = 0
+        self._in_heading = False
+        self._heading: Optional[str] = None
+
+    def _flush(self) -> None:
+        """Classify the paragraph collected so far."""
+        text = _join(self._parts)
+        link_chars = self._link_chars
+        in_heading = self._in_heading
+        self._parts, self._link_chars, self._in_heading = [], 0, False
+        if not text or self.length >= self.max_chars:
+            return
+
+        if in_heading:
+            self._heading = text
+            return
+        if len(text) < MIN_PARAGRAPH_CHARS or link_chars > len(text) * MAX_LINK_DENSITY:
+            return
+
+        for block in ([self._heading] if self._heading else []) + [text]:
+            self.blocks.append(block)
+            self.length += len(block) + 1
+        self._heading = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in BOILERPLATE_TAGS:
+            self._skip_depth += 1
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+            self._in_heading = tag in HEADING_TAGS
+        elif tag == "a":
+            self._link_depth += 1
+            href = dict(attrs).get("href")
+            if href and self.collect_links:
+                self.links.append(href)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self._flush()
+        elif tag == "a" and self.collect_links:
+            href = dict(attrs).get("href")
+            if href:
+                self.links.append(href)
+
+    def handle_endtag(self, tag):
+        if tag in BOILERPLATE_TAGS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+        elif tag in BLOCK_TAGS:
+            self._flush()
+        elif tag == "a" and self._link_depth:
+            self._link_depth -= 1
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        self._parts.append(data)
+        if self._link_depth:
+            self._link_chars += len(" ".join(data.split()))
+
+
+def _feed(collector: _TextCollector, html: bytes, encoding: str, chunk_size: int = 16 * 1024) -> Dict[str, List[str]]:
+    """Feed a body to a collector a chunk at a time, stopping once it is done."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    for offset in range(0, len(html), chunk_size):
+        collector.feed(decoder.decode(html[offset:offset + chunk_size]))
+        if collector.done:
+            collector._flush()
+            break
+    else:
+        collector.feed(decoder.decode(b"", final=True))
+        collector.close()
+    return {"blocks": collector.blocks, "links": collector.links}
+
+
+def _extract_stream(html: bytes, max_chars: int, encoding: str, collect_links: bool) -> Dict[str, List[str]]:
+    """Standard-library parser, fed incrementally; stops at the budget."""
+    return _feed(_TextCollector(max_chars, collect_links), html, encoding)
+
+
+def _extract_main(html: bytes, max_chars: int, encoding: str, collect_links: bool) -> Dict[str, List[str]]:
+    """Main content only (long, low-link-density paragraphs and their headings)."""
+    return _feed(_MainContentCollector(max_chars, collect_links), html, encoding)
+
+
+def _extract_bs4(html: bytes, max_chars: int, encoding: str, collect_links: bool) -> Dict[str, List[str]]:
+    """BeautifulSoup with html.parser; always parses the whole page."""
+    soup = BeautifulSoup(html, 'html.parser', from_encoding=encoding)
+    # Collect links first - nav and footer hold most about/careers links
+    links = [a["href"] for a in soup.find_all("a", href=True)] if collect_links else []
+    for element in soup(list(SKIP_TAGS)):
+        element.decompose()
+
+    blocks = []
+    parts: List[str] = []
+    length = 0
+    current_block = None
+    for node in soup.descendants:
+        if isinstance(node, Tag):
+            if node.name in ("br", "hr"):
+                current_block = None  # Forces a new paragraph
+            continue
+        if type(node) is not NavigableString:
+            continue  # Comments, doctypes, CDATA
+        block = next((parent for parent in node.parents if parent.name in BLOCK_TAGS), None)
+        if block is not current_block:
+            text = _join(parts)
+            if text:
+                blocks.append(text)
+            parts, current_block = [], block
+        parts.append(str(node))
+        length += len(" ".join(node.split())) + 1
+        if length >= max_chars:
+            break
+    text = _join(parts)
+    if text:
+        blocks.append(text)
+    return {"blocks": blocks, "links": links}
+
+
+def _lxml_blocks(html: bytes, max_chars: int, encoding: str, links: Optional[List[str]] = None) -> List[str]:
+    """
+    Text blocks of a (possibly truncated) page in document order, up to the budget.
+
+    When a links list is given, the <a href> values of the parsed page are
+    added to it.
+    """
+    # Decode here - libxml2 doesn't know every Python codec name
+    parser = lxml.html.HTMLParser(remove_comments=True, remove_pis=True)
+    try:
+        root = lxml.html.document_fromstring(html.decode(encoding, errors="replace"), parser=parser)
+    except (lxml.etree.ParserError, ValueError):
+        return []
+    if links is not None:
+        links.extend(str(href) for href in root.xpath("//a/@href"))
+
+    blocks = []
+    parts: List[str] = []
+    length = 0
+
+    def flush():
+        text = _join(parts)
+        parts.clear()
+        if text:
+            blocks.append(text)
+
+    walker = lxml.etree.iterwalk(root, events=("start", "end"))
+    for event, element in walker:
+        tag = element.tag if isinstance(element.tag, str) else ""
+        if event == "start":
+            if tag in SKIP_TAGS:
+                flush()
+                walker.skip_subtree()
+                continue
+            if tag in BLOCK_TAGS:
+                flush()
+            text = element.text
+        else:
+            if tag in BLOCK_TAGS or tag in SKIP_TAGS:
+                flush()
+            text = element.tail  # Belongs to the parent, after this element
+        if text:
+            parts.append(text)
+            length += len(" ".join(text.split())) + 1
+            if length >= max_chars:
+                break
+    flush()
+    return blocks
+
+
+def _scan_links(html: bytes, encoding: str) -> List[str]:
+    """<a href> values found by a byte scan, without parsing the page."""
+    links = []
+    for match in _HREF.finditer(html):
+        href = next(group for group in match.groups() if group is not None)
+        links.append(html_entities.unescape(href.decode(encoding, errors="replace")).strip())
+    return links
+
+
+def _extract_lxml(html: bytes, max_chars: int, encoding: str, collect_links: bool) -> Dict[str, List[str]]:
+    """
+    libxml2 parse of a growing prefix of the page, stopping once the budget is filled.
+
+    Links come from the same prefix parse; the rest of the page (where
+    footers with about/careers links usually are) is only scanned for
+    <a href> tags, not parsed.
+    """
+    # Most pages fill the budget early; only parse the rest of a huge page when they don't
+    limit = LXML_PREFIX_BYTES
+    while True:
+        links: Optional[List[str]] = [] if collect_links else None
+        blocks = _lxml_blocks(html[:limit], max_chars, encoding, links)
+        if limit >= len(html) or sum(len(block) + 1 for block in blocks) >= max_chars:
+            break
+        limit *= 4
+
+    if not collect_links:
+        return {"blocks": blocks, "links": []}
+    if limit < len(html):
+        # Start at the tag the prefix may have cut in half
+        links += _scan_links(html[max(0, html.rfind(b"<", 0, limit)):], encoding)
+    return {"blocks": blocks, "links": links}
+
+
+EXTRACTORS: Dict[str, Extractor] = {
+    "stream": _extract_stream,
+    "bs4": _extract_bs4,
+    "main": _extract_main,
+}
+if lxml is not None:
+    EXTRACTORS["lxml"] = _extract_lxml
+
+
+def default_extractor() -> str:
+    """Backend named by SCRAPER_EXTRACTOR, falling back to the fastest available one."""
+    name = os.getenv("SCRAPER_EXTRACTOR", "").strip().lower()
+    if name in EXTRACTORS:
+        return name
+    if name:
+        print(f"⚠️  Unknown or unavailable SCRAPER_EXTRACTOR '{name}', using the default")
+    return "lxml" if "lxml" in EXTRACTORS else "stream"
+
+
+def extract_text(
+    html: bytes,
+    max_chars: int = 10000,
+    encoding: str = "utf-8",
+    collect_links: bool = False,
+    backend: Optional[str] = None
+) -> Dict[str, List[str]]:
+    """
+    Visible text blocks (and optionally links) of a page.
+
+    Args:
+        html: Raw page body
+        max_chars: Character budget for the text
+        encoding: Charset to decode the body with
+        collect_links: Also collect <a href> values
+        backend: Extraction backend (see EXTRACTORS); defaults to default_extractor()
+
+    Returns:
+        Dict with "blocks" (one per text node or paragraph) and "links"
+    """
+    name = backend or default_extractor()
+    if name not in EXTRACTORS:
+        raise Exception(f"Unknown HTML extraction backend '{name}' (available: {', '.join(EXTRACTORS)})")
+    return EXTRACTORS[name](html, max_chars, encoding, collect_links)
@@ -8,6 +8,9 @@ import fal_client
 from dotenv import load_dotenv
 from typing import Dict, Any, Optional
 
+from .resilience import call_with_retry, ProviderError
+from .hedging import run_fal_job
+
 
 def _ensure_fal_key():
     """Load .env and ensure FAL_KEY is available."""
@@ -22,6 +25,30 @@ def _ensure_fal_key():
     return key
 
 
+def upload_image(image_path: str) -> str:
+    """
+    Upload a local image to Fal's storage.
+    
+    Args:
+        image_path: Local file path to the image
+        
+    Returns:
+        Public URL of the uploaded image
+    """
+    _ensure_fal_key()
+    
+    try:
+        print(f"Uploading image: {image_path}")
+        image_url = call_with_retry("fal", lambda remaining: fal_client.upload_file(image_path), label="upload")
+        print(f"Image uploaded: {image_url}")
+        return image_url
+    except ProviderError:
+        raise
+    except Exception as e:
+        print(f"Error uploading image: {str(e)}")
+        raise Exception(f"Failed to upload image to Fal: {str(e)}")
+
+
 def generate_image_from_prompt(
     prompt: str,
     image_path: str,
@@ -45,14 +72,14 @@ def generate_image_from_prompt(
             - description: Text description from the model
     
     Raises:
-        Exception: If the API call fails
+        ProviderError: If the API call fails (TransientProviderError if retrying may help)
     """
     _ensure_fal_key()
     
     try:
         # Upload the local image file to Fal's storage
         print(f"Uploading image: {image_path}")
-        image_url = fal_client.upload_file(image_path)
+        image_url = call_with_retry("fal", lambda remaining: fal_client.upload_file(image_path), label="upload")
         print(f"Image uploaded: {image_url}")
         
         # Prepare arguments for the API
@@ -69,12 +96,19 @@ def generate_image_from_prompt(
         
         print(f"Calling Nano Banana API with prompt: {prompt}")
         
-        # Simple synchronous call - returns when done
-        result = fal_client.run("fal-ai/nano-banana/edit", arguments=arguments)
+        # Synchronous call - returns when done (hedged if FAL_HEDGING=1)
+        result = call_with_retry(
+            "fal",
+            lambda remaining: run_fal_job("fal-ai/nano-banana/edit", arguments, remaining, slot="fal:nano-banana"),
+            label="Nano Banana image",
+            slot="fal:nano-banana"
+        )
         
         print(f"Image generation complete. Generated {len(result.get('images', []))} image(s)")
         return result
         
+    except ProviderError:
+        raise
     except Exception as e:
         print(f"Error in image generation: {str(e)}")
         raise Exception(f"Failed to generate image with Nano Banana: {str(e)}")
@@ -119,12 +153,19 @@ def generate_image_from_url(
         
         print(f"Calling Nano Banana API with prompt: {prompt}")
         
-        # Simple synchronous call - returns when done
-        result = fal_client.run("fal-ai/nano-banana/edit", arguments=arguments)
+        # Synchronous call - returns when done (hedged if FAL_HEDGING=1)
+        result = call_with_retry(
+            "fal",
+            lambda remaining: run_fal_job("fal-ai/nano-banana/edit", arguments, remaining, slot="fal:nano-banana"),
+            label="Nano Banana image",
+            slot="fal:nano-banana"
+        )
         
         print(f"Image generation complete. Generated {len(result.get('images', []))} image(s)")
         return result
         
+    except ProviderError:
+        raise
     except Exception as e:
         print(f"Error in image generation: {str(e)}")
         raise Exception(f"Failed to generate image with Nano Banana: {str(e)}")
@@ -0,0 +1,128 @@
+"""
+Selfie preprocessing before upload.
+Applies EXIF orientation, downscales to a target long edge and recompresses
+as JPEG, so fal gets a small, upright image instead of a multi-megabyte
+phone photo. Results are cached on disk by content hash; selfies are
+personal data, so cached files are deleted after SELFIE_CACHE_TTL seconds
+and the oldest go first once the cache exceeds SELFIE_CACHE_MAX_MB.
+"""
+
+import os
+import time
+from typing import Optional
+
+from PIL import Image, ImageOps
+
+from .single_flight import file_sha256
+
+# Long edge of the uploaded selfie; Nano Banana's output is ~1024px, so this keeps full detail
+SELFIE_MAX_EDGE = int(os.getenv("SELFIE_MAX_EDGE", "1536"))
+SELFIE_JPEG_QUALITY = int(os.getenv("SELFIE_JPEG_QUALITY", "90"))
+
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.getenv("HIRESONG_DATA_DIR", os.path.join(_current_dir, '..', '..', 'data'))
+CACHE_DIR = os.path.join(DATA_DIR, 'selfie_cache')
+
+# Cached selfies are deleted after this many seconds (default one day)...
+CACHE_TTL = float(os.getenv("SELFIE_CACHE_TTL", "86400"))
+# ...or sooner, oldest first, once the cache is larger than this
+CACHE_MAX_BYTES = int(float(os.getenv("SELFIE_CACHE_MAX_MB", "200")) * 1024 * 1024)
+
+
+def preprocessing_enabled() -> bool:
+    """Whether selfies are preprocessed before upload (SELFIE_PREPROCESS=0 disables it)."""
+    return os.getenv("SELFIE_PREPROCESS", "1").lower() not in ("0", "false", "no")
+
+
+def _prepare(image_path: str, output_path: str) -> None:
+    """Orient, downscale and re-encode one image as JPEG."""
+    with Image.open(image_path) as image:
+        # Let the JPEG decoder skip detail we'd throw away anyway
+        image.draft("RGB", (SELFIE_MAX_EDGE, SELFIE_MAX_EDGE))
+        icc_profile = image.info.get("icc_profile")
+        image = ImageOps.exif_transpose(image)
+
+        if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+            # JPEG has no alpha - flatten onto white
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, "white")
+            image.paste(rgba, mask=rgba.getchannel("A"))
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        image.thumbnail((SELFIE_MAX_EDGE, SELFIE_MAX_EDGE), Image.LANCZOS)
+
+        tmp_path = output_path + ".tmp"
+        image.save(
+            tmp_path, "JPEG",
+            quality=SELFIE_JPEG_QUALITY, optimize=True, progressive=True, icc_profile=icc_profile
+        )
+    os.replace(tmp_path, output_path)
+
+
+def evict_cache() -> None:
+    """Delete cached selfies past the TTL, then the oldest ones until the cache fits its size bound."""
+    try:
+        entries = []
+        for name in os.listdir(CACHE_DIR):
+            path = os.path.join(CACHE_DIR, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+    except FileNotFoundError:
+        return
+
+    now = time.time()
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for mtime, size, path in sorted(entries):
+        if now - mtime < CACHE_TTL and total <= CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        total -= size
+    if removed:
+        print(f"🧹 Removed {removed} cached selfies")
+
+
+def preprocess_selfie(image_path: str, content_hash: Optional[str] = None) -> str:
+    """
+    Get an upload-ready copy of a selfie.
+
+    Falls back to the original file if preprocessing is disabled or fails.
+
+    Args:
+        image_path: Path to the uploaded selfie
+        content_hash: SHA-256 of the file, if already known
+
+    Returns:
+        Path to the processed JPEG (cached), or the original path
+    """
+    if not preprocessing_enabled():
+        return image_path
+
+    content_hash = content_hash or file_sha256(image_path)
+    output_path = os.path.join(CACHE_DIR, f"{content_hash}_{SELFIE_MAX_EDGE}_q{SELFIE_JPEG_QUALITY}.jpg")
+    evict_cache()
+    if os.path.exists(output_path):
+        print(f"⚡ Selfie cache hit ({os.path.getsize(output_path) / 1024:.0f} KB)")
+        return output_path
+
+    started = time.perf_counter()
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _prepare(image_path, output_path)
+    except Exception as e:
+        print(f"⚠️  Warning: Could not preprocess selfie, uploading the original: {str(e)}")
+        return image_path
+
+    with Image.open(output_path) as processed:
+        width, height = processed.size
+    print(
+        f"🖼️  Selfie preprocessed: {os.path.getsize(image_path) / 1024:.0f} KB -> "
+        f"{os.path.getsize(output_path) / 1024:.0f} KB ({width}x{height}) "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+    return output_path
@@ -9,6 +9,10 @@ from dotenv import load_dotenv
 from pydantic import BaseModel
 from typing import List
 
+from .model_routing import create_completion, route_for
+from .resilience import ProviderError
+from .token_budget import compact_text, SUMMARY_TOKEN_BUDGET
+
 
 class Scene(BaseModel):
     scene_num: int
@@ -40,28 +44,13 @@ def _ensure_openai_key():
     return key
 
 
-def generate_song_lyrics(cv_summary: str, company_summary: str, preferred_genre: str = None) -> SongStructure:
-    """
-    Generate creative song lyrics based on CV and company summaries.
-    
-    Args:
-        cv_summary: Summary of the candidate's CV with skills and experience
-        company_summary: Summary of the company website with their values and products
-        preferred_genre: Optional genre preference from user (e.g., "Pop", "Rap", "Rock")
-        
-    Returns:
-        SongStructure object with complete song data including 6 scenes
-    """
-    _ensure_openai_key()
-    
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    
-    # Build system prompt with genre constraint if specified
+def lyrics_system_prompt(preferred_genre: str = None) -> str:
+    """System prompt for the songwriter, with the genre constraint if the user chose one."""
     genre_instruction = ""
     if preferred_genre and preferred_genre != "Surprise Me":
         genre_instruction = f"\n\n**IMPORTANT: You MUST create a {preferred_genre} song. This is the user's explicit genre choice.**"
     
-    system_prompt = f"""You are a creative and funny songwriter who creates catchy, memorable 30-second "hire me" pitch songs.
+    return f"""You are a creative and funny songwriter who creates catchy, memorable 30-second "hire me" pitch songs.
 
 Your job is to create a complete song structure with:
 - A catchy title
@@ -83,17 +72,36 @@ CRITICAL LYRICS CONSTRAINTS:
 
 IMPORTANT: Try making it as ridiculus and funny as possible!{genre_instruction}, but also mention things about the person and the company and why the person would be a good fit"""
 
+
+def generate_song_lyrics(cv_summary: str, company_summary: str, preferred_genre: str = None) -> SongStructure:
+    """
+    Generate creative song lyrics based on CV and company summaries.
+    
+    Args:
+        cv_summary: Summary of the candidate's CV with skills and experience
+        company_summary: Summary of the company website with their values and products
+        preferred_genre: Optional genre preference from user (e.g., "Pop", "Rap", "Rock")
+        
+    Returns:
+        SongStructure object with complete song data including 6 scenes
+    """
+    _ensure_openai_key()
+    
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    
+    system_prompt = lyrics_system_prompt(preferred_genre)
+    
     user_prompt = f"""Create a catchy 30-second "hire me" song for this candidate applying to this company.
 
 CANDIDATE SUMMARY:
-{cv_summary}
+{compact_text(cv_summary, SUMMARY_TOKEN_BUDGET, "CV summary", strip_boilerplate=False)}
 
 COMPANY SUMMARY:
-{company_summary}
+{compact_text(company_summary, SUMMARY_TOKEN_BUDGET, "company summary", strip_boilerplate=False)}
 
 Remember: {"Create a " + preferred_genre + " song and adjust" if preferred_genre and preferred_genre != "Surprise Me" else "Choose a genre first, then adjust"} the word count per scene to match that genre's natural pacing!"""
 
-    print("🎵 Generating song lyrics with OpenAI GPT-5 (low reasoning)...")
+    print(f"🎵 Generating song lyrics with OpenAI {route_for('lyrics')['model']}...")
     if preferred_genre and preferred_genre != "Surprise Me":
         print(f"   Genre: {preferred_genre} (user selected)")
     else:
@@ -101,16 +109,11 @@ Remember: {"Create a " + preferred_genre + " song and adjust" if preferred_genre
     print(f"   Using structured outputs to ensure format...")
     
     try:
-        completion = client.beta.chat.completions.parse(
-            model="gpt-5",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format=SongStructure,
-            reasoning_effort="low",  # Low reasoning for creative, fast generation
-            max_completion_tokens=20000  # Budget for the answer tokens
-        )
+        # Model and reasoning budget come from the routing table (gpt-5, low reasoning by default)
+        completion = create_completion(client, "lyrics", [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ], response_format=SongStructure)
         
         song = completion.choices[0].message.parsed
         
@@ -119,6 +122,9 @@ Remember: {"Create a " + preferred_genre + " song and adjust" if preferred_genre
         
         return song
         
+    except ProviderError as e:
+        print(f"❌ Lyrics generation failed: {str(e)}")
+        raise
     except Exception as e:
         print(f"❌ Lyrics generation failed: {str(e)}")
         raise Exception(f"Failed to generate lyrics: {str(e)}")
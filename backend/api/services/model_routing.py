@@ -0,0 +1,208 @@
+"""
+Per-stage model routing for LLM calls.
+Picks the model and parameters of each pipeline stage from a routing table
+keyed by tier, and records latency, tokens and failures of every call in the
+run store so routes can be set from observed data.
+"""
+
+import os
+import json
+import time
+import contextvars
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from .token_budget import count_tokens
+from .run_store import insert_model_call, fetch_model_calls
+from .resilience import call_with_retry
+
+# Inputs shorter than this (in tokens) use a stage's "short" route, if it has one
+SHORT_INPUT_TOKENS = int(os.getenv("ROUTING_SHORT_INPUT_TOKENS", "800"))
+
+DEFAULT_TIER = os.getenv("MODEL_TIER", "standard")
+
+# tier -> stage -> model and call parameters; "short" is an optional cheaper
+# route for inputs under SHORT_INPUT_TOKENS
+ROUTES: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "standard": {
+        "summary_cv": {
+            "model": "gpt-4o", "temperature": 0.3,
+            "short": {"model": "gpt-4o-mini", "temperature": 0.3},
+        },
+        "summary_company": {
+            "model": "gpt-4o", "temperature": 0.3,
+            "short": {"model": "gpt-4o-mini", "temperature": 0.3},
+        },
+        "summary_map": {"model": os.getenv("SUMMARY_MAP_MODEL", "gpt-4o-mini"), "temperature": 0.2},
+        "lyrics": {"model": "gpt-5", "reasoning_effort": "low", "max_completion_tokens": 20000},
+        "scenes": {"model": "gpt-4o-2024-08-06", "temperature": 0.4},
+        "fused": {
+            "model": os.getenv("FUSED_PLANNING_MODEL", "gpt-5"),
+            "reasoning_effort": "low", "max_completion_tokens": 20000,
+        },
+    },
+    "fast": {
+        "summary_cv": {"model": "gpt-4o-mini", "temperature": 0.3},
+        "summary_company": {"model": "gpt-4o-mini", "temperature": 0.3},
+        "summary_map": {"model": "gpt-4o-mini", "temperature": 0.2},
+        "lyrics": {"model": "gpt-5-mini", "reasoning_effort": "minimal", "max_completion_tokens": 8000},
+        "scenes": {"model": "gpt-4o-mini", "temperature": 0.4},
+        "fused": {"model": "gpt-5-mini", "reasoning_effort": "minimal", "max_completion_tokens": 12000},
+    },
+}
+
+# Optional JSON file of {tier: {stage: route}} entries replacing the defaults above
+ROUTES_FILE = os.getenv("MODEL_ROUTES_FILE")
+if ROUTES_FILE:
+    with open(ROUTES_FILE, encoding="utf-8") as f:
+        for _tier, _stages in json.load(f).items():
+            ROUTES.setdefault(_tier, {}).update(_stages)
+
+# USD per million (input, output) tokens, for cost estimates in the stats
+PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-2024-08-06": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-5": (1.25, 10.00),
+    "gpt-5-mini": (0.25, 2.00),
+}
+
+_tier = contextvars.ContextVar("model_tier", default=None)
+
+
+def set_tier(tier: Optional[str]) -> None:
+    """
+    Select the routing tier for the current run (its context and the threads it starts).
+
+    Raises:
+        Exception: If the tier isn't in the routing table
+    """
+    if tier and tier not in ROUTES:
+        raise Exception(f"Unknown model tier '{tier}' (expected one of: {', '.join(ROUTES)})")
+    _tier.set(tier)
+
+
+def current_tier() -> str:
+    """Routing tier of the current run."""
+    return _tier.get() or DEFAULT_TIER
+
+
+def route_for(stage: str, input_text: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Model and call parameters for a stage in the current tier.
+
+    Args:
+        stage: Pipeline stage (e.g. "lyrics", "summary_cv")
+        input_text: The variable part of the input; short inputs may get a smaller model
+
+    Returns:
+        Dict with "model" plus the keyword arguments for the completion call
+    """
+    routes = ROUTES[current_tier()]
+    route = dict(routes.get(stage) or ROUTES["standard"][stage])
+    short = route.pop("short", None)
+    if short and input_text is not None and count_tokens(input_text) < SHORT_INPUT_TOKENS:
+        route = dict(short)
+    return route
+
+
+def record_call(stage: str, model: str, seconds: float, usage: Any = None, error: Optional[Exception] = None) -> None:
+    """Store one call's latency, token usage and outcome (never raises)."""
+    try:
+        insert_model_call({
+            "stage": stage,
+            "tier": current_tier(),
+            "model": model,
+            "seconds": round(seconds, 3),
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            "ok": 0 if error else 1,
+            "error": str(error)[:200] if error else "",
+        })
+    except Exception as e:
+        print(f"⚠️  Warning: Could not record model call: {str(e)}")
+
+
+def create_completion(client, stage: str, messages: List[Dict[str, str]], response_format=None, input_text: Optional[str] = None):
+    """
+    Run a chat completion with the routed model and record how it went.
+
+    Uses Structured Outputs (parse) when response_format is given. Transient
+    errors are retried with backoff under the OpenAI circuit breaker.
+
+    Args:
+        client: OpenAI client
+        stage: Pipeline stage to route and record under
+        messages: Chat messages
+        response_format: Pydantic model for structured output (optional)
+        input_text: The variable part of the input, for short-input routing
+
+    Returns:
+        The completion
+
+    Raises:
+        ProviderError: If the call failed (see resilience.call_with_retry)
+    """
+    route = route_for(stage, input_text)
+    # Retries are handled by call_with_retry, not the SDK
+    client = client.with_options(max_retries=0)
+
+    def attempt(remaining: float):
+        started = time.perf_counter()
+        timed_client = client.with_options(timeout=remaining)
+        try:
+            if response_format is not None:
+                completion = timed_client.beta.chat.completions.parse(
+                    messages=messages, response_format=response_format, **route
+                )
+            else:
+                completion = timed_client.chat.completions.create(messages=messages, **route)
+        except Exception as e:
+            record_call(stage, route["model"], time.perf_counter() - started, error=e)
+            raise
+        seconds = time.perf_counter() - started
+        record_call(stage, route["model"], seconds, completion.usage)
+        print(f"⏱️  {stage}: {route['model']} took {seconds:.1f}s")
+        return completion
+
+    return call_with_retry("openai", attempt, label=stage)
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def model_stats(days: int = 7) -> List[Dict[str, Any]]:
+    """
+    Observed performance per stage, tier and model over the last days.
+
+    Returns:
+        One dict per (stage, tier, model) with calls, failures, p50/p95
+        latency of successful calls, average tokens and estimated cost
+    """
+    since = (datetime.now() - timedelta(days=days)).isoformat()
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for call in fetch_model_calls(since):
+        groups.setdefault((call["stage"], call["tier"], call["model"]), []).append(call)
+
+    stats = []
+    for (stage, tier, model), calls in sorted(groups.items()):
+        succeeded = [call for call in calls if call["ok"]]
+        latencies = [call["seconds"] for call in succeeded]
+        prompt_tokens = sum(call["prompt_tokens"] for call in succeeded)
+        completion_tokens = sum(call["completion_tokens"] for call in succeeded)
+        input_price, output_price = PRICES.get(model, (0.0, 0.0))
+        stats.append({
+            "stage": stage,
+            "tier": tier,
+            "model": model,
+            "calls": len(calls),
+            "failures": len(calls) - len(succeeded),
+            "p50_seconds": _percentile(latencies, 0.5) if latencies else None,
+            "p95_seconds": _percentile(latencies, 0.95) if latencies else None,
+            "avg_prompt_tokens": round(prompt_tokens / len(succeeded)) if succeeded else 0,
+            "avg_completion_tokens": round(completion_tokens / len(succeeded)) if succeeded else 0,
+            "est_cost_usd": round((prompt_tokens * input_price + completion_tokens * output_price) / 1e6, 4),
+        })
+    return stats
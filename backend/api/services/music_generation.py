@@ -8,6 +8,8 @@ from dotenv import load_dotenv
 from typing import Dict, Any
 from elevenlabs import ElevenLabs
 
+from .resilience import call_with_retry, ProviderError
+
 
 def _ensure_elevenlabs_key():
     """Load .env and ensure ELEVENLABS_API_KEY is available."""
@@ -73,10 +75,14 @@ def generate_music(song_data: Dict) -> Dict[str, Any]:
     
     Returns:
         Dictionary with:
-            - status: "success" or "failed"
+            - status: "success"
             - audio_data: Raw audio bytes (MP3)
             - duration_seconds: Duration of the track
             - metadata: Song metadata
+    
+    Raises:
+        ProviderError: If ElevenLabs fails (TransientProviderError if retrying may help)
+        Exception: If no audio came back
     """
     _ensure_elevenlabs_key()
     
@@ -90,43 +96,45 @@ def generate_music(song_data: Dict) -> Dict[str, Any]:
     print(f"   BPM: {song_data['bpm']} | Mood: {song_data['mood']}")
     print(f"   This may take 30-60 seconds...\n")
     
-    try:
+    def compose(remaining: float) -> bytes:
         # Generate music using ElevenLabs SDK
         # music_length_ms = 30000 for 30 seconds
         audio_generator = client.music.compose(
             prompt=full_prompt,
-            music_length_ms=30000
+            music_length_ms=30000,
+            request_options={"timeout_in_seconds": max(1, int(remaining))}
         )
         
-        # Collect all audio chunks into bytes
+        # Collect all audio chunks into bytes (a dropped stream fails the attempt)
         audio_data = b''
         for chunk in audio_generator:
             audio_data += chunk
-        
-        print(f"✅ Music generation complete!")
-        print(f"   Audio size: {len(audio_data) / 1024:.2f} KB")
-        
-        return {
-            "status": "success",
-            "song_title": song_data['song_title'],
-            "genre": song_data['genre'],
-            "bpm": song_data['bpm'],
-            "duration_seconds": 30,
-            "audio_data": audio_data,
-            "metadata": {
-                "mood": song_data['mood'],
-                "vocal_style": song_data['vocal_style'],
-                "instrumentation": song_data['instrumentation'],
-                "num_scenes": len(song_data['scenes'])
-            }
-        }
-        
-    except Exception as e:
-        error_msg = str(e)
-        print(f"❌ Music generation failed: {error_msg}")
-        
-        return {
-            "status": "failed",
-            "error": error_msg
+        return audio_data
+    
+    try:
+        audio_data = call_with_retry("elevenlabs", compose, label="music", slot="elevenlabs:music")
+    except ProviderError as e:
+        print(f"❌ Music generation failed: {str(e)}")
+        raise
+    
+    if not audio_data:
+        raise Exception("Music generation returned no audio")
+    
+    print(f"✅ Music generation complete!")
+    print(f"   Audio size: {len(audio_data) / 1024:.2f} KB")
+    
+    return {
+        "status": "success",
+        "song_title": song_data['song_title'],
+        "genre": song_data['genre'],
+        "bpm": song_data['bpm'],
+        "duration_seconds": 30,
+        "audio_data": audio_data,
+        "metadata": {
+            "mood": song_data['mood'],
+            "vocal_style": song_data['vocal_style'],
+            "instrumentation": song_data['instrumentation'],
+            "num_scenes": len(song_data['scenes'])
         }
+    }
 
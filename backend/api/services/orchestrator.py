@@ -5,22 +5,30 @@ Coordinates all services with async optimization.
 
 import os
 import asyncio
+import contextvars
 import json
 import shutil
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, List
 
 # Import all services
 from .text_extraction import extract_text_from_pdf
-from .website_scraper import scrape_website
-from .summarization import summarize_cv, summarize_company_website
+from .summarization import summarize_cv
+from .company_cache import get_company_knowledge
 from .lyrics_generation import generate_song_lyrics
-from .scene_planning import generate_scene_plan
-from .image_generation import generate_image_from_prompt
+from .scene_planning import generate_scene_plan, stream_scene_plan, scene_streaming_enabled
+from .fused_planning import fused_planning_enabled, generate_song_and_scenes
+from .image_generation import upload_image, generate_image_from_url
+from .image_preprocessing import preprocess_selfie
 from .video_generation import generate_video_from_url
 from .music_generation import generate_music
 from .assembling_video import assemble_from_list
+from .single_flight import single_flight, file_sha256
+from .model_routing import set_tier, current_tier
+from .concurrency import set_run, run_provider_call
+from .admission import stage_boundary
 from .database import (
     save_pipeline_start,
     update_pipeline_progress,
@@ -30,9 +38,10 @@ from .database import (
 
 
 async def run_sync_in_thread(func, *args, **kwargs):
-    """Run a synchronous function in a thread pool."""
+    """Run a synchronous function in a thread pool (in a copy of the caller's context)."""
     loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, lambda: func(*args, **kwargs))
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(None, lambda: context.run(func, *args, **kwargs))
 
 
 async def generate_hiresong_video(
@@ -40,7 +49,8 @@ async def generate_hiresong_video(
     cv_path: str,
     company_url: str,
     output_dir: str = None,
-    preferred_genre: str = None
+    preferred_genre: str = None,
+    tier: str = None
 ) -> Dict[str, Any]:
     """
     Orchestrate the full HireSong pipeline with async optimization.
@@ -51,11 +61,15 @@ async def generate_hiresong_video(
         company_url: URL of target company website
         output_dir: Directory to save all outputs (defaults to backend/results/{timestamp})
         preferred_genre: Optional user-selected music genre
+        tier: Model routing tier (e.g. "standard", "fast"; defaults to MODEL_TIER)
         
     Returns:
         Dictionary with paths to all generated files
     """
     
+    # Every LLM call of this run is routed by its tier
+    set_tier(tier)
+    
     # Create output directory
     if output_dir is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -73,6 +87,7 @@ async def generate_hiresong_video(
     
     # Save pipeline start to database
     run_id = timestamp
+    set_run(run_id)
     print(f"\n🔍 DEBUG: About to call save_pipeline_start('{run_id}', '{company_url}', '{preferred_genre}')")
     try:
         save_pipeline_start(run_id, company_url, preferred_genre)
@@ -98,15 +113,35 @@ async def generate_hiresong_video(
     results["input_cv"] = cv_copy
     results["input_company_url"] = company_url
     
+    # Preprocess and upload the selfie once for all scenes, overlapping with
+    # the LLM steps. Concurrent runs with the same selfie share the upload.
+    selfie_hash = file_sha256(selfie_path)
+    
+    async def prepare_and_upload_selfie():
+        prepared_path = await run_sync_in_thread(preprocess_selfie, selfie_path, selfie_hash)
+        return await run_sync_in_thread(upload_image, prepared_path)
+    
+    selfie_upload = asyncio.ensure_future(single_flight(f"upload:{selfie_hash}", prepare_and_upload_selfie))
+    
     try:
-        # STEP 1 & 2: Extract CV and scrape website in parallel
+        # STEP 1-3: Extract + summarize the CV while scraping + summarizing the company
         print("\n" + "-"*80)
-        print("STEP 1 & 2: Extracting CV and scraping website (parallel)")
+        print("STEP 1-3: Extracting and summarizing CV and company (parallel)")
         print("-"*80)
         
-        cv_text, website_text = await asyncio.gather(
-            run_sync_in_thread(extract_text_from_pdf, cv_path),
-            run_sync_in_thread(scrape_website, company_url)
+        async def process_cv():
+            """Extract the CV text, then summarize it."""
+            text = await run_sync_in_thread(extract_text_from_pdf, cv_path)
+            summary = await run_sync_in_thread(summarize_cv, text)
+            return text, summary
+        
+        # Identical CVs submitted concurrently share one extraction + summary
+        cv_hash = file_sha256(cv_path)
+        
+        # Company text + summary come from the company cache when possible
+        (cv_text, cv_summary), (website_text, company_summary) = await asyncio.gather(
+            single_flight(f"cv:{cv_hash}:{current_tier()}", process_cv),
+            get_company_knowledge(company_url)
         )
         
         # Save extracted texts
@@ -119,16 +154,6 @@ async def generate_hiresong_video(
         results["cv_text"] = cv_text_path
         results["website_text"] = website_text_path
         
-        # STEP 3: Summarize both in parallel
-        print("\n" + "-"*80)
-        print("STEP 3: Summarizing CV and company (parallel)")
-        print("-"*80)
-        
-        cv_summary, company_summary = await asyncio.gather(
-            run_sync_in_thread(summarize_cv, cv_text),
-            run_sync_in_thread(summarize_company_website, website_text)
-        )
-        
         # Save summaries
         cv_summary_path = os.path.join(output_dir, "02_cv_summary.txt")
         company_summary_path = os.path.join(output_dir, "02_company_summary.txt")
@@ -147,14 +172,37 @@ async def generate_hiresong_video(
         except Exception as e:
             print(f"🔍 DEBUG: update_pipeline_progress (summaries) raised exception: {e}")
     
-        # STEP 4: Generate lyrics
-        print("\n" + "-"*80)
-        print("STEP 4: Generating song lyrics")
-        print("-"*80)
+        song_structure = None
+        scene_plan = None
         
-        song_structure = await run_sync_in_thread(
-            generate_song_lyrics, cv_summary, company_summary, preferred_genre
-        )
+        await stage_boundary("lyrics")
+        
+        # STEP 4+5 (optional): Lyrics and scene plan from one structured call
+        if fused_planning_enabled():
+            print("\n" + "-"*80)
+            print("STEP 4+5: Generating lyrics and scene plan (fused)")
+            print("-"*80)
+            
+            step_started = time.perf_counter()
+            try:
+                song_structure, scene_plan = await run_sync_in_thread(
+                    generate_song_and_scenes, cv_summary, company_summary, preferred_genre
+                )
+                print(f"⏱️  Lyrics + scenes took {time.perf_counter() - step_started:.1f}s (fused)")
+            except Exception as e:
+                print(f"⚠️  Warning: Fused planning failed, falling back to separate calls: {str(e)}")
+        
+        # STEP 4: Generate lyrics
+        if song_structure is None:
+            print("\n" + "-"*80)
+            print("STEP 4: Generating song lyrics")
+            print("-"*80)
+            
+            step_started = time.perf_counter()
+            song_structure = await run_sync_in_thread(
+                generate_song_lyrics, cv_summary, company_summary, preferred_genre
+            )
+            print(f"⏱️  Lyrics took {time.perf_counter() - step_started:.1f}s")
         
         # Save lyrics
         lyrics_path = os.path.join(output_dir, "03_lyrics.json")
@@ -174,31 +222,12 @@ async def generate_hiresong_video(
         except Exception as e:
             print(f"🔍 DEBUG: update_pipeline_progress (song data) raised exception: {e}")
         
-        # STEP 5: Generate scene plan
-        print("\n" + "-"*80)
-        print("STEP 5: Planning visual scenes")
-        print("-"*80)
-        
-        scene_plan = await run_sync_in_thread(
-            generate_scene_plan, cv_summary, company_summary, song_structure.model_dump()
-        )
-        
-        # Save scene plan
-        scenes_path = os.path.join(output_dir, "04_scenes.json")
-        with open(scenes_path, 'w', encoding='utf-8') as f:
-            json.dump(scene_plan.model_dump(), f, indent=2)
-        results["scenes"] = scenes_path
-    
-        # STEP 6: Generate images (parallel) and STEP 8: Generate music (parallel)
-        print("\n" + "-"*80)
-        print("STEP 6 & 8: Generating 6 images + music (parallel)")
-        print("-"*80)
-        
         async def generate_single_image(scene_num: int, image_prompt: str):
             """Generate a single image."""
+            selfie_url = await selfie_upload
             print(f"  Generating image {scene_num}/6...")
-            result = await run_sync_in_thread(
-                generate_image_from_prompt, image_prompt, selfie_path
+            result = await run_provider_call(
+                generate_image_from_url, image_prompt, selfie_url
             )
             
             # Download and save image
@@ -215,12 +244,69 @@ async def generate_hiresong_video(
                 "image_url": image_url
             }
         
-        # Generate all images and music in parallel
-        image_tasks = [
-            generate_single_image(scene.scene_num, scene.image_prompt)
-            for scene in scene_plan.scenes
-        ]
-        music_task = run_sync_in_thread(generate_music, song_structure.model_dump())
+        # Image jobs (and the scenes they were started for) by scene number;
+        # filled early when the scene plan is streamed
+        image_jobs = {}
+        started_scenes = {}
+        
+        def start_image_job(scene):
+            if scene.scene_num not in image_jobs:
+                started_scenes[scene.scene_num] = scene
+                image_jobs[scene.scene_num] = asyncio.ensure_future(
+                    generate_single_image(scene.scene_num, scene.image_prompt)
+                )
+        
+        # STEP 5: Generate scene plan
+        if scene_plan is None and scene_streaming_enabled():
+            print("\n" + "-"*80)
+            print("STEP 5: Planning visual scenes (streaming, images start per scene)")
+            print("-"*80)
+            
+            loop = asyncio.get_running_loop()
+            step_started = time.perf_counter()
+            try:
+                scene_plan = await run_sync_in_thread(
+                    stream_scene_plan, cv_summary, company_summary, song_structure.model_dump(),
+                    lambda scene: loop.call_soon_threadsafe(start_image_job, scene)
+                )
+                print(f"⏱️  Scene planning took {time.perf_counter() - step_started:.1f}s (streamed)")
+            except Exception as e:
+                # Images already started are paid for - keep them and their scenes
+                print(f"⚠️  Warning: Streaming scene plan failed, retrying without streaming "
+                      f"(keeping {len(image_jobs)} started images): {str(e)}")
+        
+        if scene_plan is None:
+            print("\n" + "-"*80)
+            print("STEP 5: Planning visual scenes")
+            print("-"*80)
+            
+            step_started = time.perf_counter()
+            scene_plan = await run_sync_in_thread(
+                generate_scene_plan, cv_summary, company_summary, song_structure.model_dump()
+            )
+            print(f"⏱️  Scene planning took {time.perf_counter() - step_started:.1f}s")
+            # Scenes whose images started during a failed stream keep their streamed
+            # prompts, so each video matches its image; only the rest get new images
+            scene_plan.scenes = [started_scenes.get(scene.scene_num, scene) for scene in scene_plan.scenes]
+        
+        # Save scene plan
+        scenes_path = os.path.join(output_dir, "04_scenes.json")
+        with open(scenes_path, 'w', encoding='utf-8') as f:
+            json.dump(scene_plan.model_dump(), f, indent=2)
+        results["scenes"] = scenes_path
+    
+        await stage_boundary("images and music")
+        
+        # STEP 6: Generate images (parallel) and STEP 8: Generate music (parallel)
+        print("\n" + "-"*80)
+        print("STEP 6 & 8: Generating 6 images + music (parallel)")
+        print("-"*80)
+        
+        # Generate all images and music in parallel (streamed scenes are already running)
+        for scene in scene_plan.scenes:
+            start_image_job(scene)
+        image_tasks = [image_jobs[scene.scene_num] for scene in scene_plan.scenes]
+        music_task = run_provider_call(generate_music, song_structure.model_dump())
         
         images_results, music_result = await asyncio.gather(
             asyncio.gather(*image_tasks),
@@ -234,6 +320,8 @@ async def generate_hiresong_video(
         results["music"] = music_path
         results["images"] = [img["image_path"] for img in images_results]
     
+        await stage_boundary("videos")
+        
         # STEP 7: Generate videos (parallel)
         print("\n" + "-"*80)
         print("STEP 7: Generating 6 videos (parallel)")
@@ -242,7 +330,7 @@ async def generate_hiresong_video(
         async def generate_single_video(scene_num: int, image_url: str, video_prompt: str):
             """Generate a single video."""
             print(f"  Generating video {scene_num}/6...")
-            result = await run_sync_in_thread(
+            result = await run_provider_call(
                 generate_video_from_url, video_prompt, image_url, duration="5"
             )
             
@@ -272,6 +360,8 @@ async def generate_hiresong_video(
         videos_results = await asyncio.gather(*video_tasks)
         results["videos"] = [vid["video_path"] for vid in videos_results]
         
+        await stage_boundary("assembly")
+        
         # STEP 9: Edit final video (combine all)
         print("\n" + "-"*80)
         print("STEP 9: Assembling final video")
@@ -327,6 +417,9 @@ async def generate_hiresong_video(
         return results
     
     except Exception as e:
+        if not selfie_upload.done():
+            selfie_upload.cancel()
+        
         # Save error to database
         error_message = str(e)
         print(f"\n❌ Pipeline failed: {error_message}")
@@ -0,0 +1,169 @@
+"""
+Preflight validation for pipeline inputs.
+Checks the company URL, CV PDF and selfie cheaply, in parallel, so a bad
+request is rejected before any OpenAI, fal or ElevenLabs spend.
+"""
+
+import os
+import time
+import asyncio
+from typing import List, Optional
+
+import httpx
+from PIL import Image
+from PyPDF2 import PdfReader
+
+from .website_scraper import HEADERS, HTML_CONTENT_TYPES
+from .company_cache import cache_enabled, load_entry, normalize_domain, CACHE_MAX_STALE
+
+# The URL check gives up (and lets the run continue) after this many seconds
+URL_TIMEOUT = float(os.getenv("PREFLIGHT_URL_TIMEOUT", "1.0"))
+
+# A CV needs at least this much extractable text on its first pages
+MIN_CV_CHARS = int(os.getenv("PREFLIGHT_MIN_CV_CHARS", "50"))
+
+# Selfie limits
+SELFIE_MAX_BYTES = int(os.getenv("SELFIE_MAX_BYTES", str(20 * 1024 * 1024)))
+SELFIE_MIN_EDGE = int(os.getenv("SELFIE_MIN_EDGE", "256"))
+SELFIE_MAX_PIXELS = int(os.getenv("SELFIE_MAX_PIXELS", str(50_000_000)))
+SELFIE_FORMATS = {"JPEG", "MPO", "PNG", "WEBP"}
+
+
+class PreflightError(Exception):
+    """Raised when pipeline inputs fail validation; `problems` lists every failed check."""
+
+    def __init__(self, problems: List[str]):
+        super().__init__("; ".join(problems))
+        self.problems = problems
+
+
+async def check_company_url(url: str, timeout: Optional[float] = None) -> None:
+    """
+    Check that the company URL resolves and serves HTML.
+
+    Only the response headers are read. URLs with a usable company cache
+    entry pass without a request, and a timeout lets the run continue (the
+    scraper allows much longer) - only definite failures are rejected.
+
+    Raises:
+        PreflightError: If the URL is invalid, unreachable, an HTTP error or not HTML
+    """
+    if cache_enabled():
+        entry = load_entry(normalize_domain(url))
+        if entry and time.time() - entry["fetched_at"] < CACHE_MAX_STALE:
+            return
+
+    try:
+        async with httpx.AsyncClient(headers=HEADERS, follow_redirects=True, timeout=timeout or URL_TIMEOUT) as client:
+            async with client.stream("GET", url) as response:
+                status = response.status_code
+                content_type = response.headers.get("Content-Type", "")
+    except httpx.TimeoutException:
+        print(f"⚠️  Preflight: {url} didn't answer within {timeout or URL_TIMEOUT:.1f}s - continuing")
+        return
+    except (httpx.HTTPError, httpx.InvalidURL) as e:
+        raise PreflightError([f"Company URL {url} is unreachable: {str(e) or type(e).__name__}"])
+
+    if status >= 400:
+        raise PreflightError([f"Company URL {url} returned HTTP {status}"])
+    mime = content_type.split(";")[0].strip().lower()
+    if mime and mime not in HTML_CONTENT_TYPES:
+        raise PreflightError([f"Company URL {url} is not a web page ({mime})"])
+
+
+def check_cv_pdf(pdf_path: str) -> None:
+    """
+    Check that the CV opens and has a text layer (not a scanned image).
+
+    Raises:
+        PreflightError: If the PDF is unreadable, encrypted, empty or image-only
+    """
+    try:
+        reader = PdfReader(pdf_path)
+        if reader.is_encrypted and not reader.decrypt(""):
+            raise PreflightError(["CV PDF is password protected"])
+        if not reader.pages:
+            raise PreflightError(["CV PDF has no pages"])
+
+        text = ""
+        for page in reader.pages[:2]:
+            text += (page.extract_text() or "").strip()
+            if len(text) >= MIN_CV_CHARS:
+                return
+    except PreflightError:
+        raise
+    except Exception as e:
+        raise PreflightError([f"CV PDF could not be read: {str(e)}"])
+
+    raise PreflightError(["CV PDF has no text layer (is it a scanned image?) - please upload a text PDF"])
+
+
+def check_selfie_image(image_path: str) -> None:
+    """
+    Check that the selfie is a supported image that decodes and meets the size limits.
+
+    Raises:
+        PreflightError: If the image is too large, too small, unsupported or corrupt
+    """
+    size = os.path.getsize(image_path)
+    if size > SELFIE_MAX_BYTES:
+        raise PreflightError([f"Selfie is {size / 1024 / 1024:.1f} MB (limit {SELFIE_MAX_BYTES / 1024 / 1024:.0f} MB)"])
+
+    try:
+        with Image.open(image_path) as image:
+            width, height = image.size
+            if image.format not in SELFIE_FORMATS:
+                raise PreflightError([f"Selfie format {image.format} is not supported (use JPG or PNG)"])
+            if width * height > SELFIE_MAX_PIXELS:
+                raise PreflightError([f"Selfie is {width}x{height} pixels, too large to process"])
+            if min(width, height) < SELFIE_MIN_EDGE:
+                raise PreflightError([f"Selfie is {width}x{height} pixels (at least {SELFIE_MIN_EDGE}px per side needed)"])
+
+            # Decode at reduced scale (JPEG) - enough to catch truncated or corrupt files
+            image.draft("RGB", (SELFIE_MIN_EDGE, SELFIE_MIN_EDGE))
+            image.load()
+    except PreflightError:
+        raise
+    except Exception as e:
+        raise PreflightError([f"Selfie could not be decoded: {str(e)}"])
+
+
+async def run_preflight(
+    selfie_path: str,
+    cv_path: str,
+    company_url: str,
+    url_check: Optional[asyncio.Future] = None
+) -> None:
+    """
+    Run all preflight checks concurrently.
+
+    Args:
+        selfie_path: Path to the uploaded selfie
+        cv_path: Path to the uploaded CV PDF
+        company_url: Company website URL
+        url_check: A check_company_url task already started (e.g. while the uploads were read)
+
+    Raises:
+        PreflightError: Listing every failed check
+    """
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    outcomes = await asyncio.gather(
+        url_check or check_company_url(company_url),
+        loop.run_in_executor(None, check_cv_pdf, cv_path),
+        loop.run_in_executor(None, check_selfie_image, selfie_path),
+        return_exceptions=True
+    )
+
+    problems = []
+    for outcome in outcomes:
+        if isinstance(outcome, PreflightError):
+            problems.extend(outcome.problems)
+        elif isinstance(outcome, BaseException):
+            raise outcome
+
+    if problems:
+        print(f"❌ Preflight rejected the request in {time.perf_counter() - started:.2f}s: {'; '.join(problems)}")
+        raise PreflightError(problems)
+
+    print(f"✅ Preflight passed in {time.perf_counter() - started:.2f}s")
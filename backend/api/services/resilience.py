@@ -0,0 +1,264 @@
+"""
+Retries, deadlines and circuit breakers for external providers.
+Calls to OpenAI, fal and ElevenLabs go through call_with_retry: transient
+failures (429, 5xx, timeouts, dropped connections) are retried with
+exponential backoff and jitter within a per-call deadline, and a breaker per
+provider fails new calls fast while the provider is down.
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+import requests
+
+from .concurrency import run_limited, SlotTimeout
+
+BASE_BACKOFF = float(os.getenv("RETRY_BASE_BACKOFF", "1.0"))
+MAX_BACKOFF = float(os.getenv("RETRY_MAX_BACKOFF", "20"))
+
+# provider -> retries after the first attempt and the total seconds allowed per call
+PROVIDERS: Dict[str, Dict[str, float]] = {
+    "openai": {
+        "max_retries": int(os.getenv("OPENAI_MAX_RETRIES", "3")),
+        "deadline": float(os.getenv("OPENAI_CALL_DEADLINE", "240")),
+    },
+    "fal": {
+        "max_retries": int(os.getenv("FAL_MAX_RETRIES", "2")),
+        "deadline": float(os.getenv("FAL_CALL_DEADLINE", "420")),
+    },
+    "elevenlabs": {
+        "max_retries": int(os.getenv("ELEVENLABS_MAX_RETRIES", "2")),
+        "deadline": float(os.getenv("ELEVENLABS_CALL_DEADLINE", "300")),
+    },
+}
+
+# A breaker opens after this many transient failures in a row...
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+# ...and lets one trial call through after this many seconds
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+TRANSIENT_ERRORS = (
+    httpx.TransportError,
+    requests.ConnectionError,
+    requests.Timeout,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class ProviderError(Exception):
+    """A provider call failed; `retryable` tells whether trying again later may help."""
+
+    def __init__(self, provider: str, message: str, status: Optional[int] = None, retryable: bool = False):
+        super().__init__(message)
+        self.provider = provider
+        self.status = status
+        self.retryable = retryable
+
+
+class TransientProviderError(ProviderError):
+    """The provider kept failing with transient errors (429, 5xx, timeouts) until retries ran out."""
+
+    def __init__(self, provider: str, message: str, status: Optional[int] = None):
+        super().__init__(provider, message, status, retryable=True)
+
+
+class DeadlineExceededError(TransientProviderError):
+    """The call's deadline passed before it succeeded."""
+
+
+class CircuitOpenError(TransientProviderError):
+    """The provider's breaker is open; the call was not attempted."""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(provider, f"{provider} is unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.retry_after = retry_after
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """HTTP status of an SDK error (OpenAI, ElevenLabs, httpx), if it has one."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds from the error's Retry-After header, if any."""
+    headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None)
+    try:
+        return float(headers.get("retry-after")) if headers and headers.get("retry-after") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether an error is worth retrying: rate limits, server errors, timeouts, connection drops."""
+    if isinstance(error, ProviderError):
+        return error.retryable
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # OpenAI's connection and timeout errors carry no status
+    return isinstance(error, TRANSIENT_ERRORS) or type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def is_throttle(error: Exception) -> bool:
+    """Whether the provider rejected a call for rate or concurrency limits."""
+    return _status_code(error) == 429
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open after BREAKER_FAILURES -> half-open after the cooldown."""
+
+    def __init__(self, provider: str, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.provider = provider
+        self.failures = failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = None
+        self._probing = False
+
+    def before_call(self) -> None:
+        """
+        Let a call through, or fail fast while the breaker is open.
+
+        Raises:
+            CircuitOpenError: If the provider is considered down
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            waited = time.monotonic() - self._opened_at
+            if waited < self.cooldown or self._probing:
+                raise CircuitOpenError(self.provider, max(0.0, self.cooldown - waited))
+            self._probing = True  # Half-open: this call is the trial
+            print(f"🔌 {self.provider} circuit half-open, trying one call")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                print(f"🔌 {self.provider} circuit closed")
+            self._consecutive = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self, transient: bool) -> None:
+        """Count a failure; only transient ones (outages, overload) move the breaker."""
+        with self._lock:
+            was_probe = self._probing
+            self._probing = False
+            if not transient:
+                return
+            self._consecutive += 1
+            if was_probe or self._consecutive >= self.failures:
+                if self._opened_at is None or was_probe:
+                    print(f"🔌 {self.provider} circuit open for {self.cooldown:.0f}s after {self._consecutive} failures")
+                self._opened_at = time.monotonic()
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker lets a call through (0 if closed or ready to probe)."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+
+
+_breakers = {provider: CircuitBreaker(provider) for provider in PROVIDERS}
+
+
+def breaker(provider: str) -> CircuitBreaker:
+    """The circuit breaker of a provider."""
+    return _breakers[provider]
+
+
+def check_providers(*providers: str) -> None:
+    """
+    Fail fast if any of the providers' breakers is open.
+
+    Raises:
+        CircuitOpenError: For the first provider that is down
+    """
+    for provider in providers or PROVIDERS:
+        wait = breaker(provider).retry_after()
+        if wait > 0:
+            raise CircuitOpenError(provider, wait)
+
+
+def call_with_retry(
+    provider: str,
+    func: Callable[[float], Any],
+    label: str = "call",
+    max_retries: Optional[int] = None,
+    deadline: Optional[float] = None,
+    slot: Optional[str] = None
+) -> Any:
+    """
+    Call a provider with retries, a deadline and the provider's circuit breaker.
+
+    Args:
+        provider: "openai", "fal" or "elevenlabs"
+        func: Makes the call; receives the seconds left before the deadline
+              (to pass on as the SDK's request timeout)
+        label: What the call does, for logs and error messages
+        max_retries: Retries after the first attempt (default per provider)
+        deadline: Total seconds allowed including retries (default per provider)
+        slot: Concurrency-limited endpoint each attempt needs a slot of (see concurrency.LIMITS)
+
+    Returns:
+        Whatever func returns
+
+    Raises:
+        CircuitOpenError: If the provider's breaker is open
+        DeadlineExceededError: If the deadline passed first
+        TransientProviderError: If transient failures outlasted the retries
+        ProviderError: For a non-retryable provider error (e.g. a bad request)
+    """
+    settings = PROVIDERS[provider]
+    max_retries = settings["max_retries"] if max_retries is None else max_retries
+    expires = time.monotonic() + (deadline or settings["deadline"])
+    circuit = breaker(provider)
+
+    for attempt in range(max_retries + 1):
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceededError(provider, f"{provider} {label} ran out of time after {attempt} attempts")
+        circuit.before_call()
+        try:
+            if slot:
+                result = run_limited(slot, remaining, func, is_throttle)
+            else:
+                result = func(remaining)
+        except SlotTimeout as e:
+            # Our own queue, not the provider - doesn't count against the breaker
+            circuit.record_failure(transient=False)
+            raise DeadlineExceededError(provider, f"{provider} {label} ran out of time waiting for a slot: {str(e)}") from e
+        except Exception as e:
+            transient = is_transient(e)
+            circuit.record_failure(transient)
+            status = _status_code(e)
+            if not transient:
+                raise ProviderError(provider, f"{provider} {label} failed: {str(e)}", status) from e
+            if attempt == max_retries:
+                raise TransientProviderError(
+                    provider, f"{provider} {label} failed after {attempt + 1} attempts: {str(e)}", status
+                ) from e
+
+            delay = min(MAX_BACKOFF, BASE_BACKOFF * (2 ** attempt)) * random.uniform(0.5, 1.5)
+            delay = max(delay, _retry_after(e) or 0)
+            if time.monotonic() + delay >= expires:
+                raise DeadlineExceededError(
+                    provider, f"{provider} {label} ran out of time after {attempt + 1} attempts: {str(e)}", status
+                ) from e
+            print(f"⏳ {provider} {label} failed ({status or type(e).__name__}), retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})")
+            time.sleep(delay)
+            continue
+
+        circuit.record_success()
+        return result
@@ -0,0 +1,295 @@
+"""
+Local SQLite run store for HireSong.
+The system of record for pipeline runs. Uses WAL mode so pipeline writes and
+history reads don't block each other, and keeps full summaries and lyrics
+(Google Sheets only gets a truncated mirror).
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.getenv("HIRESONG_DATA_DIR", os.path.join(_current_dir, '..', '..', 'data'))
+DB_FILE = os.getenv("HIRESONG_DB_FILE", os.path.join(DATA_DIR, 'hiresong.db'))
+
+# Same columns as the Google Sheet, in the same order
+COLUMNS = [
+    "Timestamp",
+    "Run ID",
+    "Company URL",
+    "Genre",
+    "Status",
+    "CV Summary",
+    "Company Summary",
+    "Song Title",
+    "Song Genre",
+    "BPM",
+    "Mood",
+    "Scene 1 Lyrics",
+    "Scene 2 Lyrics",
+    "Scene 3 Lyrics",
+    "Scene 4 Lyrics",
+    "Scene 5 Lyrics",
+    "Scene 6 Lyrics",
+    "Output Directory",
+    "Final Video Path",
+    "Music URL",
+    "Image URLs",
+    "Video URLs",
+    "Notes"
+]
+
+
+def _column_name(header: str) -> str:
+    """SQL column name for a sheet header (e.g. "Run ID" -> run_id)."""
+    return header.lower().replace(" ", "_")
+
+
+_SQL_COLUMNS = [_column_name(header) for header in COLUMNS]
+_HEADER_FOR = dict(zip(_SQL_COLUMNS, COLUMNS))
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def _connect() -> sqlite3.Connection:
+    """Get this thread's connection, creating the schema on first use."""
+    global _initialized
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
+
+    os.makedirs(os.path.dirname(os.path.abspath(DB_FILE)), exist_ok=True)
+    conn = sqlite3.connect(DB_FILE, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    _local.conn = conn
+
+    with _init_lock:
+        if not _initialized:
+            _create_schema(conn)
+            _initialized = True
+
+    return conn
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    """Create the runs and model_calls tables and their indexes if they don't exist."""
+    column_defs = ",\n    ".join(
+        f"{name} TEXT PRIMARY KEY" if name == "run_id" else f"{name} TEXT NOT NULL DEFAULT ''"
+        for name in _SQL_COLUMNS
+    )
+    with conn:
+        conn.execute(f"""
+CREATE TABLE IF NOT EXISTS runs (
+    {column_defs},
+    updated_at TEXT NOT NULL DEFAULT ''
+)""")
+        # origin: 'local' for runs written here, 'sheet' for runs imported from the mirror
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(runs)")}
+        if "origin" not in existing:
+            conn.execute("ALTER TABLE runs ADD COLUMN origin TEXT NOT NULL DEFAULT 'local'")
+        if "sheet_row" not in existing:
+            conn.execute("ALTER TABLE runs ADD COLUMN sheet_row INTEGER")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_status ON runs (status)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_timestamp ON runs (timestamp)")
+        conn.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute("""
+CREATE TABLE IF NOT EXISTS model_calls (
+    timestamp TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    tier TEXT NOT NULL,
+    model TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    ok INTEGER NOT NULL,
+    error TEXT NOT NULL DEFAULT ''
+)""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_model_calls_timestamp ON model_calls (timestamp)")
+
+
+def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    """Convert a database row into a run dict keyed by sheet headers."""
+    return {_HEADER_FOR[key]: row[key] for key in row.keys() if key in _HEADER_FOR}
+
+
+def upsert_run(run_id: str, fields: Dict[str, str], create: bool = False) -> bool:
+    """
+    Write column values for a run.
+
+    Args:
+        run_id: Unique identifier for the run
+        fields: Mapping of column header -> value
+        create: Insert the run if it does not exist yet
+
+    Returns:
+        True if written, False if the run was not found and not created
+    """
+    conn = _connect()
+    values = {_column_name(header): "" if value is None else str(value) for header, value in fields.items()}
+    values["run_id"] = run_id
+    values["updated_at"] = datetime.now().isoformat()
+
+    with conn:
+        if create:
+            columns = ", ".join(values)
+            placeholders = ", ".join(f":{name}" for name in values)
+            assignments = ", ".join(f"{name} = excluded.{name}" for name in values if name != "run_id")
+            conn.execute(
+                f"INSERT INTO runs ({columns}) VALUES ({placeholders}) "
+                f"ON CONFLICT (run_id) DO UPDATE SET {assignments}",
+                values
+            )
+            return True
+
+        assignments = ", ".join(f"{name} = :{name}" for name in values if name != "run_id")
+        cursor = conn.execute(f"UPDATE runs SET {assignments} WHERE run_id = :run_id", values)
+        return cursor.rowcount > 0
+
+
+def fetch_all_runs() -> List[Dict[str, Any]]:
+    """All runs, oldest first (same order as the sheet)."""
+    rows = _connect().execute("SELECT * FROM runs ORDER BY timestamp, run_id").fetchall()
+    return [_row_to_dict(row) for row in rows]
+
+
+def fetch_run(run_id: str) -> Optional[Dict[str, Any]]:
+    """A single run by ID, or None if it doesn't exist."""
+    row = _connect().execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+    return _row_to_dict(row) if row else None
+
+
+def query_runs(
+    status: Optional[str] = None,
+    company: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 20
+) -> Dict[str, Any]:
+    """
+    Filtered, paginated run history, newest first.
+
+    Args:
+        status: Status prefix to match (e.g. "Failed" also matches "Failed: ...")
+        company: Substring of the company URL
+        date_from: Earliest timestamp, inclusive (e.g. "2025-01-01")
+        date_to: Latest timestamp, inclusive (a bare date covers the whole day)
+        page: 1-based page number
+        page_size: Runs per page
+
+    Returns:
+        Dict with runs, total, page and page_size
+    """
+    clauses = []
+    params = []
+    if status:
+        clauses.append("status LIKE ? || '%'")
+        params.append(status)
+    if company:
+        clauses.append("company_url LIKE '%' || ? || '%'")
+        params.append(company)
+    if date_from:
+        clauses.append("timestamp >= ?")
+        params.append(date_from)
+    if date_to:
+        clauses.append("timestamp <= ?")
+        params.append(date_to if len(date_to) > 10 else date_to + " 23:59:59")
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    conn = _connect()
+    total = conn.execute(f"SELECT COUNT(*) FROM runs {where}", params).fetchone()[0]
+    rows = conn.execute(
+        f"SELECT * FROM runs {where} ORDER BY timestamp DESC, run_id DESC LIMIT ? OFFSET ?",
+        params + [page_size, (page - 1) * page_size]
+    ).fetchall()
+
+    return {
+        "runs": [_row_to_dict(row) for row in rows],
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+    }
+
+
+def import_sheet_rows(rows: List[Tuple[int, Dict[str, str]]]) -> int:
+    """
+    Store runs read from the Google Sheets mirror.
+
+    Runs written by this store are never overwritten - local data is always
+    at least as fresh as the mirror.
+
+    Args:
+        rows: (sheet row number, {column header: value}) pairs
+
+    Returns:
+        Number of runs inserted or refreshed
+    """
+    conn = _connect()
+    changed = 0
+    now = datetime.now().isoformat()
+    with conn:
+        for sheet_row, fields in rows:
+            values = {_column_name(header): str(value) for header, value in fields.items() if header in COLUMNS}
+            if not values.get("run_id"):
+                continue
+            values.update({"origin": "sheet", "sheet_row": sheet_row, "updated_at": now})
+            columns = ", ".join(values)
+            placeholders = ", ".join(f":{name}" for name in values)
+            assignments = ", ".join(f"{name} = excluded.{name}" for name in values if name != "run_id")
+            cursor = conn.execute(
+                f"INSERT INTO runs ({columns}) VALUES ({placeholders}) "
+                f"ON CONFLICT (run_id) DO UPDATE SET {assignments} WHERE runs.origin = 'sheet'",
+                values
+            )
+            changed += cursor.rowcount
+    return changed
+
+
+def unfinished_sheet_rows() -> List[int]:
+    """Sheet row numbers of imported runs that were still in progress (and may change)."""
+    rows = _connect().execute(
+        "SELECT sheet_row FROM runs WHERE origin = 'sheet' AND status = 'In Progress' AND sheet_row IS NOT NULL"
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def get_sync_state(key: str, default: str = "") -> str:
+    """Read a sync bookmark (e.g. how many sheet rows have been imported)."""
+    row = _connect().execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+
+def set_sync_state(key: str, value: str) -> None:
+    """Save a sync bookmark."""
+    conn = _connect()
+    with conn:
+        conn.execute(
+            "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+
+def insert_model_call(fields: Dict[str, Any]) -> None:
+    """Record one LLM call (stage, tier, model, seconds, tokens, ok, error)."""
+    values = {"timestamp": datetime.now().isoformat(), **fields}
+    columns = ", ".join(values)
+    placeholders = ", ".join(f":{name}" for name in values)
+    conn = _connect()
+    with conn:
+        conn.execute(f"INSERT INTO model_calls ({columns}) VALUES ({placeholders})", values)
+
+
+def fetch_model_calls(since: str) -> List[Dict[str, Any]]:
+    """LLM calls recorded at or after an ISO timestamp, oldest first."""
+    rows = _connect().execute(
+        "SELECT * FROM model_calls WHERE timestamp >= ? ORDER BY timestamp", (since,)
+    ).fetchall()
+    return [dict(row) for row in rows]
@@ -4,10 +4,17 @@ Generates visual scene plans for 6 five-second video segments.
 """
 
 import os
+import re
+import json
+import time
 from openai import OpenAI
 from dotenv import load_dotenv
 from pydantic import BaseModel
-from typing import List
+from typing import Callable, List, Optional
+
+from .model_routing import create_completion, route_for, record_call
+from .resilience import call_with_retry, ProviderError
+from .token_budget import compact_text, SUMMARY_TOKEN_BUDGET
 
 
 class SceneVisual(BaseModel):
@@ -22,35 +29,7 @@ class ScenePlan(BaseModel):
     scenes: List[SceneVisual]
 
 
-def _ensure_openai_key():
-    """Load .env and ensure OPENAI_API_KEY is available."""
-    here = os.path.dirname(__file__)
-    dotenv_path = os.path.abspath(os.path.join(here, '..', '..', '.env'))
-    load_dotenv(dotenv_path)
-    
-    key = os.getenv("OPENAI_API_KEY")
-    if not key:
-        raise ValueError("OPENAI_API_KEY not found. Please set it in backend/.env")
-    return key
-
-
-def generate_scene_plan(cv_summary: str, company_summary: str, lyrics_data: dict) -> ScenePlan:
-    """
-    Generate visual scene plans for 6 five-second video segments.
-    
-    Args:
-        cv_summary: Summary of the candidate's CV
-        company_summary: Summary of the company website
-        lyrics_data: Dictionary containing the song structure with lyrics for each scene
-        
-    Returns:
-        ScenePlan object with 6 scenes, each containing visual descriptions and prompts
-    """
-    _ensure_openai_key()
-    
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    
-    system_prompt = """You are a creative director for funny, viral TikTok-style pitch videos.
+SCENE_PLANNING_PROMPT = """You are a creative director for funny, viral TikTok-style pitch videos.
 
 Your job is to create 6 hilarious, over-the-top visual scenes that match song lyrics for a "hire me" video.
 
@@ -103,36 +82,71 @@ Examples of complete transformations:
 - Each should have different lighting: golden hour, neon lights, magical glow, etc.
 You don't have to follow these exactly, just get an idea of what the vibe should be."""
 
+
+def _ensure_openai_key():
+    """Load .env and ensure OPENAI_API_KEY is available."""
+    here = os.path.dirname(__file__)
+    dotenv_path = os.path.abspath(os.path.join(here, '..', '..', '.env'))
+    load_dotenv(dotenv_path)
+    
+    key = os.getenv("OPENAI_API_KEY")
+    if not key:
+        raise ValueError("OPENAI_API_KEY not found. Please set it in backend/.env")
+    return key
+
+
+def scene_streaming_enabled() -> bool:
+    """Whether the scene plan is streamed scene by scene (SCENE_STREAMING=1)."""
+    return os.getenv("SCENE_STREAMING", "0").lower() in ("1", "true", "yes")
+
+
+def _build_user_prompt(cv_summary: str, company_summary: str, lyrics_data: dict) -> str:
+    """User message for scene planning: both summaries plus the lyrics of each scene."""
     # Format the lyrics for context
     lyrics_context = "SONG LYRICS BY SCENE:\n"
     for scene in lyrics_data.get('scenes', []):
         lyrics_context += f"Scene {scene['scene_num']} ({scene['time_range']}): \"{scene['lyrics']}\"\n"
     
-    user_prompt = f"""Create 6 hilarious visual scenes for this candidate's "hire me" video.
+    return f"""Create 6 hilarious visual scenes for this candidate's "hire me" video.
 
 CANDIDATE SUMMARY:
-{cv_summary}
+{compact_text(cv_summary, SUMMARY_TOKEN_BUDGET, "CV summary", strip_boilerplate=False)}
 
 COMPANY SUMMARY:
-{company_summary}
+{compact_text(company_summary, SUMMARY_TOKEN_BUDGET, "company summary", strip_boilerplate=False)}
 
 {lyrics_context}
 
 Make each scene visually funny and memorable while showcasing the candidate's fit for the role!"""
 
+
+def generate_scene_plan(cv_summary: str, company_summary: str, lyrics_data: dict) -> ScenePlan:
+    """
+    Generate visual scene plans for 6 five-second video segments.
+    
+    Args:
+        cv_summary: Summary of the candidate's CV
+        company_summary: Summary of the company website
+        lyrics_data: Dictionary containing the song structure with lyrics for each scene
+        
+    Returns:
+        ScenePlan object with 6 scenes, each containing visual descriptions and prompts
+    """
+    _ensure_openai_key()
+    
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    
+    system_prompt = SCENE_PLANNING_PROMPT
+    user_prompt = _build_user_prompt(cv_summary, company_summary, lyrics_data)
+
     print("🎬 Generating scene plans with OpenAI...")
     print(f"   Creating 6 visual scenes...")
     
     try:
-        completion = client.beta.chat.completions.parse(
-            model="gpt-4o-2024-08-06",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format=ScenePlan,
-            temperature=0.4 
-        )
+        completion = create_completion(client, "scenes", [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ], response_format=ScenePlan)
         
         scene_plan = completion.choices[0].message.parsed
         
@@ -140,7 +154,151 @@ Make each scene visually funny and memorable while showcasing the candidate's fi
         
         return scene_plan
         
+    except ProviderError as e:
+        print(f"❌ Scene planning failed: {str(e)}")
+        raise
     except Exception as e:
         print(f"❌ Scene planning failed: {str(e)}")
         raise Exception(f"Failed to generate scene plan: {str(e)}")
 
+
+
+class _SceneStreamParser:
+    """
+    Incremental parser for a streamed ScenePlan JSON document.
+
+    Fed the raw text deltas, it returns each scene object as soon as its
+    closing brace arrives, without waiting for the rest of the document.
+    """
+
+    _SCENES_KEY = re.compile(r'"scenes"\s*:\s*\[')
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0            # Next character to scan
+        self.in_array = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.start = None       # Start of the scene object being read
+
+    def feed(self, delta: str) -> List[SceneVisual]:
+        """Add a chunk of streamed text and return the scenes completed by it."""
+        self.buffer += delta
+        scenes = []
+
+        if not self.in_array:
+            match = self._SCENES_KEY.search(self.buffer)
+            if not match:
+                return scenes
+            self.in_array = True
+            self.pos = match.end()
+
+        buffer = self.buffer
+        for index in range(self.pos, len(buffer)):
+            char = buffer[index]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                if self.depth == 0:
+                    self.start = index
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    scenes.append(SceneVisual.model_validate(json.loads(buffer[self.start:index + 1])))
+                    self.start = None
+        self.pos = len(buffer)
+        return scenes
+
+
+def stream_scene_plan(
+    cv_summary: str,
+    company_summary: str,
+    lyrics_data: dict,
+    on_scene: Optional[Callable[[SceneVisual], None]] = None
+) -> ScenePlan:
+    """
+    Generate the scene plan as a stream, handing over each scene as soon as it is complete.
+
+    Same prompt and model as generate_scene_plan. on_scene is called (in this
+    thread) once per scene in stream order, so callers can start work on scene 1
+    while later scenes are still being written. Scenes of the final plan that
+    the stream parser missed are handed over at the end.
+
+    Args:
+        cv_summary: Summary of the candidate's CV
+        company_summary: Summary of the company website
+        lyrics_data: Dictionary containing the song structure with lyrics for each scene
+        on_scene: Callback receiving each completed SceneVisual
+
+    Returns:
+        ScenePlan object with 6 scenes, each containing visual descriptions and prompts
+
+    Raises:
+        ProviderError: If the stream fails
+    """
+    _ensure_openai_key()
+    
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    
+    user_prompt = _build_user_prompt(cv_summary, company_summary, lyrics_data)
+    parser = _SceneStreamParser()
+    emitted = set()
+
+    def emit(scene: SceneVisual):
+        if scene.scene_num in emitted:
+            return
+        emitted.add(scene.scene_num)
+        print(f"   🎬 Scene {scene.scene_num} planned")
+        if on_scene:
+            on_scene(scene)
+
+    route = route_for("scenes")
+    print(f"🎬 Streaming scene plans from OpenAI ({route['model']})...")
+    
+    def attempt(remaining: float):
+        started = time.perf_counter()
+        try:
+            with client.with_options(max_retries=0, timeout=remaining).beta.chat.completions.stream(
+                messages=[
+                    {"role": "system", "content": SCENE_PLANNING_PROMPT},
+                    {"role": "user", "content": user_prompt}
+                ],
+                response_format=ScenePlan,
+                stream_options={"include_usage": True},
+                **route
+            ) as stream:
+                for event in stream:
+                    if event.type == "content.delta":
+                        for scene in parser.feed(event.delta):
+                            emit(scene)
+                completion = stream.get_final_completion()
+        except Exception as e:
+            record_call("scenes", route["model"], time.perf_counter() - started, error=e)
+            raise
+        record_call("scenes", route["model"], time.perf_counter() - started, completion.usage)
+        return completion
+    
+    try:
+        # Not retried: scenes already handed over can't be taken back
+        completion = call_with_retry("openai", attempt, label="scenes stream", max_retries=0)
+    except ProviderError as e:
+        print(f"❌ Scene planning failed: {str(e)}")
+        raise
+    
+    scene_plan = completion.choices[0].message.parsed
+
+    for scene in scene_plan.scenes:
+        emit(scene)
+
+    print(f"✅ Generated {len(scene_plan.scenes)} visual scenes")
+
+    return scene_plan
@@ -0,0 +1,228 @@
+"""
+In-process Google Sheets emulator for offline testing and benchmarking.
+Implements the subset of the gspread worksheet API that database.py uses,
+with configurable latency and quota errors, and counts every API call.
+
+Enable it with SHEETS_EMULATOR=1 in .env (no credentials needed).
+"""
+
+import os
+import json
+import random
+import threading
+import time
+from collections import Counter, deque
+from typing import List, Optional
+
+import requests
+from gspread.exceptions import APIError
+from gspread.utils import a1_to_rowcol
+
+
+def emulator_enabled() -> bool:
+    """Whether database.py should talk to the emulator instead of Google."""
+    return os.getenv("SHEETS_EMULATOR", "0").lower() in ("1", "true", "yes")
+
+
+def _quota_error() -> APIError:
+    """Build the same APIError gspread raises for a 429 response."""
+    response = requests.Response()
+    response.status_code = 429
+    response._content = json.dumps({
+        "error": {
+            "code": 429,
+            "message": "Quota exceeded for quota metric 'Write requests' (emulated)",
+            "status": "RESOURCE_EXHAUSTED",
+        }
+    }).encode()
+    return APIError(response)
+
+
+def _parse_range(range_name: str, default_last_row: int):
+    """Turn 'A2:W', 'A5:W5' or 'E7' into (first_row, first_col, last_row, last_col)."""
+    start, _, end = range_name.partition(":")
+    first_row, first_col = a1_to_rowcol(start)
+    if not end:
+        return first_row, first_col, first_row, first_col
+
+    letters = "".join(ch for ch in end if ch.isalpha())
+    digits = "".join(ch for ch in end if ch.isdigit())
+    _, last_col = a1_to_rowcol(f"{letters}1")
+    last_row = int(digits) if digits else default_last_row
+    return first_row, first_col, last_row, last_col
+
+
+class EmulatedWorksheet:
+    """
+    Stand-in for gspread.Worksheet backed by an in-memory grid.
+
+    Args:
+        latency: Seconds added to every call (simulates a round trip)
+        jitter: Extra random latency, up to this many seconds
+        quota_per_minute: Calls allowed per rolling minute before 429s (None = unlimited)
+        error_rate: Probability of a random 429 on any call
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        quota_per_minute: Optional[int] = None,
+        error_rate: float = 0.0
+    ):
+        self.title = "Sheet1"
+        self.latency = latency
+        self.jitter = jitter
+        self.quota_per_minute = quota_per_minute
+        self.error_rate = error_rate
+
+        self.calls = Counter()
+        self.errors = 0
+        self.time_in_calls = 0.0
+
+        self._rows: List[List[str]] = []
+        self._recent_calls = deque()
+        self._lock = threading.Lock()
+
+    # --- Emulation helpers ---
+
+    def _call(self, method: str) -> None:
+        """Count a call, apply latency and raise a 429 if over quota."""
+        started = time.monotonic()
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        with self._lock:
+            self.calls[method] += 1
+            now = time.monotonic()
+            self.time_in_calls += now - started
+
+            while self._recent_calls and now - self._recent_calls[0] > 60:
+                self._recent_calls.popleft()
+            over_quota = self.quota_per_minute is not None and len(self._recent_calls) >= self.quota_per_minute
+            if over_quota or (self.error_rate and random.random() < self.error_rate):
+                self.errors += 1
+                raise _quota_error()
+            self._recent_calls.append(now)
+
+    def _set(self, row: int, col: int, value) -> None:
+        """Write one cell, growing the grid as needed. Caller holds the lock."""
+        while len(self._rows) < row:
+            self._rows.append([])
+        cells = self._rows[row - 1]
+        while len(cells) < col:
+            cells.append("")
+        cells[col - 1] = "" if value is None else str(value)
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def reset_stats(self) -> None:
+        """Zero the call counters (keeps the data)."""
+        with self._lock:
+            self.calls.clear()
+            self.errors = 0
+            self.time_in_calls = 0.0
+            self._recent_calls.clear()
+
+    def seed_rows(self, rows: List[list]) -> None:
+        """Load rows directly (no API call is counted)."""
+        with self._lock:
+            for row in rows:
+                self._rows.append(["" if v is None else str(v) for v in row])
+
+    def all_rows(self) -> List[List[str]]:
+        """Copy of every row (no API call is counted)."""
+        with self._lock:
+            return [list(row) for row in self._rows]
+
+    # --- gspread Worksheet API subset ---
+
+    def row_values(self, row: int) -> List[str]:
+        self._call("row_values")
+        with self._lock:
+            return list(self._rows[row - 1]) if row <= len(self._rows) else []
+
+    def col_values(self, col: int) -> List[str]:
+        self._call("col_values")
+        with self._lock:
+            values = [row[col - 1] if col <= len(row) else "" for row in self._rows]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def insert_row(self, values: list, index: int = 1) -> None:
+        self._call("insert_row")
+        with self._lock:
+            self._rows.insert(index - 1, ["" if v is None else str(v) for v in values])
+
+    def append_row(self, values: list, **kwargs) -> None:
+        self._call("append_row")
+        with self._lock:
+            self._rows.append(["" if v is None else str(v) for v in values])
+
+    def append_rows(self, values: list, **kwargs) -> None:
+        self._call("append_rows")
+        with self._lock:
+            for row in values:
+                self._rows.append(["" if v is None else str(v) for v in row])
+
+    def update_cell(self, row: int, col: int, value) -> None:
+        self._call("update_cell")
+        with self._lock:
+            self._set(row, col, value)
+
+    def batch_update(self, data: list, **kwargs) -> None:
+        self._call("batch_update")
+        with self._lock:
+            for update in data:
+                first_row, first_col, _, _ = _parse_range(update["range"], len(self._rows))
+                for r, row_values in enumerate(update["values"]):
+                    for c, value in enumerate(row_values):
+                        self._set(first_row + r, first_col + c, value)
+
+    def batch_get(self, ranges: list, **kwargs) -> List[List[List[str]]]:
+        self._call("batch_get")
+        results = []
+        with self._lock:
+            for range_name in ranges:
+                first_row, first_col, last_row, last_col = _parse_range(range_name, len(self._rows))
+                block = [
+                    list(row[first_col - 1:last_col])
+                    for row in self._rows[first_row - 1:last_row]
+                ]
+                while block and not any(block[-1]):
+                    block.pop()
+                results.append(block)
+        return results
+
+    def get_all_records(self) -> List[dict]:
+        self._call("get_all_records")
+        with self._lock:
+            if not self._rows:
+                return []
+            headers = self._rows[0]
+            return [
+                {header: (row[i] if i < len(row) else "") for i, header in enumerate(headers)}
+                for row in self._rows[1:]
+            ]
+
+
+_sheet: Optional[EmulatedWorksheet] = None
+
+
+def get_emulated_sheet() -> EmulatedWorksheet:
+    """The process-wide emulated worksheet, configured from the environment."""
+    global _sheet
+    if _sheet is None:
+        quota = os.getenv("SHEETS_EMULATOR_QUOTA")
+        _sheet = EmulatedWorksheet(
+            latency=float(os.getenv("SHEETS_EMULATOR_LATENCY", "0.3")),
+            jitter=float(os.getenv("SHEETS_EMULATOR_JITTER", "0.1")),
+            quota_per_minute=int(quota) if quota else None,
+            error_rate=float(os.getenv("SHEETS_EMULATOR_ERROR_RATE", "0")),
+        )
+        print("🧪 Using in-process Google Sheets emulator")
+    return _sheet
@@ -0,0 +1,108 @@
+"""
+Quota governor for Google Sheets.
+Every Sheets API call in the process goes through one token bucket so
+concurrent runs can't burst past the per-minute quota, and 429/5xx responses
+are retried with exponential backoff instead of being swallowed.
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Any, Callable
+
+from gspread.exceptions import APIError
+
+# Google's default write quota is 60 requests per minute per user
+REQUESTS_PER_MINUTE = float(os.getenv("SHEETS_REQUESTS_PER_MINUTE", "60"))
+BURST = float(os.getenv("SHEETS_BURST", "5"))
+
+MAX_RETRIES = int(os.getenv("SHEETS_MAX_RETRIES", "5"))
+BASE_BACKOFF = 1.0
+MAX_BACKOFF = 64.0
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class SheetsQuotaError(Exception):
+    """Raised when Sheets keeps rejecting a call for quota reasons after all retries."""
+
+
+_lock = threading.Lock()
+_tokens = BURST
+_last_refill = time.monotonic()
+_blocked_until = 0.0  # Set after a 429 so every caller backs off, not just the one that hit it
+
+
+def _status_code(error: APIError) -> int:
+    """HTTP status of a gspread APIError (0 if unknown)."""
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", 0) or 0
+
+
+def acquire() -> None:
+    """Block until a request token is available."""
+    global _tokens, _last_refill
+    rate = REQUESTS_PER_MINUTE / 60.0
+
+    while True:
+        with _lock:
+            now = time.monotonic()
+            _tokens = min(BURST, _tokens + (now - _last_refill) * rate)
+            _last_refill = now
+
+            if now < _blocked_until:
+                wait = _blocked_until - now
+            elif _tokens >= 1:
+                _tokens -= 1
+                return
+            else:
+                wait = (1 - _tokens) / rate
+
+        time.sleep(wait)
+
+
+def _back_off(attempt: int) -> float:
+    """Pause all Sheets traffic after a 429. Returns the delay chosen."""
+    global _blocked_until, _tokens
+    delay = min(MAX_BACKOFF, BASE_BACKOFF * (2 ** attempt)) + random.uniform(0, 1)
+    with _lock:
+        _blocked_until = max(_blocked_until, time.monotonic() + delay)
+        _tokens = 0
+    return delay
+
+
+def sheets_call(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a gspread call under the process-wide quota.
+
+    Args:
+        func: Bound gspread method (e.g. sheet.batch_update)
+        *args, **kwargs: Passed through to func
+
+    Returns:
+        Whatever func returns
+
+    Raises:
+        SheetsQuotaError: If the call is still rate limited after all retries
+        APIError: For non-retryable API errors
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        acquire()
+        try:
+            return func(*args, **kwargs)
+        except APIError as e:
+            status = _status_code(e)
+            if status not in RETRYABLE_STATUS:
+                raise
+            if attempt == MAX_RETRIES:
+                if status == 429:
+                    raise SheetsQuotaError(f"Google Sheets quota exceeded after {MAX_RETRIES} retries") from e
+                raise
+
+            if status == 429:
+                delay = _back_off(attempt)
+            else:
+                delay = min(MAX_BACKOFF, BASE_BACKOFF * (2 ** attempt)) + random.uniform(0, 1)
+                time.sleep(delay)
+            print(f"⏳ Google Sheets returned {status}, retrying in {delay:.1f}s (attempt {attempt + 1}/{MAX_RETRIES})")
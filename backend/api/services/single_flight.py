@@ -0,0 +1,58 @@
+"""
+Single-flight deduplication for the pipeline.
+Concurrent runs asking for the same keyed operation (company scrape + summary,
+CV summary, provider upload) share one in-flight task instead of repeating
+the work and the cost.
+"""
+
+import asyncio
+import hashlib
+import weakref
+from typing import Any, Awaitable, Callable
+
+# Per event loop: key -> task doing the work
+_inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Task]]" = weakref.WeakKeyDictionary()
+
+
+async def single_flight(key: str, work: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Run `work()` once for all concurrent callers with the same key.
+
+    The first caller starts the work as its own task; callers that arrive
+    while it is running await the same task. Cancelling one caller doesn't
+    cancel the work for the others. Once the task finishes the key is
+    released, so later calls start fresh.
+
+    Args:
+        key: Identifies the operation, e.g. "company:anthropic.com"
+        work: Zero-argument callable returning the coroutine to run
+
+    Returns:
+        The result of the shared work (exceptions are shared too)
+    """
+    loop = asyncio.get_running_loop()
+    inflight = _inflight.setdefault(loop, {})
+
+    task = inflight.get(key)
+    if task is None:
+        task = loop.create_task(work())
+        inflight[key] = task
+
+        def release(done_task, key=key):
+            if inflight.get(key) is done_task:
+                del inflight[key]
+
+        task.add_done_callback(release)
+    else:
+        print(f"🔗 Sharing in-flight work: {key}")
+
+    return await asyncio.shield(task)
+
+
+def file_sha256(path: str) -> str:
+    """Content hash of a file, used to key work on uploaded files."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
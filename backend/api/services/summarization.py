@@ -1,11 +1,48 @@
 """
 Summarization service using OpenAI.
-Summarizes CV text into a clean, structured outline.
+Summarizes CV text into a clean, structured outline. With
+STRUCTURED_SUMMARIES=1 the summaries are compact structured records
+(Structured Outputs) rendered into short prompt fragments instead.
 """
 
 import os
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
 from dotenv import load_dotenv
+from pydantic import BaseModel
+from typing import List
+
+from .model_routing import create_completion, route_for
+from .resilience import ProviderError
+from .token_budget import (
+    compact_text,
+    count_tokens,
+    split_into_chunks,
+    CV_TOKEN_BUDGET,
+    WEBSITE_TOKEN_BUDGET
+)
+
+# Inputs over their per-call budget are split into chunks of this many tokens,
+# condensed concurrently (map) and merged by the normal summary call (reduce)
+MAP_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "2000"))
+MAP_MAX_INPUT_TOKENS = int(os.getenv("SUMMARY_MAX_INPUT_TOKENS", "16000"))
+
+# Characters to scrape or crawl from a company site: the scraper's 10k default is
+# ~2.5k tokens, under the website budget, so map-reduce needs a larger cap
+WEBSITE_MAX_CHARS = int(os.getenv("SUMMARY_WEBSITE_MAX_CHARS", "40000"))
+
+MAP_PROMPTS = {
+    "CV": """You are condensing one part of a longer CV/resume.
+List every fact in this part as terse bullet points: roles with companies and dates,
+achievements with numbers, skills and technologies, education, projects, awards.
+Keep names and numbers exact. No commentary, no facts that aren't in the text.""",
+    "website text": """You are condensing one part of a longer company website.
+List every useful fact in this part as terse bullet points: what the company does,
+products and services, mission, values, culture, customers, notable claims.
+Skip navigation, legal and cookie text. No commentary, no facts that aren't in the text.""",
+}
 
 
 def _ensure_openai_key():
@@ -20,6 +57,220 @@ def _ensure_openai_key():
     return key
 
 
+class CVProfile(BaseModel):
+    name: str
+    headline: str
+    skills: List[str]
+    highlights: List[str]
+    experience: List[str]
+    education: List[str]
+    keywords: List[str]
+
+
+class CompanyProfile(BaseModel):
+    name: str
+    mission: str
+    products: List[str]
+    values: List[str]
+    culture: List[str]
+    keywords: List[str]
+
+
+def map_reduce_enabled() -> bool:
+    """Whether long inputs are summarized map-reduce style (SUMMARY_MAP_REDUCE=0 truncates instead)."""
+    return os.getenv("SUMMARY_MAP_REDUCE", "1").lower() not in ("0", "false", "no")
+
+
+def website_max_chars() -> int:
+    """Characters of website text worth scraping: more when long sites are map-reduced."""
+    return WEBSITE_MAX_CHARS if map_reduce_enabled() else 10000
+
+
+def _condense_chunk(label: str, chunk: str) -> str:
+    """Map step: condense one chunk of a long input into bullet points."""
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    response = create_completion(client, "summary_map", [
+        {"role": "system", "content": MAP_PROMPTS[label]},
+        {"role": "user", "content": chunk}
+    ])
+    return response.choices[0].message.content or ""
+
+
+def _prepare_input(text: str, budget: int, label: str, strip_boilerplate: bool = True) -> str:
+    """
+    Fit a summarizer input into its token budget.
+
+    Inputs within the budget are only compacted (the single-call path).
+    Longer inputs are split into chunks that are condensed concurrently;
+    the condensed notes become the input of the final (reduce) call.
+
+    Args:
+        text: Raw CV or website text
+        budget: Token budget of the final summary call
+        label: "CV" or "website text"
+        strip_boilerplate: Drop website boilerplate lines while compacting
+
+    Returns:
+        Text within the budget
+    """
+    if not map_reduce_enabled():
+        return compact_text(text, budget, label, strip_boilerplate)
+
+    text = compact_text(text, MAP_MAX_INPUT_TOKENS, label, strip_boilerplate)
+    if count_tokens(text) <= budget:
+        return text
+
+    chunks = split_into_chunks(text, MAP_CHUNK_TOKENS)
+    print(f"🗂️  Map-reduce: condensing {label} in {len(chunks)} chunks with {route_for('summary_map')['model']}...")
+    started = time.perf_counter()
+    _ensure_openai_key()
+    # Each worker runs in a copy of this context, so it keeps the run's model tier
+    contexts = [contextvars.copy_context() for _ in chunks]
+    with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+        notes = list(executor.map(lambda context, chunk: context.run(_condense_chunk, label, chunk), contexts, chunks))
+    print(f"✅ Condensed {len(chunks)} chunks in {time.perf_counter() - started:.1f}s")
+
+    return compact_text("\n".join(notes), budget, f"condensed {label}", strip_boilerplate=False)
+
+
+def structured_summaries_enabled() -> bool:
+    """Whether summaries are structured records (STRUCTURED_SUMMARIES=1) rather than prose."""
+    return os.getenv("STRUCTURED_SUMMARIES", "0").lower() in ("1", "true", "yes")
+
+
+def summary_format() -> str:
+    """Format of the summaries currently produced ("structured" or "prose")."""
+    return "structured" if structured_summaries_enabled() else "prose"
+
+
+def _render_list(label: str, items: List[str]) -> str:
+    """One prompt line for a list field, empty if there's nothing in it."""
+    items = [item.strip() for item in items if item.strip()]
+    return f"{label}: {'; '.join(items)}" if items else ""
+
+
+def render_cv_profile(profile: CVProfile) -> str:
+    """Short prompt fragment for a CV profile."""
+    lines = [
+        f"Name: {profile.name}",
+        f"Headline: {profile.headline}",
+        _render_list("Skills", profile.skills),
+        _render_list("Highlights", profile.highlights),
+        _render_list("Experience", profile.experience),
+        _render_list("Education", profile.education),
+        _render_list("Keywords", profile.keywords),
+    ]
+    return "\n".join(line for line in lines if line)
+
+
+def render_company_profile(profile: CompanyProfile) -> str:
+    """Short prompt fragment for a company profile."""
+    lines = [
+        f"Company: {profile.name}",
+        f"Mission: {profile.mission}",
+        _render_list("Products", profile.products),
+        _render_list("Values", profile.values),
+        _render_list("Culture", profile.culture),
+        _render_list("Keywords", profile.keywords),
+    ]
+    return "\n".join(line for line in lines if line)
+
+
+def summarize_cv_structured(raw_cv_text: str) -> CVProfile:
+    """
+    Summarize raw CV text into a compact structured profile.
+    
+    Args:
+        raw_cv_text: The full text extracted from the CV file
+        
+    Returns:
+        CVProfile with the facts the song and scenes draw on
+    """
+    _ensure_openai_key()
+    
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    
+    system_prompt = """You are an expert at summarizing resumes/CVs into compact profiles.
+
+Extract only what a funny "hire me" song about this person could use:
+- name: the candidate's name
+- headline: one line, e.g. "Backend engineer, 5 years in fintech"
+- skills: up to 8 key skills and technologies
+- highlights: up to 5 standout achievements, each one short phrase with numbers where given
+- experience: up to 4 entries as "Role at Company (years)"
+- education: up to 2 entries as "Degree, Institution"
+- keywords: up to 6 memorable words or phrases (projects, hobbies, awards)
+
+Keep every item short - phrases, not sentences. No contact details."""
+
+    print("Summarizing CV with OpenAI (structured)...")
+    
+    user_prompt = _prepare_input(raw_cv_text, CV_TOKEN_BUDGET, "CV", strip_boilerplate=False)
+    
+    try:
+        completion = create_completion(client, "summary_cv", [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ], response_format=CVProfile, input_text=user_prompt)
+    except ProviderError:
+        raise
+    except Exception as e:
+        raise Exception(f"Failed to summarize CV: {str(e)}")
+    
+    profile = completion.choices[0].message.parsed
+    
+    print(f"✅ Generated CV profile ({len(profile.skills)} skills, {len(profile.highlights)} highlights)")
+    
+    return profile
+
+
+def summarize_company_structured(website_text: str) -> CompanyProfile:
+    """
+    Summarize company website text into a compact structured profile.
+    
+    Args:
+        website_text: Text scraped from company website
+        
+    Returns:
+        CompanyProfile with what the company does and values
+    """
+    _ensure_openai_key()
+    
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    
+    system_prompt = """You are an expert at analyzing company websites into compact profiles.
+
+Extract:
+- name: the company name
+- mission: one sentence on what the company does and why
+- products: up to 5 main products or services
+- values: up to 5 stated values
+- culture: up to 4 short notes on how they work or who they hire
+- keywords: up to 6 distinctive words or phrases from the site
+
+Keep every item short - phrases, not sentences. Ignore navigation, legal and cookie text."""
+
+    print("Summarizing company website with OpenAI (structured)...")
+    
+    user_prompt = _prepare_input(website_text, WEBSITE_TOKEN_BUDGET, "website text")
+    
+    try:
+        completion = create_completion(client, "summary_company", [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ], response_format=CompanyProfile, input_text=user_prompt)
+    except ProviderError:
+        raise
+    except Exception as e:
+        raise Exception(f"Failed to summarize company website: {str(e)}")
+    
+    profile = completion.choices[0].message.parsed
+    
+    print(f"✅ Generated company profile ({len(profile.values)} values, {len(profile.products)} products)")
+    
+    return profile
+
+
 def summarize_cv(raw_cv_text: str) -> str:
     """
     Summarize raw CV text into a clean, structured outline.
@@ -29,7 +280,11 @@ def summarize_cv(raw_cv_text: str) -> str:
         
     Returns:
         A clean text summary outlining all experiences and qualifications
+        (a short rendered profile when STRUCTURED_SUMMARIES=1)
     """
+    if structured_summaries_enabled():
+        return render_cv_profile(summarize_cv_structured(raw_cv_text))
+    
     _ensure_openai_key()
     
     client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
@@ -51,14 +306,12 @@ Be comprehensive - don't leave out any experience or achievement."""
 
     print("Summarizing CV with OpenAI...")
     
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": raw_cv_text}
-        ],
-        temperature=0.3
-    )
+    user_prompt = _prepare_input(raw_cv_text, CV_TOKEN_BUDGET, "CV", strip_boilerplate=False)
+    
+    response = create_completion(client, "summary_cv", [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ], input_text=user_prompt)
     
     summary = response.choices[0].message.content
     
@@ -76,7 +329,11 @@ def summarize_company_website(website_text: str) -> str:
         
     Returns:
         A clean summary of what the company does and values
+        (a short rendered profile when STRUCTURED_SUMMARIES=1)
     """
+    if structured_summaries_enabled():
+        return render_company_profile(summarize_company_structured(website_text))
+    
     _ensure_openai_key()
     
     client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
@@ -92,14 +349,12 @@ Be thorough and include everything important. Format as a clear, readable summar
 
     print("Summarizing company website with OpenAI...")
     
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": website_text}
-        ],
-        temperature=0.3
-    )
+    user_prompt = _prepare_input(website_text, WEBSITE_TOKEN_BUDGET, "website text")
+    
+    response = create_completion(client, "summary_company", [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ], input_text=user_prompt)
     
     summary = response.choices[0].message.content
     
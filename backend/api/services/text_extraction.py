@@ -1,33 +1,211 @@
 """
 Text extraction service for CV PDFs.
-Extracts raw text from PDF files.
+Extracts raw text from PDF files within a page, character and time budget.
+The PDF is opened and its pages parsed in a shared process pool, so a file
+that hangs the parser (a huge xref table, a deeply nested page tree) can be
+killed at the deadline.
 """
 
+import os
+import time
+import threading
+import multiprocessing
+from typing import List, Optional, Tuple
+
 from PyPDF2 import PdfReader
 
+# Stop once this much text has been extracted (a CV rarely needs more)
+MAX_CHARS = int(os.getenv("CV_MAX_CHARS", "20000"))
+
+# Never read past this page; the text notes when pages were left out
+MAX_PAGES = int(os.getenv("CV_MAX_PAGES", "30"))
+
+# Hard limit on extraction time, in seconds
+EXTRACT_TIMEOUT = float(os.getenv("CV_EXTRACT_TIMEOUT", "20"))
+
+# Workers in the shared pool; 0 extracts in the calling thread (no hard timeout)
+EXTRACT_WORKERS = int(os.getenv("CV_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# How often a caller waiting on a page checks whether its pool was replaced
+POOL_POLL_INTERVAL = 0.5
+
+_pool = None
+_pool_lock = threading.Lock()
 
-def extract_text_from_pdf(pdf_path: str) -> str:
+
+def _extract_page(pdf_path: str, index: int) -> Tuple[int, str, float, int]:
+    """
+    Extract one page in a worker process: (page index, text, seconds, pages in the PDF).
+
+    Pages are submitted before the page count is known, so an index past
+    the end returns empty text.
+    """
+    started = time.perf_counter()
+    pages = PdfReader(pdf_path).pages
+    total_pages = len(pages)
+    text = (pages[index].extract_text() or "") if index < total_pages else ""
+    return index, text, time.perf_counter() - started, total_pages
+
+
+def _pool_context():
+    """Process start method: forkserver where available (safe in a threaded server), else spawn."""
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])  # Workers start with PyPDF2 already imported
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _get_pool():
+    """The shared extraction pool, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _pool_context().Pool(EXTRACT_WORKERS)
+        return _pool
+
+
+def _retire_pool(pool) -> None:
+    """Kill a pool with a hung worker; the next caller starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.terminate()
+
+
+def shutdown_extraction_pool() -> None:
+    """Stop the shared extraction pool (on app shutdown)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.terminate()
+
+
+def _extract_serial(pdf_path: str, max_pages: int, max_chars: int, deadline: float) -> Tuple[List[Tuple[int, str, float]], int]:
+    """Extract pages in order in this thread, stopping at the character budget or deadline."""
+    reader = PdfReader(pdf_path)
+    total_pages = len(reader.pages)
+    pages = []
+    length = 0
+    for index in range(min(total_pages, max_pages)):
+        if time.monotonic() > deadline:
+            print(f"⚠️  PDF extraction deadline reached after {index} pages")
+            break
+        started = time.perf_counter()
+        text = reader.pages[index].extract_text() or ""
+        pages.append((index, text, time.perf_counter() - started))
+        length += len(text) + 1
+        if length >= max_chars:
+            break
+    return pages, total_pages
+
+
+def _extract_pooled(pdf_path: str, max_pages: int, max_chars: int, deadline: float) -> Tuple[List[Tuple[int, str, float]], int]:
+    """
+    Extract pages in the shared process pool, collecting them in order.
+
+    Workers open the PDF themselves and report its page count with each
+    page, so nothing in this thread parses the file. At most EXTRACT_WORKERS
+    pages are submitted ahead, so little work is wasted once the character
+    budget is filled. At the deadline the pool is retired and terminated,
+    so a file that hangs the parser can't hold up the run; other callers on
+    that pool resubmit their pages to a new one.
+
+    Returns:
+        (index, text, seconds) per extracted page, and the PDF's page count
+        (0 if no page finished in time)
+    """
+    pages = []
+    length = 0
+    total_pages = 0
+    page_count = max_pages  # Until the first page reports the real count
+    pool = _get_pool()
+    pending = {}
+    index = 0
+    while index < page_count:
+        for ahead in range(index, min(page_count, index + EXTRACT_WORKERS)):
+            if ahead not in pending:
+                pending[ahead] = pool.apply_async(_extract_page, (pdf_path, ahead))
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            print(f"⚠️  PDF extraction timed out after {len(pages)} pages")
+            _retire_pool(pool)
+            break
+        try:
+            page = pending[index].get(timeout=min(remaining, POOL_POLL_INTERVAL))
+        except multiprocessing.TimeoutError:
+            if _pool is not pool:
+                # Another caller killed this pool over a hung page - start over on a fresh one
+                pool = _get_pool()
+                pending = {}
+            continue
+
+        del pending[index]
+        index += 1
+        total_pages = page[3]
+        page_count = min(total_pages, max_pages)
+        if page[0] >= page_count:
+            break
+        pages.append(page[:3])
+        length += len(page[1]) + 1
+        if length >= max_chars:
+            break
+    return pages, total_pages
+
+
+def extract_text_from_pdf(
+    pdf_path: str,
+    max_chars: Optional[int] = None,
+    max_pages: Optional[int] = None,
+    timeout: Optional[float] = None
+) -> str:
     """
     Extract raw text from a PDF file.
-    
+
+    Reads pages in order until the character budget is filled. The PDF is
+    opened and parsed in the shared process pool with a hard timeout (in
+    this thread, without one, when CV_EXTRACT_WORKERS=0). When pages past
+    max_pages are left out, the text ends with a note saying so.
+
     Args:
         pdf_path: Path to the PDF file
-        
+        max_chars: Character budget (default CV_MAX_CHARS)
+        max_pages: Maximum pages to read (default CV_MAX_PAGES)
+        timeout: Seconds allowed for extraction (default CV_EXTRACT_TIMEOUT)
+
     Returns:
         Extracted text as a single string
+
+    Raises:
+        Exception: If no page could be extracted in time
     """
+    max_chars = max_chars or MAX_CHARS
+    max_pages = max_pages or MAX_PAGES
+    deadline = time.monotonic() + (timeout or EXTRACT_TIMEOUT)
+    started = time.perf_counter()
     print(f"Extracting text from: {pdf_path}")
-    
-    reader = PdfReader(pdf_path)
-    text_parts = []
-    
-    for page in reader.pages:
-        text_parts.append(page.extract_text())
-        text_parts.append("\n")
-    
-    text = "".join(text_parts)
-    
-    print(f"✅ Extracted {len(text)} characters from {len(reader.pages)} pages")
-    
-    return text
 
+    if EXTRACT_WORKERS > 0:
+        pages, total_pages = _extract_pooled(pdf_path, max_pages, max_chars, deadline)
+    else:
+        pages, total_pages = _extract_serial(pdf_path, max_pages, max_chars, deadline)
+
+    if not pages and (total_pages or time.monotonic() > deadline):
+        raise Exception(f"Timed out extracting text from {pdf_path}")
+
+    text = "".join(page_text + "\n" for _, page_text, _ in pages)
+    if len(text) > max_chars:
+        text = text[:max_chars]
+        print(f"⚠️  CV text truncated to {max_chars} characters")
+    elif total_pages > max_pages and len(pages) == max_pages:
+        print(f"⚠️  Read the first {max_pages} of {total_pages} pages")
+        text += f"[Only the first {max_pages} of {total_pages} pages were read]\n"
+
+    timings = ", ".join(f"p{index + 1} {seconds:.2f}s" for index, _, seconds in pages)
+    print(f"⏱️  Page timings: {timings}")
+    print(f"✅ Extracted {len(text)} characters from {len(pages)}/{total_pages} pages in {time.perf_counter() - started:.2f}s")
+
+    return text
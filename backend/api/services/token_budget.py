@@ -0,0 +1,180 @@
+"""
+Token budgeting for LLM inputs.
+Counts tokens locally and compacts text before it is sent to a model:
+repeated lines and common website boilerplate (cookie banners, menus,
+copyright lines) are dropped, and the result is cut to a per-call budget.
+"""
+
+import os
+import re
+from typing import List
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Per-call input budgets, in tokens
+CV_TOKEN_BUDGET = int(os.getenv("LLM_BUDGET_CV", "4000"))
+WEBSITE_TOKEN_BUDGET = int(os.getenv("LLM_BUDGET_WEBSITE", "3000"))
+SUMMARY_TOKEN_BUDGET = int(os.getenv("LLM_BUDGET_SUMMARY", "1200"))
+
+# Short lines matching these are website chrome, not content
+BOILERPLATE_PATTERNS = [
+    r"\bcookies?\b",
+    r"\bconsent\b",
+    r"\baccept all\b",
+    r"\bprivacy (policy|notice|settings)\b",
+    r"\bterms (of (use|service)|and conditions)\b",
+    r"\ball rights reserved\b",
+    r"^(©|\(c\)|copyright)\s",
+    r"\bskip to (main )?content\b",
+    r"^(sign|log) ?(in|up|out)$",
+    r"^(subscribe|newsletter|menu|search|close|back to top|toggle navigation)$",
+    r"^(follow us|share( this)?)\b",
+    r"^page \d+( of \d+)?$",
+]
+_BOILERPLATE = re.compile("|".join(BOILERPLATE_PATTERNS), re.IGNORECASE)
+BOILERPLATE_MAX_CHARS = 200
+
+_WORDS = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding():
+    """tiktoken's GPT-4o encoding, or None if tiktoken or its data isn't available."""
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            _encoding_failed = True
+            print(f"⚠️  tiktoken encoding unavailable, estimating token counts: {str(e)[:80]}")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Number of tokens in a text for OpenAI models.
+
+    Uses tiktoken when available; otherwise estimates from words and
+    punctuation (long words count as several tokens), which slightly
+    overcounts typical English so budgets stay safe.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return sum(1 + len(word) // 6 for word in _WORDS.findall(text))
+
+
+def _lines(text: str) -> List[str]:
+    """Whitespace-normalized, non-empty lines (paragraphs, for scraped text)."""
+    return [line for line in (" ".join(raw.split()) for raw in text.splitlines()) if line]
+
+
+def _segments(text: str) -> List[str]:
+    """Whitespace-normalized lines; very long lines are split into sentences."""
+    segments = []
+    for line in _lines(text):
+        if len(line) > 300:
+            segments.extend(_SENTENCE_END.split(line))
+        else:
+            segments.append(line)
+    return segments
+
+
+def compact_text(text: str, max_tokens: int, label: str = "text", strip_boilerplate: bool = True) -> str:
+    """
+    Shrink text to fit a token budget.
+
+    Drops repeated lines (case-insensitive, first one kept) and, optionally,
+    short boilerplate lines, then keeps lines in order until the budget is
+    used; a line that doesn't fit is cut at a word boundary. Only whole
+    lines are compared, so text must have one paragraph per line - a
+    phrase repeated inside a paragraph is never dropped.
+
+    Args:
+        text: Text to compact
+        max_tokens: Token budget for the result
+        label: Name used in the log line (e.g. "CV")
+        strip_boilerplate: Also drop cookie banners, menu items and similar lines
+
+    Returns:
+        The compacted text
+    """
+    if not text:
+        return text
+
+    seen = set()
+    kept = []
+    used = 0
+    for line in _lines(text):
+        key = line.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        if strip_boilerplate and len(line) <= BOILERPLATE_MAX_CHARS and _BOILERPLATE.search(line):
+            continue
+
+        tokens = count_tokens(line) + 1
+        if used + tokens > max_tokens:
+            kept.append(_truncate_tokens(line, max_tokens - used))
+            break
+        kept.append(line)
+        used += tokens
+
+    result = "\n".join(line for line in kept if line)
+    before, after = count_tokens(text), count_tokens(result)
+    if after < before:
+        print(f"✂️  Compacted {label}: {before} -> {after} tokens (budget {max_tokens})")
+    return result
+
+
+def _truncate_tokens(text: str, max_tokens: int) -> str:
+    """Longest word-boundary prefix of text within max_tokens (empty if none)."""
+    if max_tokens <= 0:
+        return ""
+    words = text.split(" ")
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle])) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low])
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into consecutive chunks of at most max_tokens, breaking between lines.
+
+    A single line longer than the budget is split at word boundaries.
+    """
+    chunks = []
+    current = []
+    used = 0
+    for segment in _segments(text):
+        tokens = count_tokens(segment) + 1
+        while tokens > max_tokens:
+            head = _truncate_tokens(segment, max_tokens) or segment.split(" ")[0]
+            if current:
+                chunks.append("\n".join(current))
+                current, used = [], 0
+            chunks.append(head)
+            segment = segment[len(head):].strip()
+            tokens = count_tokens(segment) + 1 if segment else 0
+        if not segment:
+            continue
+        if used + tokens > max_tokens and current:
+            chunks.append("\n".join(current))
+            current, used = [], 0
+        current.append(segment)
+        used += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
@@ -8,6 +8,9 @@ import fal_client
 from dotenv import load_dotenv
 from typing import Dict, Any, Optional
 
+from .resilience import call_with_retry, ProviderError
+from .hedging import run_fal_job
+
 
 def _ensure_fal_key():
     """Load .env and ensure FAL_KEY is available."""
@@ -49,7 +52,7 @@ def generate_video_from_image(
     try:
         # Upload the local image file to Fal's storage
         print(f"Uploading image: {image_path}")
-        image_url = fal_client.upload_file(image_path)
+        image_url = call_with_retry("fal", lambda remaining: fal_client.upload_file(image_path), label="upload")
         print(f"Image uploaded: {image_url}")
         
         # Prepare arguments
@@ -71,15 +74,21 @@ def generate_video_from_image(
         print(f"  Duration: {duration}s")
         print(f"  This may take 30-60 seconds...\n")
         
-        # Call the API
-        result = fal_client.run(
-            "fal-ai/kling-video/v2.5-turbo/pro/image-to-video",
-            arguments=arguments
+        # Call the API (hedged if FAL_HEDGING=1)
+        result = call_with_retry(
+            "fal",
+            lambda remaining: run_fal_job(
+                "fal-ai/kling-video/v2.5-turbo/pro/image-to-video", arguments, remaining, slot="fal:kling"
+            ),
+            label="Kling video",
+            slot="fal:kling"
         )
         
         print(f"✅ Video generation complete!")
         return result
         
+    except ProviderError:
+        raise
     except Exception as e:
         print(f"Error in video generation: {str(e)}")
         raise Exception(f"Failed to generate video with Kling: {str(e)}")
@@ -130,15 +139,21 @@ def generate_video_from_url(
         print(f"  Duration: {duration}s")
         print(f"  This may take 30-60 seconds...\n")
         
-        # Call the API
-        result = fal_client.run(
-            "fal-ai/kling-video/v2.5-turbo/pro/image-to-video",
-            arguments=arguments
+        # Call the API (hedged if FAL_HEDGING=1)
+        result = call_with_retry(
+            "fal",
+            lambda remaining: run_fal_job(
+                "fal-ai/kling-video/v2.5-turbo/pro/image-to-video", arguments, remaining, slot="fal:kling"
+            ),
+            label="Kling video",
+            slot="fal:kling"
         )
         
         print(f"✅ Video generation complete!")
         return result
         
+    except ProviderError:
+        raise
     except Exception as e:
         print(f"Error in video generation: {str(e)}")
         raise Exception(f"Failed to generate video with Kling: {str(e)}")
@@ -1,17 +1,225 @@
 """
 Website scraper service.
-Scrapes text content from company websites.
+Scrapes text content from company websites, either a single page or a
+bounded concurrent crawl of the site's most useful pages.
 """
 
+import os
+import re
+import json
+import time
+import asyncio
+import codecs
+import hashlib
+import httpx
 import requests
-from bs4 import BeautifulSoup
-from typing import Optional
+from typing import Optional, List, Dict, Any, Callable, Iterable
+from urllib.parse import urljoin, urlsplit
+
+from .html_extraction import extract_text, default_extractor
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Pages worth crawling, best first
+HIGH_VALUE_KEYWORDS = [
+    "about", "mission", "values", "culture", "careers", "jobs",
+    "who-we-are", "what-we-do", "company", "team",
+]
+
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.getenv("HIRESONG_DATA_DIR", os.path.join(_current_dir, '..', '..', 'data'))
+HTTP_CACHE_DIR = os.path.join(DATA_DIR, 'http_cache')
+
+# Bump when extracted text changes shape, so cached extractions from older code aren't served
+EXTRACTION_VERSION = 2
+
+
+def http_cache_enabled() -> bool:
+    """Whether the on-disk HTTP cache is turned on (SCRAPER_HTTP_CACHE=0 disables it)."""
+    return os.getenv("SCRAPER_HTTP_CACHE", "1").lower() not in ("0", "false", "no")
+
+
+def _http_cache_paths(url: str):
+    """(metadata path, body path) for a URL's cache entry."""
+    digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    base = os.path.join(HTTP_CACHE_DIR, digest)
+    return base + ".json", base + ".html"
+
+
+def _load_http_cache(url: str) -> Optional[Dict[str, Any]]:
+    """Cached validators and extracted text for a URL, or None."""
+    if not http_cache_enabled():
+        return None
+    meta_path, _ = _http_cache_paths(url)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return entry if entry.get("url") == url else None
+
+
+def _load_cached_body(url: str) -> Optional[bytes]:
+    """Cached response body for a URL, or None."""
+    _, body_path = _http_cache_paths(url)
+    try:
+        with open(body_path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _save_http_cache(url: str, entry: Dict[str, Any], body: Optional[bytes]) -> None:
+    """Write a cache entry (and the body, when it changed) atomically."""
+    if not http_cache_enabled():
+        return
+    meta_path, body_path = _http_cache_paths(url)
+    try:
+        os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+        if body is not None:
+            with open(body_path + ".tmp", 'wb') as f:
+                f.write(body)
+            os.replace(body_path + ".tmp", body_path)
+        with open(meta_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(meta_path + ".tmp", meta_path)
+    except OSError as e:
+        print(f"⚠️  Warning: Could not write HTTP cache: {str(e)}")
+
+
+def _conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Request headers that let the server answer 304 Not Modified."""
+    headers = dict(HEADERS)
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def _cache_can_answer(url: str, entry: Optional[Dict[str, Any]], kind: str) -> bool:
+    """Whether a 304 can be served from the cache: the extraction, or the body to redo it, is still there."""
+    return bool(entry) and (kind in entry["extracted"] or os.path.exists(_http_cache_paths(url)[1]))
+
+
+def _extract_with_cache(
+    url: str,
+    entry: Optional[Dict[str, Any]],
+    status: int,
+    body: bytes,
+    response_headers,
+    kind: str,
+    extractor: Callable[[bytes], Any]
+) -> Any:
+    """
+    Extract text from a response, reusing the cached extraction when possible.
+    
+    A 304, or a 200 with the same body as last time, reuses the cached text
+    without parsing. Otherwise the page is parsed and the cache updated.
+    
+    Args:
+        url: Page URL
+        entry: Cache entry loaded before the request (or None)
+        status: HTTP status code
+        body: Response body (empty on 304)
+        response_headers: Response headers (for ETag / Last-Modified)
+        kind: Which extraction this is, including backend and budget (e.g. "text:lxml:10000")
+        extractor: Parses a body into the extracted value
+        
+    Returns:
+        The extracted value
+        
+    Raises:
+        Exception: On a 304 that the cache can't answer (callers refetch
+                   without validators first, see _cache_can_answer)
+    """
+    new_body = None
+    if status == 304 and not entry:
+        raise Exception(f"{url} answered 304 Not Modified but nothing is cached")
+    if status == 304:
+        body_hash = entry["sha256"]
+    else:
+        body_hash = hashlib.sha256(body).hexdigest()
+        if not entry or entry.get("sha256") != body_hash:
+            entry = {"url": url, "sha256": body_hash, "extracted": {}}
+            new_body = body
+        entry["etag"] = response_headers.get("ETag")
+        entry["last_modified"] = response_headers.get("Last-Modified")
+    
+    if kind in entry["extracted"]:
+        print(f"⚡ HTTP cache: reusing parsed text for {url}" + (" (304)" if status == 304 else ""))
+        if status == 304:
+            return entry["extracted"][kind]
+        value = entry["extracted"][kind]
+    else:
+        if status == 304:
+            body = _load_cached_body(url)
+            if body is None:
+                raise Exception(f"{url} answered 304 Not Modified but its cached body is gone")
+        value = extractor(body)
+        entry["extracted"][kind] = value
+    
+    entry["fetched_at"] = time.time()
+    _save_http_cache(url, entry, new_body)
+    return value
+
+
+# Hard cap on bytes read per response (SCRAPER_MAX_BYTES)
+MAX_BYTES = int(os.getenv("SCRAPER_MAX_BYTES", str(2 * 1024 * 1024)))
+
+# Content types we know how to extract text from
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?\s*([\w.:-]+)', re.IGNORECASE)
+
+
+def _check_content_type(url: str, content_type: Optional[str]) -> None:
+    """Raise if a response isn't HTML (a missing header is given the benefit of the doubt)."""
+    if not content_type:
+        return
+    mime = content_type.split(";")[0].strip().lower()
+    if mime not in HTML_CONTENT_TYPES:
+        raise Exception(f"Unsupported content type '{mime}' at {url} (expected HTML)")
+
+
+def _charset(content_type: Optional[str], body: bytes) -> str:
+    """Encoding of a page: Content-Type charset, then <meta charset>, then UTF-8."""
+    for param in (content_type or "").split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset" and value.strip():
+            candidate = value.strip().strip('"\'')
+            break
+    else:
+        match = _META_CHARSET.search(body[:2048])
+        candidate = match.group(1).decode("ascii", "ignore") if match else "utf-8"
+    try:
+        codecs.lookup(candidate)
+        return candidate
+    except LookupError:
+        return "utf-8"
+
+
+def _read_capped(chunks: Iterable[bytes], url: str, max_bytes: int) -> bytes:
+    """Join streamed body chunks, stopping at max_bytes."""
+    body = bytearray()
+    for chunk in chunks:
+        body += chunk
+        if len(body) >= max_bytes:
+            print(f"⚠️  Stopped reading {url} at {max_bytes} bytes")
+            return bytes(body[:max_bytes])
+    return bytes(body)
 
 
 def scrape_website(url: str, max_chars: int = 10000) -> str:
     """
     Scrape text content from a website URL.
     
+    The body is streamed and capped at MAX_BYTES, non-HTML responses are
+    rejected, and parsing stops once max_chars of text has been collected.
+    
     Args:
         url: The website URL to scrape
         max_chars: Maximum characters to return (to avoid huge texts)
@@ -22,29 +230,28 @@ def scrape_website(url: str, max_chars: int = 10000) -> str:
     print(f"Scraping website: {url}")
     
     try:
-        # Add headers to avoid being blocked
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+        backend = default_extractor()
+        kind = f"text:v{EXTRACTION_VERSION}:{backend}:{max_chars}"
         
-        # Fetch the page
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
+        # Fetch the page (with headers to avoid being blocked), revalidating any cached copy
+        cached = _load_http_cache(url)
+        while True:
+            with requests.get(url, headers=_conditional_headers(cached), timeout=10, stream=True) as response:
+                body = b""
+                if response.status_code != 304:
+                    response.raise_for_status()
+                    _check_content_type(url, response.headers.get("Content-Type"))
+                    body = _read_capped(response.iter_content(64 * 1024), url, MAX_BYTES)
+            if response.status_code != 304 or not cached or _cache_can_answer(url, cached, kind):
+                break
+            print(f"⚠️  HTTP cache: {url} not modified but its cached copy is gone, fetching it again")
+            cached = None
         
-        # Parse with BeautifulSoup
-        soup = BeautifulSoup(response.content, 'html.parser')
+        def page_text(html: bytes) -> str:
+            encoding = _charset(response.headers.get("Content-Type"), html)
+            return "\n".join(extract_text(html, max_chars, encoding, backend=backend)["blocks"])
         
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header"]):
-            script.decompose()
-        
-        # Get text content
-        text = soup.get_text(separator=' ', strip=True)
-        
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
+        text = _extract_with_cache(url, cached, response.status_code, body, response.headers, kind, page_text)
         
         # Limit length
         if len(text) > max_chars:
@@ -62,3 +269,181 @@ def scrape_website(url: str, max_chars: int = 10000) -> str:
     except Exception as e:
         raise Exception(f"Error scraping website: {str(e)}")
 
+
+def crawl_enabled() -> bool:
+    """Whether company scraping should crawl several pages (SCRAPER_CRAWL=1)."""
+    return os.getenv("SCRAPER_CRAWL", "0").lower() in ("1", "true", "yes")
+
+
+def _page_score(url: str) -> Optional[int]:
+    """Rank of a URL by HIGH_VALUE_KEYWORDS (lower is better), None if not interesting."""
+    path = urlsplit(url).path.lower()
+    for rank, keyword in enumerate(HIGH_VALUE_KEYWORDS):
+        if keyword in path:
+            return rank
+    return None
+
+
+def _candidate_pages(base_url: str, hrefs: List[str], sitemap_xml: str) -> List[str]:
+    """High-value same-site pages linked from the landing page or listed in the sitemap."""
+    host = urlsplit(base_url).netloc.lower()
+    links = [urljoin(base_url, href) for href in hrefs]
+    links += re.findall(r"<loc>\s*([^<\s]+)\s*</loc>", sitemap_xml or "")
+
+    scored = {}
+    for link in links:
+        parts = urlsplit(link)
+        if parts.scheme not in ("http", "https") or parts.netloc.lower() != host:
+            continue
+        page = f"{parts.scheme}://{parts.netloc}{parts.path.rstrip('/')}"
+        if page.rstrip('/') == base_url.rstrip('/'):
+            continue
+        score = _page_score(page)
+        if score is not None:
+            # Prefer shallow pages (/about over /about/team/jane)
+            scored[page] = min(scored.get(page, 999), score * 10 + page.count('/'))
+
+    return sorted(scored, key=scored.get)
+
+
+async def _read_capped_async(response: httpx.Response, url: str, max_bytes: int) -> bytes:
+    """Stream an httpx response body, stopping at max_bytes."""
+    body = bytearray()
+    async for chunk in response.aiter_bytes():
+        body += chunk
+        if len(body) >= max_bytes:
+            print(f"⚠️  Stopped reading {url} at {max_bytes} bytes")
+            return bytes(body[:max_bytes])
+    return bytes(body)
+
+
+async def _fetch(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    url: str,
+    timeout: float,
+    max_chars: int,
+    collect_links: bool = False
+) -> Dict[str, List[str]]:
+    """GET a page under the per-host concurrency limit and return its links and text blocks."""
+    backend = default_extractor()
+    kind = f"page:v{EXTRACTION_VERSION}:{backend}:{max_chars}" + (":links" if collect_links else "")
+    cached = _load_http_cache(url)
+    while True:
+        async with semaphore:
+            async with client.stream("GET", url, headers=_conditional_headers(cached), timeout=timeout) as response:
+                body = b""
+                if response.status_code != 304:
+                    response.raise_for_status()
+                    _check_content_type(url, response.headers.get("Content-Type"))
+                    body = await _read_capped_async(response, url, MAX_BYTES)
+        if response.status_code != 304 or not cached or _cache_can_answer(url, cached, kind):
+            break
+        print(f"⚠️  HTTP cache: {url} not modified but its cached copy is gone, fetching it again")
+        cached = None
+    
+    def extract_page(html: bytes) -> Dict[str, List[str]]:
+        encoding = _charset(response.headers.get("Content-Type"), html)
+        return extract_text(html, max_chars, encoding, collect_links=collect_links, backend=backend)
+    
+    # Parse off the event loop (skipped entirely on a cache hit)
+    return await asyncio.get_running_loop().run_in_executor(
+        None, _extract_with_cache,
+        url, cached, response.status_code, body, response.headers, kind, extract_page
+    )
+
+
+async def _fetch_raw(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, url: str, timeout: float) -> bytes:
+    """GET a resource under the per-host concurrency limit, reading at most MAX_BYTES."""
+    async with semaphore:
+        async with client.stream("GET", url, timeout=timeout) as response:
+            response.raise_for_status()
+            return await _read_capped_async(response, url, MAX_BYTES)
+
+
+async def crawl_website(
+    url: str,
+    max_chars: int = 10000,
+    max_pages: int = 6,
+    per_host_concurrency: int = 4,
+    time_budget: float = 8.0
+) -> str:
+    """
+    Crawl a company website's landing page plus its high-value pages.
+    
+    The landing page and sitemap.xml are fetched together, then the best
+    about/careers/mission pages are fetched concurrently over one pooled
+    session. Pages are revalidated against the HTTP cache, so unchanged
+    pages aren't downloaded or parsed again. Whatever has arrived when the time budget runs out is used, so
+    latency stays close to two round trips. Blocks repeated across pages
+    (menus, cookie banners) are kept only once.
+    
+    Args:
+        url: The company website URL
+        max_chars: Maximum characters to return
+        max_pages: Maximum pages to fetch, including the landing page
+        per_host_concurrency: Maximum simultaneous requests to the site
+        time_budget: Overall seconds allowed for the crawl
+        
+    Returns:
+        Merged text content as a string
+    """
+    print(f"Crawling website: {url} (up to {max_pages} pages, {time_budget:.0f}s budget)")
+    deadline = time.monotonic() + time_budget
+    semaphore = asyncio.Semaphore(per_host_concurrency)
+    
+    async with httpx.AsyncClient(headers=HEADERS, follow_redirects=True) as client:
+        landing_task = asyncio.ensure_future(_fetch(client, semaphore, url, time_budget, max_chars, collect_links=True))
+        sitemap_task = asyncio.ensure_future(_fetch_raw(client, semaphore, urljoin(url, "/sitemap.xml"), time_budget / 2))
+        
+        try:
+            # httpx timeouts are per read, so a slowly trickling page also needs the overall budget
+            landing = await asyncio.wait_for(landing_task, timeout=max(0.1, deadline - time.monotonic()))
+        except (httpx.TimeoutException, asyncio.TimeoutError):
+            sitemap_task.cancel()
+            raise Exception(f"Timeout while scraping {url}")
+        except httpx.HTTPError as e:
+            sitemap_task.cancel()
+            raise Exception(f"Failed to scrape {url}: {str(e)}")
+        
+        sitemap_xml = ""
+        try:
+            remaining = max(0.0, deadline - time.monotonic())
+            sitemap_xml = (await asyncio.wait_for(sitemap_task, timeout=min(remaining, 1.0))).decode('utf-8', 'ignore')
+        except Exception:
+            pass  # Sitemaps are optional
+        
+        pages = _candidate_pages(url, landing["links"], sitemap_xml)[:max_pages - 1]
+        remaining = deadline - time.monotonic()
+        
+        fetched = []
+        if pages and remaining > 0:
+            page_tasks = [asyncio.ensure_future(_fetch(client, semaphore, page, remaining, max_chars)) for page in pages]
+            done, pending = await asyncio.wait(page_tasks, timeout=remaining)
+            for task in pending:
+                task.cancel()
+            fetched = [task.result() for task in page_tasks if task in done and not task.exception()]
+    
+    # Landing page first so its text survives the cap
+    seen = set()
+    parts = []
+    length = 0
+    for page in [landing] + fetched:
+        for block in page["blocks"]:
+            key = block.lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            parts.append(block)
+            length += len(block) + 1
+        if length >= max_chars:
+            break
+    
+    text = "\n".join(parts)
+    if len(text) > max_chars:
+        text = text[:max_chars]
+        print(f"⚠️  Text truncated to {max_chars} characters")
+    
+    print(f"✅ Crawled {1 + len(fetched)}/{1 + len(pages)} pages, {len(text)} characters from {url}")
+    
+    return text
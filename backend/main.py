@@ -2,9 +2,15 @@
 FastAPI application for HireSong backend.
 """
 
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from api.routes import router
+from api.services.db_queue import start_flusher, flush_pending
+from api.services.admission import AdmissionMiddleware
+from api.services.concurrency import shutdown_provider_pool
+from api.services.text_extraction import shutdown_extraction_pool
 
 # Create FastAPI app
 app = FastAPI(
@@ -13,6 +19,10 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Admit or reject pipeline runs before their uploads are read (added first so
+# CORS still wraps the 429 responses)
+app.add_middleware(AdmissionMiddleware)
+
 # Configure CORS for frontend
 app.add_middleware(
     CORSMiddleware,
@@ -22,6 +32,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.on_event("startup")
+async def start_database_flusher():
+    """Replay any journaled database updates and start the background flusher."""
+    start_flusher()
+
+
+@app.on_event("shutdown")
+async def drain_database_queue():
+    """Write queued database updates before the process exits (off the event loop)."""
+    pending = await asyncio.get_running_loop().run_in_executor(None, flush_pending)
+    if pending:
+        print(f"⚠️  Warning: {pending} database updates still pending at shutdown (kept in the journal)")
+
+
+@app.on_event("shutdown")
+async def stop_provider_pool():
+    """Stop the thread pool used for provider calls."""
+    shutdown_provider_pool()
+
+
+@app.on_event("shutdown")
+async def stop_extraction_pool():
+    """Stop the PDF extraction worker processes."""
+    shutdown_extraction_pool()
+
+
 # Include API routes
 app.include_router(router, prefix="/api", tags=["HireSong"])
 
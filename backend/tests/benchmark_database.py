@@ -0,0 +1,140 @@
+"""
+Benchmark database logging against the in-process Google Sheets emulator.
+Reports Sheets round trips and wall time added to the pipeline per run,
+with time spent waiting on the Sheets quota governor shown separately.
+
+The write-through baseline runs with the governor out of the way (unless
+--governed-baseline), so its added time is the cost of synchronous Sheets
+writes rather than of the token bucket.
+
+Usage: python backend/tests/benchmark_database.py [--runs 20] [--latency 0.3] [--quota 60] [--governed-baseline]
+
+No credentials or network needed.
+"""
+
+import sys
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+
+parser = argparse.ArgumentParser(description="Benchmark HireSong database logging")
+parser.add_argument("--runs", type=int, default=20, help="Concurrent pipeline runs to simulate")
+parser.add_argument("--latency", type=float, default=0.3, help="Emulated seconds per Sheets call")
+parser.add_argument("--quota", type=int, default=None, help="Emulated Sheets calls per minute (default: unlimited)")
+parser.add_argument("--governed-baseline", action="store_true",
+                    help="Keep the quota governor at its configured rate for the write-through baseline")
+args = parser.parse_args()
+
+# Configure the emulator BEFORE importing the service
+os.environ["SHEETS_EMULATOR"] = "1"
+os.environ["SHEETS_EMULATOR_LATENCY"] = str(args.latency)
+os.environ["SHEETS_EMULATOR_JITTER"] = "0"
+if args.quota:
+    os.environ["SHEETS_EMULATOR_QUOTA"] = str(args.quota)
+os.environ["HIRESONG_DATA_DIR"] = tempfile.mkdtemp(prefix="hiresong_bench_")
+os.environ["DB_FLUSH_INTERVAL"] = "0.5"
+
+# Point sys.path at backend/ (where 'api' lives)
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+from api.services.database import (
+    save_pipeline_start,
+    update_pipeline_progress,
+    save_pipeline_completion,
+    get_all_runs
+)
+from api.services.db_queue import flush_pending
+from api.services.sheets_emulator import get_emulated_sheet
+from api.services import sheets_quota
+from api.services.sheets_quota import REQUESTS_PER_MINUTE
+
+SONG_DATA = {
+    "song_title": "Benchmark Ballad",
+    "genre": "Pop",
+    "bpm": 120,
+    "mood": "Upbeat",
+    "scenes": [{"scene_num": i, "lyrics": f"Line {i}"} for i in range(1, 7)]
+}
+
+_governor_lock = threading.Lock()
+_governor_wait = [0.0]
+_acquire = sheets_quota.acquire
+
+
+def _timed_acquire() -> None:
+    """sheets_quota.acquire, adding the time spent waiting for a token to _governor_wait."""
+    started = time.perf_counter()
+    _acquire()
+    with _governor_lock:
+        _governor_wait[0] += time.perf_counter() - started
+
+
+sheets_quota.acquire = _timed_acquire
+
+
+async def simulate_run(run_id: str, write_through: bool) -> float:
+    """Make the orchestrator's database calls for one run; return seconds spent blocked on them."""
+    calls = [
+        lambda: save_pipeline_start(run_id, "https://example.com", "Pop"),
+        lambda: update_pipeline_progress(run_id, cv_summary="CV " * 300, company_summary="Company " * 300),
+        lambda: update_pipeline_progress(run_id, song_data=SONG_DATA, output_dir=f"/results/{run_id}"),
+        lambda: save_pipeline_completion(
+            run_id, f"/results/{run_id}/08_final_video.mp4", "",
+            [f"https://fal.media/{run_id}/image_{i}.jpg" for i in range(6)],
+            [f"https://fal.media/{run_id}/video_{i}.mp4" for i in range(6)]
+        ),
+    ]
+
+    blocked = 0.0
+    for call in calls:
+        started = time.perf_counter()
+        call()
+        if write_through:
+            flush_pending()  # What a synchronous Sheets write would cost the pipeline
+        blocked += time.perf_counter() - started
+        await asyncio.sleep(0.05)  # The pipeline step between database calls
+    return blocked
+
+
+async def benchmark(label: str, write_through: bool, governed: bool = True):
+    sheet = get_emulated_sheet()
+    flush_pending()
+    sheet.reset_stats()
+    sheets_quota.REQUESTS_PER_MINUTE = REQUESTS_PER_MINUTE if governed else float("inf")
+    _governor_wait[0] = 0.0
+
+    started = time.perf_counter()
+    blocked = await asyncio.gather(*[
+        simulate_run(f"bench_{label}_{i}", write_through) for i in range(args.runs)
+    ])
+    pipeline_time = time.perf_counter() - started
+
+    flush_pending()
+    drain_time = time.perf_counter() - started
+    sheets_quota.REQUESTS_PER_MINUTE = REQUESTS_PER_MINUTE
+
+    print(f"\n{label}" + ("" if governed else " - quota governor off"))
+    print("-" * 60)
+    print(f"  Sheets round trips:      {sheet.total_calls} ({sheet.total_calls / args.runs:.2f} per run)")
+    print(f"  Calls by method:         {dict(sheet.calls)}")
+    print(f"  Emulated 429s:           {sheet.errors}")
+    print(f"  Wall time added per run: {sum(blocked) / args.runs * 1000:.1f} ms (blocked on database calls)")
+    print(f"  Quota governor wait:     {_governor_wait[0]:.2f}s in total (pipeline or background flusher)")
+    print(f"  Pipeline wall time:      {pipeline_time:.2f}s for {args.runs} concurrent runs")
+    print(f"  Mirror fully written:    {drain_time:.2f}s")
+
+
+print("=" * 60)
+print("DATABASE LOGGING BENCHMARK (emulated Google Sheets)")
+print("=" * 60)
+print(f"Runs: {args.runs} | Latency per call: {args.latency}s | Quota: {args.quota or 'unlimited'}/min")
+print(f"Quota governor: {REQUESTS_PER_MINUTE:.0f} requests/min")
+
+asyncio.run(benchmark("Write-behind (default)", write_through=False))
+asyncio.run(benchmark("Write-through (flush after every call)", write_through=True, governed=args.governed_baseline))
+
+print(f"\n✅ {len(get_all_runs())} runs in the local database")
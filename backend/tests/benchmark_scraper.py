@@ -0,0 +1,163 @@
+"""
+Benchmark the scraper's HTML extraction backends on a corpus of saved pages.
+Reports pages per second and peak memory (RSS growth, so C allocations
+count too) for each backend (see
+api/services/html_extraction.py), against an "original" row that
+reproduces the scraper before any of them: the whole body parsed with
+BeautifulSoup, then get_text() and truncation.
+
+Usage: python backend/tests/benchmark_scraper.py [--max-chars 10000] [--repeat 5] [--backends original lxml stream] [--verbose]
+       python backend/tests/benchmark_scraper.py --save https://www.anthropic.com ...
+
+The corpus is the committed fixture pages in backend/tests/test_pages/fixtures/
+plus any pages saved into backend/tests/test_pages/ (--save downloads some;
+they stay out of git). Without saved pages, large synthetic marketing pages
+are added, since that is where byte caps and early exits matter.
+"""
+
+import sys
+import os
+import time
+import argparse
+import resource
+import multiprocessing
+
+import requests
+
+# Point sys.path at backend/ (where 'api' lives)
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+from bs4 import BeautifulSoup
+
+from api.services.website_scraper import HEADERS, MAX_BYTES, _charset
+from api.services.html_extraction import EXTRACTORS, extract_text, default_extractor
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), 'test_pages')
+FIXTURES_DIR = os.path.join(PAGES_DIR, 'fixtures')
+BASELINE = "original"
+
+parser = argparse.ArgumentParser(description="Benchmark HireSong website text extraction")
+parser.add_argument("--max-chars", type=int, default=10000, help="Character budget (scrape_website's max_chars)")
+parser.add_argument("--repeat", type=int, default=5, help="Extractions per page (best time is reported)")
+parser.add_argument("--save", nargs="*", metavar="URL", help="Download pages into the corpus first")
+parser.add_argument("--backends", nargs="*", help="Backends to compare (default: all available)")
+parser.add_argument("--verbose", action="store_true", help="Also print per-page results")
+args = parser.parse_args()
+
+
+def save_pages(urls):
+    """Download pages into test_pages/ for later runs."""
+    os.makedirs(PAGES_DIR, exist_ok=True)
+    for url in urls:
+        response = requests.get(url, headers=HEADERS, timeout=15)
+        response.raise_for_status()
+        name = url.split("://", 1)[-1].strip("/").replace("/", "_") or "page"
+        with open(os.path.join(PAGES_DIR, f"{name}.html"), 'wb') as f:
+            f.write(response.content)
+        print(f"💾 Saved {url} ({len(response.content) / 1024:.0f} KB)")
+
+
+def synthetic_page(sections: int) -> bytes:
+    """A marketing-style page: big inline scripts, nav, and lots of body copy."""
+    parts = ["<html><head><meta charset='utf-8'><style>", "body{margin:0}" * 2000, "</style>"]
+    parts.append("<script>" + "window.__DATA__ = {\"k\": 1};" * 5000 + "</script></head><body>")
+    parts.append("<nav>" + "".join(f"<a href='/page{i}'>Link {i}</a>" for i in range(200)) + "</nav>")
+    for i in range(sections):
+        parts.append(
+            f"<section><h2>Section {i}</h2><p>We build <b>reliable</b> products for customers "
+            f"around the world &amp; care about our team. Paragraph {i} of our story.</p></section>"
+        )
+    parts.append("<footer>" + "Legal text. " * 500 + "</footer></body></html>")
+    return "".join(parts).encode("utf-8")
+
+
+def read_pages(directory: str, prefix: str = ""):
+    """(name, body) pairs for the .html/.htm files in a directory."""
+    pages = []
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            if name.endswith((".html", ".htm")):
+                with open(os.path.join(directory, name), 'rb') as f:
+                    pages.append((prefix + name, f.read()))
+    return pages
+
+
+def load_corpus():
+    """Committed fixtures plus saved pages, or plus synthetic pages when none are saved."""
+    saved = read_pages(PAGES_DIR)
+    pages = read_pages(FIXTURES_DIR, "fixtures/") + saved
+    if not saved:
+        print("No saved pages in tests/test_pages/ - adding synthetic pages")
+        pages += [(f"synthetic_{n}_sections", synthetic_page(n)) for n in (50, 1000, 10000)]
+    return pages
+
+
+def original_extract(html: bytes, max_chars: int) -> str:
+    """The scraper's extraction before byte caps and backends: parse everything, then truncate."""
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup(["script", "style", "nav", "footer", "header"]):
+        script.decompose()
+    text = soup.get_text(separator=' ', strip=True)
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = ' '.join(chunk for chunk in chunks if chunk)
+    return text[:max_chars]
+
+
+def measure(backend: str, html: bytes):
+    """(best seconds, characters) for one backend on one page."""
+    best = float("inf")
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        if backend == BASELINE:
+            text = original_extract(html, args.max_chars)  # Whole body, as response.content was
+        else:
+            capped = html[:MAX_BYTES]
+            blocks = extract_text(capped, args.max_chars, _charset(None, capped), backend=backend)["blocks"]
+            text = " ".join(blocks)[:args.max_chars]
+        best = min(best, time.perf_counter() - started)
+    return best, len(text)
+
+
+def run_backend(backend: str, corpus, results) -> None:
+    """Measure one backend in a forked child, so peak RSS (C allocations included) is its own."""
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rows = [(name, len(html)) + measure(backend, html) for name, html in corpus]
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    results.put((rows, peak_kb))
+
+
+if args.save:
+    save_pages(args.save)
+corpus = load_corpus()
+backends = args.backends or [BASELINE] + list(EXTRACTORS)
+
+print("=" * 78)
+print("SCRAPER EXTRACTION BENCHMARK")
+print("=" * 78)
+print(f"Pages: {len(corpus)} | Budget: {args.max_chars} chars | Byte cap: {MAX_BYTES / 1024:.0f} KB | Best of {args.repeat}")
+print(f"Default backend: {default_extractor()}")
+
+context = multiprocessing.get_context("fork")
+results = {}
+for backend in backends:
+    queue = context.Queue()
+    child = context.Process(target=run_backend, args=(backend, corpus, queue))
+    child.start()
+    results[backend] = queue.get()
+    child.join()
+
+    if args.verbose:
+        print(f"\n{backend}")
+        for name, size, seconds, chars in results[backend][0]:
+            print(f"  {name[:40]:<42}{size / 1024:>6.0f}KB {seconds * 1000:>8.1f}ms {chars:>7} chars")
+
+print(f"\n{'Backend':<10}{'Pages/sec':>12}{'Total time':>14}{'Peak RSS growth':>18}{'Avg chars':>12}{'Speedup':>10}")
+print("-" * 76)
+baseline_total = sum(row[2] for row in results[BASELINE][0]) if BASELINE in results else None
+for backend, (rows, peak_kb) in results.items():
+    total = sum(row[2] for row in rows)
+    chars = sum(row[3] for row in rows) / len(rows)
+    speedup = f"{baseline_total / total:>9.1f}x" if baseline_total else f"{'-':>10}"
+    print(f"{backend:<10}{len(rows) / total:>12.1f}{total * 1000:>12.1f}ms{peak_kb / 1024:>16.1f}MB{chars:>12.0f}{speedup}")
@@ -0,0 +1,173 @@
+"""
+Unit tests for run admission and scheduling (no server, network or API keys needed).
+Usage: python backend/tests/test_admission.py  (or pytest)
+"""
+
+import sys
+import os
+import asyncio
+
+# Point sys.path at backend/ (where 'api' lives)
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+from api.services import admission
+from api.services.admission import AdmissionController, AdmissionRejected, request_tenant
+
+
+async def _run_in_turn(controller, requests):
+    """Queue (priority, tenant) runs behind a running one and return the order they start in."""
+    first = controller.reserve("interactive", "first")
+    await first.wait_for_turn()
+    order = []
+
+    async def run(ticket):
+        await ticket.wait_for_turn()
+        order.append(ticket.tenant)
+        ticket.release()
+
+    tasks = []
+    for priority, tenant in requests:
+        tasks.append(asyncio.create_task(run(controller.reserve(priority, tenant))))
+        await asyncio.sleep(0)  # Let it queue, so arrival order is the list order
+    first.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_tenants_take_turns():
+    controller = AdmissionController(max_running=1, max_queued=8)
+    requests = [("interactive", "a")] * 3 + [("interactive", "b")]
+    order = asyncio.run(_run_in_turn(controller, requests))
+    assert order == ["a", "b", "a", "a"], order
+
+
+def test_interactive_before_batch():
+    controller = AdmissionController(max_running=1, max_queued=8)
+    order = asyncio.run(_run_in_turn(controller, [("batch", "bulk"), ("interactive", "user")]))
+    assert order == ["user", "bulk"], order
+
+
+def test_batch_yields_and_resumes_first():
+    async def scenario():
+        controller = AdmissionController(max_running=1, max_queued=8)
+        order = []
+        batch = controller.reserve("batch", "early")
+        await batch.wait_for_turn()
+
+        async def run(ticket):
+            await ticket.wait_for_turn()
+            order.append(ticket.tenant)
+            ticket.release()
+
+        later = asyncio.create_task(run(controller.reserve("batch", "late")))
+        await asyncio.sleep(0)
+        user = asyncio.create_task(run(controller.reserve("interactive", "user")))
+        await asyncio.sleep(0)
+
+        assert controller.should_yield(batch)
+        await controller.yield_slot(batch)  # Returns once the batch run is running again
+        order.append(batch.tenant)
+        batch.release()
+        await asyncio.gather(later, user)
+        assert controller.stats["yields"] == 1
+        return order
+
+    assert asyncio.run(scenario()) == ["user", "early", "late"]
+
+
+def test_interactive_run_never_yields():
+    async def scenario():
+        controller = AdmissionController(max_running=1, max_queued=8)
+        ticket = controller.reserve("interactive", "a")
+        await ticket.wait_for_turn()
+        waiter = asyncio.create_task(controller.reserve("interactive", "b").wait_for_turn())
+        await asyncio.sleep(0)
+        should_yield = controller.should_yield(ticket)
+        ticket.release()
+        await waiter
+        return should_yield
+
+    assert not asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_queue():
+    async def scenario():
+        controller = AdmissionController(max_running=1, max_queued=8)
+        running = controller.reserve("interactive", "a")
+        await running.wait_for_turn()
+        waiter = controller.reserve("interactive", "b")
+        task = asyncio.create_task(waiter.wait_for_turn())
+        await asyncio.sleep(0)
+        assert controller.waiting == [waiter]
+
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        assert controller.waiting == []
+        waiter.release()
+        running.release()
+        assert controller.running == 0 and not controller.tickets
+
+    asyncio.run(scenario())
+
+
+def test_capacity_and_interactive_headroom():
+    controller = AdmissionController(max_running=1, max_queued=2)
+    capacity = controller.capacity
+    for _ in range(capacity - admission.INTERACTIVE_HEADROOM):
+        controller.reserve("batch", "bulk")
+    try:
+        controller.reserve("batch", "bulk")
+        assert False, "batch run admitted into the interactive headroom"
+    except AdmissionRejected as e:
+        assert e.retry_after >= 1
+
+    while len(controller.tickets) < capacity:
+        controller.reserve("interactive", "user")
+    try:
+        controller.reserve("interactive", "user")
+        assert False, "run admitted past capacity"
+    except AdmissionRejected:
+        pass
+    assert controller.stats["rejected"] == 2
+
+
+def test_tenant_cap():
+    controller = AdmissionController(max_running=2, max_queued=8)
+    controller.tenant_limit = 1
+    controller.reserve("interactive", "a")
+    try:
+        controller.reserve("interactive", "a")
+        assert False, "tenant admitted past its cap"
+    except AdmissionRejected:
+        pass
+    controller.reserve("interactive", "b")
+    assert controller.stats["rejected_tenant_limit"] == 1
+
+
+def test_tenant_only_named_by_trusted_proxy():
+    trusted = admission.TRUSTED_PROXIES
+    admission.TRUSTED_PROXIES = {"10.0.0.1"}
+    try:
+        spoofed = {"x-tenant": "someone-else", "x-forwarded-for": "1.1.1.1"}
+        assert request_tenant("203.0.113.7", spoofed) == "203.0.113.7"
+        assert request_tenant("10.0.0.1", {"x-tenant": "acme"}) == "acme"
+        assert request_tenant("10.0.0.1", {"x-forwarded-for": "6.6.6.6, 203.0.113.7"}) == "203.0.113.7"
+        assert request_tenant("10.0.0.1", {}) == "10.0.0.1"
+    finally:
+        admission.TRUSTED_PROXIES = trusted
+
+
+def test_malformed_tenant_weights_are_skipped():
+    weights = admission._parse_tenant_weights("acme=2, =3,bulk=0.5,broken=,typo=x,zero=0,nan=nan,inf=inf,noequals")
+    assert weights == {"acme": 2.0, "bulk": 0.5}, weights
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
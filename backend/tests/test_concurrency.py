@@ -0,0 +1,116 @@
+"""
+Unit tests for the adaptive provider concurrency limiter (no network or API keys needed).
+Usage: python backend/tests/test_concurrency.py  (or pytest)
+"""
+
+import sys
+import os
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Point sys.path at backend/ (where 'api' lives)
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+from api.services import concurrency
+from api.services.concurrency import AdaptiveLimiter, SlotTimeout, run_limited, run_provider_call, set_run
+
+
+def _queued(limiter: AdaptiveLimiter) -> int:
+    return limiter.snapshot()["waiting"]
+
+
+def test_waiting_runs_served_round_robin():
+    limiter = AdaptiveLimiter("test", 1, 1)
+    limiter.acquire(1)
+    order = []
+
+    def call(run: str, label: str) -> None:
+        set_run(run)
+        limiter.acquire(5)
+        order.append(label)
+        limiter.release(0.0, False)
+
+    threads = []
+    for run, label in [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1")]:
+        thread = threading.Thread(target=call, args=(run, label))
+        thread.start()
+        threads.append(thread)
+        while _queued(limiter) < len(threads):  # Queue in list order
+            time.sleep(0.001)
+    limiter.release(0.0, False)
+    for thread in threads:
+        thread.join()
+    assert order == ["a1", "b1", "a2", "a3"], order
+
+
+def test_throttle_halves_limit_once_per_cooldown():
+    limiter = AdaptiveLimiter("test", 8, 8)
+    for _ in range(2):
+        limiter.acquire(1)
+    limiter.release(0.0, True)
+    assert int(limiter.limit) == 8 * concurrency.DECREASE_FACTOR
+    limiter.release(0.0, True)  # Same burst of 429s: no second cut within the cooldown
+    assert int(limiter.limit) == 8 * concurrency.DECREASE_FACTOR
+    assert limiter.stats["throttled"] == 2 and limiter.in_flight == 0
+
+
+def test_queueing_grows_limit_to_ceiling():
+    limiter = AdaptiveLimiter("test", 1, 2)
+    for _ in range(5):
+        limiter.acquire(1)
+        limiter.release(concurrency.QUEUE_WAIT_THRESHOLD, False)
+    assert int(limiter.limit) == 2
+
+
+def test_try_acquire_never_waits():
+    limiter = AdaptiveLimiter("test", 2, 2)
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+    limiter.release(0.0, False)
+    assert limiter.try_acquire()
+    assert limiter.in_flight == 2
+
+
+def test_acquire_times_out():
+    limiter = AdaptiveLimiter("test", 1, 1)
+    limiter.acquire(1)
+    try:
+        limiter.acquire(0.05)
+        assert False, "acquired a slot past the limit"
+    except SlotTimeout:
+        pass
+    assert _queued(limiter) == 0 and limiter.stats["timeouts"] == 1
+
+
+def test_waiting_calls_leave_default_executor_free():
+    limiter = concurrency._limiters["test"] = AdaptiveLimiter("test", 1, 1)
+    limiter.acquire(1)  # The only slot is taken, so provider calls below wait
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=2))
+        waiting = [
+            asyncio.ensure_future(run_provider_call(run_limited, "test", 5, lambda remaining: "done", lambda e: False))
+            for _ in range(4)
+        ]
+        while limiter.snapshot()["waiting"] < 4:
+            await asyncio.sleep(0.001)
+        # Uploads, preflight and database calls use the default executor
+        assert await asyncio.wait_for(loop.run_in_executor(None, lambda: "upload saved"), 1) == "upload saved"
+        limiter.release(0.0, False)
+        return await asyncio.gather(*waiting)
+
+    try:
+        assert asyncio.run(scenario()) == ["done"] * 4
+    finally:
+        del concurrency._limiters["test"]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
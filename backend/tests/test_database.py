@@ -1,6 +1,8 @@
 """
 Test Google Sheets database integration.
 Usage: python backend/tests/test_database.py
+
+Set SHEETS_EMULATOR=1 to run against the in-process emulator (no credentials).
 """
 
 import sys
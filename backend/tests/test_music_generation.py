@@ -15,6 +15,7 @@ from dotenv import load_dotenv
 load_dotenv(os.path.join(BACKEND_DIR, '.env'))
 
 from api.services.music_generation import generate_music
+from api.services.resilience import ProviderError
 
 # Test song data (using the format from your teammate's example)
 TEST_SONG = {
@@ -76,23 +77,25 @@ print(f"Song: {TEST_SONG['song_title']}")
 print(f"Genre: {TEST_SONG['genre']} | BPM: {TEST_SONG['bpm']}")
 print("\nGenerating 30-second track... (takes ~30-60 seconds)\n")
 
-result = generate_music(TEST_SONG)
-
-if result['status'] == 'success':
-    print("\n✅ Done!")
-    print(f"Duration: {result['duration_seconds']} seconds")
-    print(f"Audio size: {len(result['audio_data']) / 1024:.2f} KB")
-    
-    # Save the audio file
-    output_path = os.path.join(BACKEND_DIR, "tests", "test_files", "generated_music.mp3")
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    
-    with open(output_path, 'wb') as f:
-        f.write(result['audio_data'])
-    
-    print(f"\n💾 Audio saved to: {output_path}")
-    print("\nYou can now play the generated music file!")
-else:
+try:
+    result = generate_music(TEST_SONG)
+except ProviderError as e:
+    # Raised once retries are exhausted (or for a non-retryable API error)
     print("\n❌ Failed!")
-    print(f"Error: {result.get('error', 'Unknown error')}")
+    print(f"Error: {str(e)}")
+    print(f"Retryable: {e.retryable} | Status: {e.status or 'n/a'}")
+    sys.exit(1)
+
+print("\n✅ Done!")
+print(f"Duration: {result['duration_seconds']} seconds")
+print(f"Audio size: {len(result['audio_data']) / 1024:.2f} KB")
+
+# Save the audio file
+output_path = os.path.join(BACKEND_DIR, "tests", "test_files", "generated_music.mp3")
+os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+with open(output_path, 'wb') as f:
+    f.write(result['audio_data'])
 
+print(f"\n💾 Audio saved to: {output_path}")
+print("\nYou can now play the generated music file!")
@@ -1,6 +1,8 @@
 """
 Test if the orchestrator can properly call database functions.
 This diagnoses why database calls aren't showing up in pipeline runs.
+
+Set SHEETS_EMULATOR=1 to run against the in-process emulator (no credentials).
 """
 
 import sys
@@ -0,0 +1,159 @@
+"""
+Unit tests for provider retries and circuit breakers (no network or API keys needed).
+Usage: python backend/tests/test_resilience.py  (or pytest)
+"""
+
+import sys
+import os
+import time
+
+# Point sys.path at backend/ (where 'api' lives)
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+
+from api.services import resilience
+from api.services.resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceededError, ProviderError, TransientProviderError,
+    call_with_retry
+)
+
+COOLDOWN = 0.05
+_request = httpx.Request("POST", "https://provider.test")
+
+
+def _status_error(status: int) -> httpx.HTTPStatusError:
+    return httpx.HTTPStatusError(str(status), request=_request, response=httpx.Response(status, request=_request))
+
+
+def _flaky(errors):
+    """A provider call that raises the given errors in turn, then succeeds."""
+    calls = []
+
+    def call(remaining: float) -> str:
+        calls.append(remaining)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return "ok"
+
+    return call, calls
+
+
+def _fast_backoff(test):
+    def run():
+        backoff = resilience.BASE_BACKOFF
+        resilience.BASE_BACKOFF = 0.001
+        try:
+            test()
+        finally:
+            resilience.BASE_BACKOFF = backoff
+            resilience.breaker("elevenlabs").record_success()
+    run.__name__ = test.__name__
+    return run
+
+
+def _is_open(breaker: CircuitBreaker) -> bool:
+    try:
+        breaker.before_call()
+        return False
+    except CircuitOpenError:
+        return True
+
+
+def _open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failures=3, cooldown=COOLDOWN)
+    for _ in range(3):
+        breaker.record_failure(True)
+    return breaker
+
+
+@_fast_backoff
+def test_transient_errors_retried():
+    call, calls = _flaky([_status_error(503), httpx.ConnectTimeout("slow")])
+    assert call_with_retry("elevenlabs", call, max_retries=2, deadline=5) == "ok"
+    assert len(calls) == 3 and calls[0] > calls[-1] > 0  # Each attempt gets the time that is left
+
+
+@_fast_backoff
+def test_non_retryable_error_not_retried():
+    call, calls = _flaky([_status_error(400)])
+    try:
+        call_with_retry("elevenlabs", call, max_retries=2, deadline=5)
+        assert False, "bad request succeeded"
+    except ProviderError as e:
+        assert not e.retryable and e.status == 400
+    assert len(calls) == 1
+
+
+@_fast_backoff
+def test_retries_run_out():
+    call, calls = _flaky([_status_error(429)] * 3)
+    try:
+        call_with_retry("elevenlabs", call, max_retries=1, deadline=5)
+        assert False, "call succeeded"
+    except TransientProviderError as e:
+        assert e.retryable and e.status == 429
+    assert len(calls) == 2
+
+
+@_fast_backoff
+def test_deadline_stops_retries():
+    call, calls = _flaky([_status_error(503)] * 5)
+    resilience.BASE_BACKOFF = 1.0  # Longer than the deadline
+    try:
+        call_with_retry("elevenlabs", call, max_retries=4, deadline=0.2)
+        assert False, "call succeeded"
+    except DeadlineExceededError:
+        pass
+    assert len(calls) == 1
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failures=3, cooldown=COOLDOWN)
+    breaker.record_failure(True)
+    breaker.record_failure(True)
+    assert not _is_open(breaker)
+    breaker.record_failure(True)
+    assert _is_open(breaker) and breaker.retry_after() > 0
+
+
+def test_success_resets_the_count():
+    breaker = CircuitBreaker("test", failures=3, cooldown=COOLDOWN)
+    breaker.record_failure(True)
+    breaker.record_failure(True)
+    breaker.record_success()
+    breaker.record_failure(True)
+    assert not _is_open(breaker)
+
+
+def test_non_transient_failures_ignored():
+    breaker = CircuitBreaker("test", failures=3, cooldown=COOLDOWN)
+    for _ in range(10):
+        breaker.record_failure(False)
+    assert not _is_open(breaker)
+
+
+def test_half_open_allows_one_probe():
+    breaker = _open_breaker()
+    time.sleep(COOLDOWN * 1.5)
+    assert breaker.retry_after() == 0
+    assert not _is_open(breaker)  # The probe
+    assert _is_open(breaker)      # Everyone else waits for it
+    breaker.record_success()
+    assert not _is_open(breaker) and not _is_open(breaker)
+
+
+def test_failed_probe_reopens():
+    breaker = _open_breaker()
+    time.sleep(COOLDOWN * 1.5)
+    assert not _is_open(breaker)
+    breaker.record_failure(True)
+    assert _is_open(breaker) and breaker.retry_after() > 0
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
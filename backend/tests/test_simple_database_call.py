@@ -1,6 +1,8 @@
 """
 Simple test that mimics the orchestrator's database calls.
 This is the minimal test to see if database integration works.
+
+Set SHEETS_EMULATOR=1 to run against the in-process emulator (no credentials).
 """
 
 import sys
@@ -0,0 +1,60 @@
+"""
+Unit tests for LLM input compaction (no network or API keys needed).
+Usage: python backend/tests/test_token_budget.py  (or pytest)
+"""
+
+import sys
+import os
+
+# Point sys.path at backend/ (where 'api' lives)
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+from api.services.token_budget import compact_text
+from api.services.html_extraction import EXTRACTORS, extract_text
+
+PAGE = (
+    b"<html><body><nav>Home</nav>"
+    b"<p>We <b>love</b> building tools. Our engineers <b>love</b> customers and <a href='/careers'>Careers</a> page.</p>"
+    b"<p>Visit <a href='/careers'>Careers</a> for jobs.</p>"
+    b"<p>Visit <a href='/careers'>Careers</a> for jobs.</p>"
+    b"</body></html>"
+)
+
+
+def test_repeated_lines_dropped():
+    text = "Acme builds rockets.\nWe are hiring.\nacme builds rockets.\nWe are hiring."
+    assert compact_text(text, 1000) == "Acme builds rockets.\nWe are hiring."
+
+
+def test_boilerplate_dropped():
+    text = "We use cookies to improve your experience.\nAcme builds rockets.\n© 2025 Acme Inc. All rights reserved."
+    assert compact_text(text, 1000) == "Acme builds rockets."
+    assert "cookies" in compact_text(text, 1000, strip_boilerplate=False)
+
+
+def test_inline_markup_stays_in_paragraph():
+    """Words repeated inside paragraphs (often in <b> or <a>) must survive dedup."""
+    for backend in ("stream", "bs4", "lxml"):
+        if backend not in EXTRACTORS:
+            continue
+        blocks = extract_text(PAGE, 10000, backend=backend)["blocks"]
+        compacted = compact_text("\n".join(blocks), 1000)
+        assert compacted == (
+            "We love building tools. Our engineers love customers and Careers page.\n"
+            "Visit Careers for jobs."
+        ), f"{backend}: {compacted!r}"
+
+
+def test_budget_cuts_at_word_boundary():
+    text = "alpha beta gamma delta epsilon " * 50
+    compacted = compact_text(text, 20)
+    assert compacted and len(compacted) < len(text.strip())
+    assert text.startswith(compacted)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")